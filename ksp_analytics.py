@@ -0,0 +1,285 @@
+"""Разбор полета по записанной телеметрии: производные каналы одним проходом.
+
+Скоростной напор, ускорение, перегрузку, гравитационные и
+аэродинамические потери и затраты характеристической скорости по
+ступеням раньше считали вручную, циклами по спискам телеметрии. Здесь
+каждый канал - одно векторное выражение NumPy по колонкам полета
+(open_telemetry, TelemetryBuffer.data(), Archive.load):
+
+    q             скоростной напор, Па (колонка dynamic_pressure или по
+                  таблице плотности тела)
+    acceleration  dv/dt, м/с^2
+    climb         dh/dt, м/с
+    gravity       g(h) sin(gamma) - тяготение вдоль скорости, м/с^2
+    g_load        (dv/dt + g sin(gamma)) / g0 - перегрузка вдоль скорости
+    thrust_acc    T/m: колонка thrust (Н) и масса, или расход массы и isp
+    drag_acc      D/m: T/m - dv/dt - g sin(gamma), или q * drag_area / m
+    burning       двигатель работает: тяга, газ или перегрузка > BURNING
+    gravity_loss, drag_loss, dv_spent - накопленные интегралы по работе
+                  двигателя, м/с
+
+UT записывается неравномерно (такты планировщика, ускорение времени,
+пауза игры), поэтому производные берутся np.gradient по самой колонке
+времени (второй порядок и на неравномерной сетке), интегралы - методом
+трапеций по фактическим шагам; повторы и откаты времени отбрасываются.
+Без тяги в Н потраченная скорость оценивается по кинематике
+(dv/dt + g sin(gamma)) и не включает сопротивление; тяга по расходу с
+вакуумным isp относит к сопротивлению и потери на противодавление в
+атмосфере. Моменты отделения ступеней - в том же времени, что колонка
+time/ut; скачки массы при отделении находятся по самой массе (JUMP).
+
+    data = open_telemetry("ksp_tel.tlm")
+    channels, summary = analyze(data, staging=[88.3, 151.0])
+    print(report(summary))
+
+    python ksp_analytics.py ksp_tel.tlm --staging 88.3,151
+    python ksp_analytics.py flights 12          # полет 12 из архива
+    python ksp_analytics.py --bench 1000000     # время разбора по числу отсчетов
+"""
+import sys
+import time
+
+import numpy as np
+
+from ksp_archive import dynamic_pressure
+from ksp_physics import KERBIN, body_model, g0
+
+BURNING = 0.05  # перегрузка вдоль скорости, выше которой двигатель считается работающим
+JUMP = 0.05  # доля массы, потерянная за один шаг: отделение ступени, а не расход топлива
+
+
+def _column(data, *names):
+    fields = data.dtype.names if hasattr(data, "dtype") else data.keys()
+    for name in names:
+        if name in fields:
+            return np.ascontiguousarray(data[name], dtype=np.float64)
+    return None
+
+
+def _integral(y, t):
+    # Накопленный интеграл методом трапеций по неравномерной сетке
+    out = np.empty_like(y)
+    out[0] = 0.0
+    np.cumsum(0.5 * (y[1:] + y[:-1]) * np.diff(t), out=out[1:])
+    return out
+
+
+def channels(data, staging=(), body=KERBIN, isp=None, drag_area=None):
+    """Производные каналы полета {имя: массив} на общей сетке time.
+
+    isp - удельный импульс по ступеням (с) для тяги по расходу массы,
+    drag_area - Cd * S (м^2) для сопротивления без тяги в Н.
+    """
+    t = _column(data, "ut", "time")
+    h = _column(data, "altitude")
+    v = _column(data, "speed", "velocity")
+    if t is None or h is None or v is None:
+        raise ValueError("Нужны колонки time/ut, altitude и speed/velocity")
+    mass = _column(data, "mass")
+    q = _column(data, "dynamic_pressure")
+    thrust = _column(data, "thrust")
+    throttle = _column(data, "throttle")
+    if thrust is not None and len(thrust) and thrust.max() <= 1.0:
+        # ksppp.py пишет в колонку thrust долю газа, а не тягу
+        throttle, thrust = thrust, None
+
+    # Только строго растущее время: повторы снимка и откаты отбрасываются
+    keep = np.empty(len(t), dtype=bool)
+    keep[:1] = True
+    if len(t) > 1:
+        np.greater(t[1:], np.maximum.accumulate(t)[:-1], out=keep[1:])
+    if not keep.all():
+        t, h, v = t[keep], h[keep], v[keep]
+        mass, q, thrust, throttle = (c if c is None else c[keep] for c in (mass, q, thrust, throttle))
+    if len(t) < 3:
+        raise ValueError("Слишком мало отсчетов для разбора")
+
+    model = body_model(body)
+    stage = np.searchsorted(np.asarray(staging, dtype=np.float64), t, side="right")
+    acceleration = np.gradient(v, t)
+    climb = np.gradient(h, t)
+    g = model.mu / (model.radius + h) ** 2
+    with np.errstate(divide="ignore", invalid="ignore"):
+        sin_gamma = np.clip(np.where(v > 1.0, climb / v, 1.0), -1.0, 1.0)
+    gravity = g * sin_gamma
+    proper = acceleration + gravity  # (T - D) / m вдоль скорости
+    if q is None:
+        q = dynamic_pressure(h, v, body)
+
+    thrust_acc = drag_acc = None
+    if mass is not None:
+        if thrust is not None:
+            thrust_acc = thrust / mass
+        elif isp is not None:
+            mdot = np.gradient(mass, t)
+            # Отделение ступени - скачок массы, а не расход: отсчеты по краям скачка не в счет.
+            # Масса падает на снимке после команды, поэтому скачок ищется по самой массе
+            jump = np.zeros(len(t), dtype=bool)
+            edge = mass[1:] < mass[:-1] * (1.0 - JUMP)
+            jump[1:] |= edge
+            jump[:-1] |= edge
+            mdot[jump] = 0.0
+            stage_isp = np.asarray(isp, dtype=np.float64)[np.minimum(stage, len(isp) - 1)]
+            thrust_acc = np.maximum(-mdot, 0.0) * stage_isp * g0 / mass
+        if thrust_acc is not None:
+            drag_acc = thrust_acc - proper
+        elif drag_area is not None:
+            drag_acc = q * drag_area / mass
+
+    if thrust_acc is not None:
+        burning = thrust_acc > BURNING * g0
+        spent = thrust_acc
+    else:
+        burning = throttle > 0.0 if throttle is not None else proper > BURNING * g0
+        spent = proper + (drag_acc if drag_acc is not None else 0.0)
+    result = {
+        "time": t, "altitude": h, "speed": v, "stage": stage, "q": q,
+        "acceleration": acceleration, "climb": climb, "gravity": gravity,
+        "g_load": proper / g0, "burning": burning,
+        "gravity_loss": _integral(np.where(burning, gravity, 0.0), t),
+        "dv_spent": _integral(np.where(burning, spent, 0.0), t),
+    }
+    if mass is not None:
+        result["mass"] = mass
+        # Накопленный ln(m0 / m) по расходу, без скачков отделения ступеней
+        burned = np.log(mass[:-1] / mass[1:])
+        burned[burned > -np.log(1.0 - JUMP)] = 0.0
+        result["log_mass"] = np.r_[0.0, np.cumsum(burned)]
+    if thrust_acc is not None:
+        result["thrust_acc"] = thrust_acc
+    if drag_acc is not None:
+        result["drag_acc"] = drag_acc
+        result["drag_loss"] = _integral(np.where(burning, drag_acc, 0.0), t)
+    return result
+
+
+def summary(ch, isp=None):
+    """Сводка полета и по ступеням: максимумы, потери, затраты скорости."""
+    t, stage, burning = ch["time"], ch["stage"], ch["burning"]
+    drag = ch.get("drag_loss")
+    log_mass = ch.get("log_mass")
+    i = int(np.argmax(ch["q"]))
+    j = int(np.argmax(ch["g_load"]))
+    steps = np.diff(t)
+    total = {
+        "duration": float(t[-1] - t[0]),
+        "samples": len(t),
+        "step_min": float(steps.min()), "step_max": float(steps.max()),
+        "burn_time": float(np.where(burning[1:] & burning[:-1], steps, 0.0).sum()),
+        "max_q": float(ch["q"][i]), "max_q_time": float(t[i]), "max_q_altitude": float(ch["altitude"][i]),
+        "max_g": float(ch["g_load"][j]), "max_g_time": float(t[j]),
+        "dv_spent": float(ch["dv_spent"][-1]),
+        "gravity_loss": float(ch["gravity_loss"][-1]),
+        "drag_loss": None if drag is None else float(drag[-1]),
+        "dv_gained": float(ch["speed"][-1] - ch["speed"][0]),
+    }
+    # Границы ступеней: первый отсчет каждой и конец полета
+    starts = np.flatnonzero(np.r_[True, stage[1:] != stage[:-1]])
+    ends = np.r_[starts[1:], len(t) - 1]
+    stages = []
+    for n, (a, b) in enumerate(zip(starts, ends)):
+        spent = float(ch["dv_spent"][b] - ch["dv_spent"][a])
+        gravity = float(ch["gravity_loss"][b] - ch["gravity_loss"][a])
+        lost = gravity + (0.0 if drag is None else float(drag[b] - drag[a]))
+        row = {
+            "stage": int(stage[a]) + 1,
+            "start": float(t[a]), "end": float(t[b]),
+            "burn_time": float(np.where(burning[a + 1:b + 1] & burning[a:b], steps[a:b], 0.0).sum()),
+            "dv_spent": spent, "gravity_loss": gravity,
+            "drag_loss": None if drag is None else float(drag[b] - drag[a]),
+            # Доля потраченной скорости, дошедшая до скорости корабля
+            "efficiency": (spent - lost) / spent if spent > 0 else None,
+            "mass_ratio": None, "dv_ideal": None,
+        }
+        if log_mass is not None:
+            row["mass_ratio"] = float(np.exp(log_mass[b] - log_mass[a]))
+            if isp is not None and row["mass_ratio"] > 1.0:
+                row["dv_ideal"] = float(isp[min(n, len(isp) - 1)] * g0 * np.log(row["mass_ratio"]))
+        stages.append(row)
+    total["stages"] = stages
+    return total
+
+
+def analyze(data, staging=(), body=KERBIN, isp=None, drag_area=None):
+    """Каналы и сводка полета одним вызовом."""
+    ch = channels(data, staging, body, isp, drag_area)
+    return ch, summary(ch, isp)
+
+
+def _fmt(value, spec):
+    return "-" if value is None else format(value, spec)
+
+
+def report(s):
+    """Сводка текстом для консоли."""
+    lines = [
+        f"Полет: {s['duration']:.1f} с, {s['samples']} отсчетов "
+        f"(шаг {s['step_min']:.3g}..{s['step_max']:.3g} с), двигатель {s['burn_time']:.1f} с",
+        f"max Q {s['max_q'] / 1000:.2f} кПа на {s['max_q_altitude'] / 1000:.1f} км (t = {s['max_q_time']:.1f} с), "
+        f"max перегрузка {s['max_g']:.2f} g (t = {s['max_g_time']:.1f} с)",
+        f"Потрачено {s['dv_spent']:.0f} м/с: набрано {s['dv_gained']:.0f}, "
+        f"гравитация {s['gravity_loss']:.0f}, сопротивление {_fmt(s['drag_loss'], '.0f')}",
+        "Ступень   начало     конец  работа  потрачено  гравит.  сопр.   КПД  m0/m1  идеал",
+    ]
+    for st in s["stages"]:
+        lines.append(
+            f"{st['stage']:7d} {st['start']:8.1f} {st['end']:9.1f} {st['burn_time']:7.1f} "
+            f"{st['dv_spent']:10.0f} {st['gravity_loss']:8.0f} {_fmt(st['drag_loss'], '6.0f'):>6s} "
+            f"{_fmt(st['efficiency'], '5.2f'):>5s} {_fmt(st['mass_ratio'], '6.2f'):>6s} "
+            f"{_fmt(st['dv_ideal'], '6.0f'):>6s}")
+    return "\n".join(lines)
+
+
+def synthetic(n, seed=0):
+    """Журнал на n отсчетов: выведение и работа на орбите, шаг UT неравномерный."""
+    rng = np.random.default_rng(seed)
+    t = np.cumsum(rng.uniform(0.03, 0.12, n))  # такты 20 Гц с дрожанием и пропусками
+    burn = np.minimum(t, 300.0)
+    data = np.zeros(n, dtype=[(f, np.float64) for f in ("ut", "altitude", "speed", "mass", "throttle")])
+    data["ut"] = t
+    data["altitude"] = 0.5 * burn ** 2
+    data["speed"] = 8.0 * burn
+    data["mass"] = 20000.0 - 40.0 * burn
+    data["throttle"] = t < 300.0
+    return data
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+
+    def option(name, default=None):
+        if name not in args:
+            return default
+        i = args.index(name)
+        value = args[i + 1]
+        del args[i:i + 2]
+        return [float(x) for x in value.split(",")]
+
+    if args[:1] == ["--bench"]:
+        n = int(args[1]) if len(args) > 1 else 1000000
+        data = synthetic(n)
+        times = []
+        for _ in range(3):
+            start = time.perf_counter()
+            analyze(data, staging=[150.0])
+            times.append(time.perf_counter() - start)
+        print(f"{n} отсчетов ({data['ut'][-1] / 3600:.1f} ч UT): {min(times) * 1000:.0f} мс")
+        sys.exit()
+    staging = option("--staging", ())
+    isp = option("--isp")
+    drag_area = option("--drag-area")
+    if len(args) > 1:
+        from ksp_archive import Archive
+        archive = Archive(args[0])
+        run = archive.get(int(args[1]))
+        data = archive.load(run["id"])
+        staging = staging or run["staging"]
+        archive.close()
+    else:
+        from ksp_telemetry import open_telemetry
+        data = open_telemetry(args[0])
+    start = time.perf_counter()
+    _, s = analyze(data, staging, isp=isp, drag_area=drag_area and drag_area[0])
+    elapsed = time.perf_counter() - start
+    print(report(s))
+    print(f"Разбор за {elapsed * 1000:.1f} мс")
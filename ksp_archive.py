@@ -0,0 +1,228 @@
+"""Архив полетов: колоночные файлы телеметрии и индекс SQLite для запросов.
+
+Каждый полет сохраняется в <каталог>/runs/<номер>-<имя>.npz - по массиву
+на колонку телеметрии, так что np.load читает с диска только запрошенные
+колонки. Сводка полета (max Q, моменты отделения ступеней, итоговые
+апоцентр и перицентр, остаток топлива) и параметры ракеты и профиля
+пишутся в <каталог>/index.sqlite, и отбор среди сотен полетов идет по
+индексу, без чтения файлов:
+
+    archive = Archive("flights")
+    archive.add("ksp_tel", telemetry.data(), params={"turn_end": 45000},
+                staging=[63.2, 151.0])
+    runs = archive.query("turn_end < 50000", "periapsis > 70000")
+    data = archive.load(runs[0]["id"], ["time", "altitude"])
+
+    python ksp_archive.py flights "turn_end < 50000" "periapsis > 70000"
+    python ksp_archive.py flights --add ksp_tel.tlm
+"""
+import json
+import os
+import re
+import sqlite3
+import sys
+import time
+
+import numpy as np
+
+from ksp_physics import KERBIN, body_model
+
+# Колонки сводки в таблице runs; остальные имена в запросах - параметры
+SUMMARY = ("duration", "samples", "max_q", "max_q_altitude", "apoapsis",
+           "periapsis", "fuel_remaining", "stages")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    created REAL NOT NULL,
+    path TEXT NOT NULL,
+    columns TEXT NOT NULL,
+    duration REAL,
+    samples INTEGER,
+    max_q REAL,
+    max_q_altitude REAL,
+    apoapsis REAL,
+    periapsis REAL,
+    fuel_remaining REAL,
+    stages INTEGER
+);
+CREATE TABLE IF NOT EXISTS staging (run INTEGER NOT NULL, stage INTEGER NOT NULL, ut REAL NOT NULL);
+CREATE TABLE IF NOT EXISTS params (run INTEGER NOT NULL, key TEXT NOT NULL, value REAL, text TEXT);
+CREATE INDEX IF NOT EXISTS params_key ON params (key, value);
+CREATE INDEX IF NOT EXISTS staging_run ON staging (run);
+"""
+
+CONDITION = re.compile(r"^\s*(\w+)\s*(<=|>=|!=|==|=|<|>)\s*(.+?)\s*$")
+
+
+def dynamic_pressure(altitude, speed, body=KERBIN):
+    """Скоростной напор по таблице плотности атмосферы body, Па."""
+    rho = body_model(body).density(np.asarray(altitude, dtype=np.float64))
+    return 0.5 * rho * np.asarray(speed, dtype=np.float64) ** 2
+
+
+def _column(data, *names):
+    for name in names:
+        if name in data.dtype.names:
+            return np.asarray(data[name])
+    return None
+
+
+def summarize(data, staging=(), body=KERBIN):
+    """Сводка полета по структурированному массиву телеметрии.
+
+    max Q берется из колонки dynamic_pressure, а без нее оценивается по
+    высоте и скорости. Нет нужных колонок - поле сводки None.
+    """
+    summary = dict.fromkeys(SUMMARY)
+    summary["samples"] = len(data)
+    summary["stages"] = len(staging)
+    if not len(data):
+        return summary
+    t = _column(data, "time", "ut")
+    if t is not None:
+        summary["duration"] = float(t[-1] - t[0])
+    altitude = _column(data, "altitude")
+    q = _column(data, "dynamic_pressure")
+    if q is None and altitude is not None:
+        speed = _column(data, "speed", "velocity")
+        if speed is not None:
+            q = dynamic_pressure(altitude, speed, body)
+    if q is not None:
+        i = int(np.argmax(q))
+        summary["max_q"] = float(q[i])
+        if altitude is not None:
+            summary["max_q_altitude"] = float(altitude[i])
+    for key in ("apoapsis", "periapsis"):
+        column = _column(data, key)
+        if column is not None:
+            summary[key] = float(column[-1])
+    fuel = _column(data, "fuel")
+    if fuel is not None:
+        summary["fuel_remaining"] = float(fuel[-1])
+    return summary
+
+
+class Archive:
+    """Каталог с файлами полетов и индексом."""
+
+    def __init__(self, root="flights"):
+        self.root = root
+        os.makedirs(os.path.join(root, "runs"), exist_ok=True)
+        self.db = sqlite3.connect(os.path.join(root, "index.sqlite"))
+        self.db.row_factory = sqlite3.Row
+        self.db.executescript(SCHEMA)
+
+    @classmethod
+    def from_env(cls, variable="KSP_ARCHIVE"):
+        """Архив в каталоге из переменной окружения; без нее None."""
+        root = os.environ.get(variable)
+        return cls(root) if root else None
+
+    def add(self, name, data, params=None, staging=(), summary=None, body=KERBIN):
+        """Сохраняет полет; возвращает его номер.
+
+        data - структурированный массив (TelemetryBuffer.data() или
+        open_telemetry), params - параметры ракеты и профиля (числа и
+        строки), staging - UT отделения ступеней, summary - поля сводки,
+        известные скрипту точнее, чем по телеметрии (например, остаток
+        топлива).
+        """
+        stats = summarize(data, staging, body)
+        stats.update(summary or {})
+        columns = list(data.dtype.names)
+        with self.db:
+            cursor = self.db.execute(
+                "INSERT INTO runs (name, created, path, columns) VALUES (?, ?, '', ?)",
+                (name, time.time(), json.dumps(columns)))
+            run = cursor.lastrowid
+            path = os.path.join("runs", f"{run}-{name}.npz")
+            # Без сжатия: колонка читается из zip-архива одним куском
+            np.savez(os.path.join(self.root, path), **{c: np.ascontiguousarray(data[c]) for c in columns})
+            self.db.execute(
+                f"UPDATE runs SET path = ?, {', '.join(f'{k} = ?' for k in SUMMARY)} WHERE id = ?",
+                [path] + [stats[k] for k in SUMMARY] + [run])
+            self.db.executemany("INSERT INTO staging VALUES (?, ?, ?)",
+                                [(run, i + 1, float(ut)) for i, ut in enumerate(staging)])
+            self.db.executemany("INSERT INTO params VALUES (?, ?, ?, ?)", [
+                (run, key, float(value), None) if isinstance(value, (int, float)) else
+                (run, key, None, str(value)) for key, value in (params or {}).items()])
+        return run
+
+    def query(self, *conditions, name=None):
+        """Полеты, для которых выполнены все условия "имя оп значение".
+
+        Имя - колонка сводки (SUMMARY) или параметр полета; значение -
+        число или строка в кавычках. Возвращает словари сводки с
+        параметрами (params) и моментами отделения (staging).
+        """
+        where, args = [], []
+        if name is not None:
+            where.append("name = ?")
+            args.append(name)
+        for condition in conditions:
+            match = CONDITION.match(condition)
+            if match is None:
+                raise ValueError(f"Условие не разобрано: {condition!r}")
+            key, op, value = match.groups()
+            op = "=" if op == "==" else op
+            if value[0] in "\"'" and value[-1] == value[0]:
+                value, column = value[1:-1], "text"
+            else:
+                value, column = float(value), "value"
+            if key in SUMMARY or key == "name":
+                where.append(f"{key} {op} ?")
+            else:
+                where.append("EXISTS (SELECT 1 FROM params p WHERE p.run = runs.id "
+                             f"AND p.key = ? AND p.{column} {op} ?)")
+                args.append(key)
+            args.append(value)
+        sql = "SELECT * FROM runs" + (" WHERE " + " AND ".join(where) if where else "") + " ORDER BY id"
+        return [self._row(row) for row in self.db.execute(sql, args)]
+
+    def _row(self, row):
+        run = dict(row)
+        run["columns"] = json.loads(run["columns"])
+        run["params"] = {key: value if text is None else text for key, value, text in self.db.execute(
+            "SELECT key, value, text FROM params WHERE run = ?", (run["id"],))}
+        run["staging"] = [ut for (ut,) in self.db.execute(
+            "SELECT ut FROM staging WHERE run = ? ORDER BY stage", (run["id"],))]
+        return run
+
+    def get(self, run):
+        row = self.db.execute("SELECT * FROM runs WHERE id = ?", (run,)).fetchone()
+        if row is None:
+            raise KeyError(run)
+        return self._row(row)
+
+    def load(self, run, columns=None):
+        """Колонки полета {имя: массив}; читаются только запрошенные."""
+        (path,) = self.db.execute("SELECT path FROM runs WHERE id = ?", (run,)).fetchone()
+        with np.load(os.path.join(self.root, path)) as npz:
+            return {c: npz[c] for c in (columns or npz.files)}
+
+    def load_many(self, runs, columns):
+        """Одни и те же колонки нескольких полетов: {номер: {имя: массив}}."""
+        return {run: self.load(run, columns) for run in runs}
+
+    def close(self):
+        self.db.close()
+
+
+if __name__ == "__main__":
+    archive = Archive(sys.argv[1])
+    if sys.argv[2:3] == ["--add"]:
+        from ksp_telemetry import open_telemetry
+        for path in sys.argv[3:]:
+            name = os.path.splitext(os.path.basename(path))[0]
+            print(f"{path}: полет {archive.add(name, open_telemetry(path))}")
+    else:
+        start = time.perf_counter()
+        runs = archive.query(*sys.argv[2:])
+        elapsed = time.perf_counter() - start
+        for run in runs:
+            print(f"{run['id']:5d} {run['name']:12s} Ap {run['apoapsis'] or 0:10.0f} "
+                  f"Pe {run['periapsis'] or 0:10.0f} max Q {run['max_q'] or 0:8.0f} {run['params']}")
+        print(f"Найдено {len(runs)} полетов за {elapsed * 1000:.1f} мс")
+    archive.close()
@@ -0,0 +1,313 @@
+"""Пакетная модель выведения на NumPy для подбора гравитационного разворота.
+
+Тысячи вариантов профиля (одна строка массива на вариант) интегрируются
+одновременно той же физикой, что и в ksp_sim: точечная масса, ступени,
+атмосфера из таблиц ksp_physics и тяга, зависящая от давления.
+
+Профиль - это высоты начала и конца разворота (как turn_start_altitude и
+turn_end в missions/kpkp.toml) и форма кривой: тангаж падает от 90 до 0 как
+90 * (1 - frac ** shape), при shape = 1 получается линейный разворот kpkp.py.
+Двигатель выключается, когда апоцентр доходит до целевого.
+
+    python ksp_batch.py 10000
+"""
+import sys
+import time
+
+import numpy as np
+
+from ksp_physics import KERBIN, ROCKET, SEA_LEVEL, body_model, g0
+
+# Границы поиска профиля: (минимум, максимум)
+BOUNDS = {
+    "turn_start": (100.0, 5000.0),
+    "turn_end": (20000.0, 80000.0),
+    "shape": (0.3, 1.5),
+}
+
+
+def stages_from_burn_times(stages, isp=300.0, dry_fraction=0.15):
+    """Превращает таблицу [{thrust, burn_time}, ...] (ракета kpkp.py) в ступени модели.
+
+    Масса топлива восстанавливается по расходу thrust / (isp * g0),
+    сухая масса - долей dry_fraction от топлива.
+    """
+    result = []
+    for s in stages:
+        fuel = s["thrust"] * s["burn_time"] / (isp * g0)
+        result.append({"resource": "LiquidFuel", "dry_mass": fuel * dry_fraction,
+                       "fuel_mass": fuel, "thrust": s["thrust"],
+                       "thrust_sl": s["thrust"] * SEA_LEVEL, "isp": isp})
+    return result
+
+
+def _column(stages, key, n):
+    # Параметры ступеней могут быть числами или массивами длины n
+    return np.stack([np.broadcast_to(np.asarray(s[key], float), (n,)) for s in stages], axis=1)
+
+
+def apsides(x, y, vx, vy, mu, radius):
+    """Высоты апоцентра и перицентра для массивов векторов состояния.
+
+    Правило ksp_orbit.apsides: у разомкнутой орбиты апоцентр inf, а
+    перицентр h^2 / (mu (1 + e)).
+    """
+    r = np.hypot(x, y)
+    v2 = vx * vx + vy * vy
+    energy = v2 / 2 - mu / r
+    h = x * vy - y * vx
+    e = np.sqrt(np.maximum(0.0, 1 + 2 * energy * h * h / (mu * mu)))
+    closed = energy < 0
+    a = -mu / (2 * np.minimum(energy, -1e-12))
+    apoapsis = np.where(closed, a * (1 + e) - radius, np.inf)
+    periapsis = np.where(closed, a * (1 - e), h * h / (mu * (1 + e))) - radius
+    return apoapsis, periapsis
+
+
+def simulate(profiles, rocket=None, body=None, target_apoapsis=80000.0, dt=0.1, t_max=600.0):
+    """Интегрирует все профили сразу.
+
+    profiles - словарь массивов turn_start, turn_end и (необязательно) shape.
+    Параметры ракеты и характерная высота атмосферы тела (scale_height)
+    могут быть массивами длины n для разброса по вариантам.
+    Возвращает словарь массивов: apoapsis, periapsis, delta_v (оставшаяся),
+    circularization_dv, max_q, t_cutoff, ok.
+    """
+    rocket = rocket or ROCKET
+    body = body or KERBIN
+    turn_start = np.asarray(profiles["turn_start"], float)
+    n = turn_start.size
+    turn_end = np.broadcast_to(np.asarray(profiles["turn_end"], float), (n,))
+    shape = np.broadcast_to(np.asarray(profiles.get("shape", 1.0), float), (n,))
+
+    stages = rocket["stages"]
+    S = len(stages)
+    dry = _column(stages, "dry_mass", n)
+    fuel = _column(stages, "fuel_mass", n).copy()
+    thrust_vac = _column(stages, "thrust", n)
+    thrust_sl = _column(stages, "thrust_sl", n)
+    isp = _column(stages, "isp", n)
+    payload = np.broadcast_to(np.asarray(rocket["payload"], float), (n,))
+    cd_area = np.broadcast_to(np.asarray(rocket["cd_area"], float), (n,))
+
+    mu, R = body["mu"], body["radius"]
+    atm = body["atmosphere_depth"]
+    model = body_model(body)
+    # Разброс характерной высоты (ksp_dispersion) - масштабом высоты в
+    # таблице средней атмосферы: для экспоненты это то же exp(-h / H)
+    H = np.broadcast_to(np.asarray(body["scale_height"], float), (n,))
+    stretch = model.scale_height / H
+    stage_ids = np.arange(S)
+
+    # Состояние летящих вариантов; закончившие выбывают из массивов,
+    # так что каждый шаг считается только по оставшимся строкам
+    st = {
+        "idx": np.arange(n),
+        "x": np.zeros(n), "y": np.full(n, R), "vx": np.zeros(n), "vy": np.zeros(n),
+        "k": np.zeros(n, dtype=int),
+        "m": payload + (dry + fuel).sum(axis=1),
+        "f_k": fuel[:, 0].copy(),
+        "burning": np.ones(n, dtype=bool),
+        "max_q": np.zeros(n),
+        "turn_start": turn_start, "turn_end": turn_end, "shape": shape,
+        "cd_area": cd_area, "stretch": stretch,
+    }
+
+    def load_stage(sel):
+        # Параметры текущей ступени для выбранных строк
+        i, j = st["idx"][sel], st["k"][sel]
+        st["tv"][sel] = thrust_vac[i, j]
+        st["ts"][sel] = thrust_sl[i, j]
+        st["mdot"][sel] = thrust_vac[i, j] / (isp[i, j] * g0)
+
+    st["tv"], st["ts"], st["mdot"] = np.empty(n), np.empty(n), np.empty(n)
+    load_stage(slice(None))
+
+    apo = np.full(n, np.nan)
+    peri = np.full(n, np.nan)
+    max_q = np.zeros(n)
+    k_final = np.zeros(n, dtype=int)
+    ok = np.zeros(n, dtype=bool)
+    t_cutoff = np.full(n, np.nan)
+
+    def retire(sel, ap, pe):
+        i = st["idx"][sel]
+        apo[i], peri[i] = ap[sel], pe[sel]
+        max_q[i] = st["max_q"][sel]
+        k_final[i] = st["k"][sel]
+        fuel[i, st["k"][sel]] = st["f_k"][sel]
+
+    t = 0.0
+    while t < t_max and st["idx"].size:
+        x, y, vx, vy = st["x"], st["y"], st["vx"], st["vy"]
+        m, f_k, burning = st["m"], st["f_k"], st["burning"]
+        r = np.hypot(x, y)
+        h = r - R
+        ux, uy = x / r, y / r
+
+        # Атмосфера
+        p = np.where(h < atm, model.ratio(h * st["stretch"]), 0.0)
+        v = np.hypot(vx, vy)
+        q = 0.5 * model.rho0 * p * v * v
+        np.maximum(st["max_q"], q, out=st["max_q"])
+
+        # Тангаж по профилю
+        frac = np.clip((h - st["turn_start"]) / (st["turn_end"] - st["turn_start"]), 0.0, 1.0)
+        pitch = np.radians(90.0 * (1.0 - frac ** st["shape"]))
+
+        # Тяга текущей ступени и расход топлива
+        full = st["mdot"] * dt
+        burned = np.where(burning, np.minimum(full, f_k), 0.0)
+        thrust = (st["tv"] - (st["tv"] - st["ts"]) * p) * (burned / full)
+        f_k -= burned
+        a_t = thrust / m
+        m -= burned
+
+        s_p, c_p = np.sin(pitch), np.cos(pitch)
+        g = mu / (r * r)
+        drag = q * st["cd_area"] / m / np.maximum(v, 1e-9)
+        ax = -g * ux + a_t * (s_p * ux + c_p * uy) - drag * vx
+        ay = -g * uy + a_t * (s_p * uy - c_p * ux) - drag * vy
+
+        # На столе, пока тяга не превысит вес
+        held = (v < 1e-6) & (ax * ux + ay * uy <= 0)
+        ax[held] = 0.0
+        ay[held] = 0.0
+
+        vx += ax * dt
+        vy += ay * dt
+        x += vx * dt
+        y += vy * dt
+        t += dt
+
+        # Отделение пустой ступени
+        empty = (f_k <= 0) & (st["k"] < S - 1)
+        if empty.any():
+            i, j = st["idx"][empty], st["k"][empty]
+            fuel[i, j] = 0.0
+            m[empty] -= dry[i, j]
+            st["k"][empty] += 1
+            f_k[empty] = fuel[i, j + 1]
+            load_stage(empty)
+
+        # Выключение двигателя по апоцентру
+        ap, pe = apsides(x, y, vx, vy, mu, R)
+        cut = burning & (ap >= target_apoapsis)
+        if cut.any():
+            t_cutoff[st["idx"][cut]] = t
+            burning &= ~cut
+
+        # Вариант закончен: вышел из атмосферы на выключенном двигателе,
+        # израсходовал все топливо и падает или упал
+        r = np.hypot(x, y)
+        escaped = ~burning & (r - R >= atm)
+        spent = ~burning | ((st["k"] == S - 1) & (f_k <= 0))
+        falling = (x * vx + y * vy < 0) & ~held & (t > 1.0)
+        finished = escaped | (falling & spent) | (r < R)
+        if finished.any():
+            retire(finished, ap, pe)
+            ok[st["idx"][escaped]] = True
+            keep = ~finished
+            for key in st:
+                st[key] = st[key][keep]
+
+    # Не закончившие к t_max - по текущему состоянию
+    if st["idx"].size:
+        ap, pe = apsides(st["x"], st["y"], st["vx"], st["vy"], mu, R)
+        retire(slice(None), ap, pe)
+    final = {"apoapsis": apo, "periapsis": peri}
+    k = k_final
+
+    # Оставшаяся характеристическая скорость по формуле Циолковского
+    upper = stage_ids[None, :] >= k[:, None]
+    m_stack = payload + ((dry + fuel) * upper).sum(axis=1)
+    delta_v = np.zeros(n)
+    for j in range(S):
+        live = j >= k
+        m1 = m_stack - fuel[:, j]
+        delta_v += np.where(live, isp[:, j] * g0 * np.log(m_stack / m1), 0.0)
+        m_stack = np.where(live, m1 - dry[:, j], m_stack)
+
+    # Импульс на скругление орбиты в апоцентре
+    ra = final["apoapsis"] + R
+    rp = np.maximum(final["periapsis"] + R, 1.0)
+    with np.errstate(invalid="ignore"):
+        v_ap = np.sqrt(2 * mu * rp / (ra * (ra + rp)))
+        circ = np.sqrt(mu / ra) - v_ap
+
+    return {
+        "apoapsis": final["apoapsis"],
+        "periapsis": final["periapsis"],
+        "delta_v": delta_v,
+        "circularization_dv": circ,
+        "max_q": max_q,
+        "t_cutoff": t_cutoff,
+        "ok": ok,
+    }
+
+
+def score(results, target_apoapsis=None, max_q=None, tolerance=0.98):
+    """Запас характеристической скорости после скругления; -inf для неудач.
+
+    Вариант неудачен, если не вышел из атмосферы, потерял на сопротивлении
+    больше (1 - tolerance) целевого апоцентра или превысил max_q.
+    """
+    value = results["delta_v"] - results["circularization_dv"]
+    good = results["ok"] & np.isfinite(value)
+    if target_apoapsis is not None:
+        good &= results["apoapsis"] >= target_apoapsis * tolerance
+    if max_q is not None:
+        good &= results["max_q"] <= max_q
+    return np.where(good, value, -np.inf)
+
+
+def sample_profiles(n, rng, bounds=None):
+    bounds = bounds or BOUNDS
+    return {key: rng.uniform(lo, hi, n) for key, (lo, hi) in bounds.items()}
+
+
+def search(rocket=None, target_apoapsis=80000.0, n=10000, rounds=3, elite=0.05,
+           max_q=None, seed=None, body=None, dt=0.1):
+    """Подбирает лучший профиль разворота для ракеты.
+
+    Первый раунд - равномерная выборка по BOUNDS, следующие - выборка вокруг
+    лучших elite долей вариантов предыдущего раунда (метод кросс-энтропии).
+    Возвращает (лучший профиль, его результаты).
+    """
+    rng = np.random.default_rng(seed)
+    profiles = sample_profiles(n, rng)
+    best, best_score = None, -np.inf
+    for _ in range(rounds):
+        results = simulate(profiles, rocket, body, target_apoapsis, dt=dt)
+        scores = score(results, target_apoapsis, max_q)
+        i = int(np.argmax(scores))
+        if scores[i] > best_score:
+            best_score = scores[i]
+            best = ({key: float(v[i]) for key, v in profiles.items()},
+                    {key: v[i].item() for key, v in results.items()})
+        top = np.argsort(scores)[-max(2, int(n * elite)):]
+        top = top[np.isfinite(scores[top])]
+        if top.size < 2:
+            profiles = sample_profiles(n, rng)
+            continue
+        new = {}
+        for key, (lo, hi) in BOUNDS.items():
+            values = profiles[key][top]
+            std = max(values.std(), (hi - lo) * 0.01)
+            new[key] = np.clip(rng.normal(values.mean(), std, n), lo, hi)
+        profiles = new
+    return best
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    start = time.perf_counter()
+    results = simulate(sample_profiles(n, np.random.default_rng(0)))
+    print(f"{n} вариантов за {time.perf_counter() - start:.2f} с, "
+          f"успешных: {int(results['ok'].sum())}")
+    start = time.perf_counter()
+    best = search(n=n, seed=0)
+    print(f"Поиск за {time.perf_counter() - start:.2f} с")
+    if best is not None:
+        print("Профиль:", best[0])
+        print("Результат:", best[1])
@@ -0,0 +1,312 @@
+"""Набор замеров производительности без игры: циклы скриптов, физика, телеметрия.
+
+Все идет на модели ksp_sim с задержкой каждого RPC (latency), так что
+прогоны повторяемы и не требуют сервера kRPC:
+
+    - циклы управления: такты в секунду для миссий kpkp.py, ksp_tel.py
+      и ksppp.py (профили ksp_mission). Такт - один ControlOutputs.flush(),
+      скрипт останавливается после ticks тактов; кроме скорости по часам
+      считается процессорное время такта - его не сбивают процесс
+      рисования и другие процессы на том же ядре;
+    - функции такта: таблицы тела ksp_physics (pressure, thrust) и законы
+      тангажа ksp_mission: нс на вызов, лучший из повторов;
+    - телеметрия: TelemetryBuffer.append и data(), LivePlot.append,
+      обновление кривой в процессе рисования (Decimator) и разбор полета
+      ksp_analytics.analyze при растущем числе отсчетов;
+    - трансляция: Broadcaster.publish в кольцо и в рассылку UDP.
+
+Результаты - JSON {имя: {value, unit, better}}; сравнение с сохраненной
+базой отмечает ухудшения больше порога:
+
+    python ksp_bench.py --save              # записать базу ksp_bench.json
+    python ksp_bench.py                     # сравнить с базой, код 1 при регрессии
+    python ksp_bench.py --quick --latency 0.005 --threshold 0.2
+
+База пишется только с --save; неизвестный флаг (--help выводит справку)
+завершает скрипт до прогона.
+"""
+import contextlib
+import io
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+
+import ksp_sim
+from ksp_control import ControlOutputs
+from ksp_startup import abandon
+
+BASELINE = "ksp_bench.json"
+THRESHOLD = 0.2  # допустимое ухудшение, доля (разброс прогонов на одной машине - до 10-15%)
+LATENCY = 0.002  # задержка одного RPC модели, с
+REPEATS = 5
+LOOP_REPEATS = 3  # прогонов цикла; берется лучший
+
+# Скрипт -> тактов в замере
+SCRIPTS = {"kpkp.py": 1000, "ksp_tel.py": 1000, "ksppp.py": 1000}
+SIZES = (1000, 10000, 100000, 1000000)
+QUICK_SIZES = (1000, 10000, 100000)
+
+
+class _Done(BaseException):
+    # Нужное число тактов набрано; BaseException - скрипт не перехватит
+    pass
+
+
+class _Ticks:
+    # Счетчик тактов: оборачивает ControlOutputs.flush на время прогона
+    def __init__(self, sim, limit):
+        self.sim = sim
+        self.limit = limit
+        self.count = 0
+        self.first = None  # (реальное время, процессорное время) на первом такте
+        self.last = None
+
+    def __enter__(self):
+        flush = self.flush = ControlOutputs.flush
+        ticks = self
+
+        def counted(outputs):
+            result = flush(outputs)
+            ticks.tick()
+            return result
+
+        ControlOutputs.flush = counted
+        return self
+
+    def __exit__(self, *exc):
+        ControlOutputs.flush = self.flush
+
+    def tick(self):
+        now = (time.perf_counter(), time.process_time())
+        if self.first is None:
+            self.first = now
+        self.last = now
+        self.count += 1
+        if self.count > self.limit:
+            raise _Done()
+
+
+def loop(script, ticks, latency=LATENCY):
+    """Прогон скрипта до ticks тактов; возвращает замеры или None."""
+    sim = ksp_sim.Simulator()
+    sim.activate_next_stage()  # Первая ступень запущена, как после отрыва от стартового стола
+    # Скрипт ищет профиль рядом с собой, а работает во временном каталоге
+    namespace = {"__name__": "__main__", "__file__": os.path.abspath(script)}
+    with open(script, "rb") as f:
+        code = compile(f.read(), script, "exec")
+    with tempfile.TemporaryDirectory() as tmp:
+        cwd = os.getcwd()
+        os.chdir(tmp)  # Файлы телеметрии и графики - во временный каталог
+        try:
+            with _Ticks(sim, ticks) as counter, ksp_sim.install(sim, latency) as env, \
+                    contextlib.redirect_stdout(io.StringIO()):
+                try:
+                    exec(code, namespace)
+                except (_Done, ksp_sim.SimTimeout):
+                    pass
+        finally:
+            abandon(namespace, wait=True)  # Картинка пишется, пока каталог еще есть
+            os.chdir(cwd)
+    n = counter.count - 1  # Интервалов между первым и последним тактом
+    if n < 1:
+        return None
+    wall = counter.last[0] - counter.first[0]
+    cpu = counter.last[1] - counter.first[1]
+    return {"ticks": n, "ticks_per_s": n / wall, "cpu_ms": cpu / n * 1000,
+            "rpc": env.rpc_count}
+
+
+def best(func, args, repeats=REPEATS):
+    """Лучшее время одного вызова по списку аргументов, нс."""
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        for a in args:
+            func(*a)
+        times.append(time.perf_counter() - start)
+    return min(times) / len(args) * 1e9
+
+
+def micro(altitudes):
+    """Функции такта по списку высот: таблицы тела и законы тангажа, нс на вызов."""
+    from types import SimpleNamespace
+    from ksp_mission import law_k, law_linear
+    from ksp_physics import KERBIN, body_model
+
+    physics = body_model(KERBIN)
+    snaps = [SimpleNamespace(altitude=h) for h in altitudes]
+    return {
+        "micro.physics.pressure.ns": best(physics.pressure, [(h,) for h in altitudes]),
+        "micro.physics.thrust.ns": best(physics.thrust, [(400000.0, None, h) for h in altitudes]),
+        "micro.mission.law_linear.ns": best(law_linear, [({"target": 939000}, s) for s in snaps]),
+        "micro.mission.law_k.ns": best(law_k, [({"k": 0.00001}, s) for s in snaps]),
+    }
+
+
+def telemetry(sizes, batch=32):
+    """Цена отсчета телеметрии при растущем числе отсчетов."""
+    from ksp_plot import Decimator, POINTS
+    from ksp_analytics import analyze
+    from ksp_telemetry import TelemetryBuffer, open_telemetry
+    import numpy as np
+
+    results = {}
+    fields = ["time", "altitude", "velocity", "pitch", "apoapsis", "periapsis"]
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in sizes:
+            path = os.path.join(tmp, f"{n}.tlm")
+            buffer = TelemetryBuffer(fields, path=path)
+            start = time.perf_counter()
+            for i in range(n):
+                buffer.append(i * 0.1, i, i, i, i, i)
+            results[f"telemetry.append_ns.{n}"] = (time.perf_counter() - start) / n * 1e9
+            times = []
+            for _ in range(REPEATS):
+                start = time.perf_counter()
+                buffer.data()["altitude"].max()
+                times.append(time.perf_counter() - start)
+            results[f"telemetry.data_ms.{n}"] = min(times) * 1000
+            buffer.close()
+
+            # Разбор полета после посадки: все производные каналы и сводка
+            data = open_telemetry(path)
+            times = []
+            for _ in range(REPEATS):
+                start = time.perf_counter()
+                analyze(data, staging=[n * 0.05])
+                times.append(time.perf_counter() - start)
+            results[f"analytics.analyze_ms.{n}"] = min(times) * 1000
+            del data
+
+            # Процесс рисования: одно обновление кривой после n отсчетов
+            decimator = Decimator(POINTS)
+            t = np.arange(n, dtype=np.float64)
+            decimator.extend(t, np.sin(t))
+            block = np.arange(n, n + batch, dtype=np.float64)
+            times = []
+            for _ in range(REPEATS):
+                start = time.perf_counter()
+                decimator.extend(block, np.sin(block))
+                decimator.xy()
+                times.append(time.perf_counter() - start)
+                block += batch
+            results[f"plot.update_us.{n}"] = min(times) * 1e6
+    return results
+
+
+def plot_append(n=20000):
+    """Цена LivePlot.append в процессе управления, нс."""
+    from ksp_plot import LivePlot
+
+    with tempfile.TemporaryDirectory() as tmp:
+        plot = LivePlot(["time", "altitude"], [{"title": "", "ylabel": "", "series": [("altitude", None)]}],
+                        mode="png", path=os.path.join(tmp, "bench.png"))
+        start = time.perf_counter()
+        for i in range(n):
+            plot.append(i * 0.1, i)
+        elapsed = time.perf_counter() - start
+        plot.close()
+    return elapsed / n * 1e9
+
+
+# Единица и направление: higher - больше лучше, lower - меньше лучше
+UNITS = {"ticks_per_s": ("1/s", "higher"), "cpu_ms": ("ms", "lower"), "ns": ("ns", "lower"),
+         "append_ns": ("ns", "lower"), "data_ms": ("ms", "lower"), "update_us": ("us", "lower"),
+         "analyze_ms": ("ms", "lower")}
+
+
+def _entry(name, value):
+    for key, (unit, better) in UNITS.items():
+        if f".{key}" in name or name.endswith(f"_{key}"):
+            return {"value": value, "unit": unit, "better": better}
+    return {"value": value, "unit": "", "better": "lower"}
+
+
+def run(latency=LATENCY, quick=False, scripts=None):
+    """Все замеры; возвращает {имя: {value, unit, better}}."""
+    results = {}
+    altitudes = [(i * 97.0) % 100000.0 for i in range(1000)]
+    for script in scripts or SCRIPTS:
+        ticks = SCRIPTS[script]
+        name = os.path.splitext(os.path.basename(script))[0]
+        runs = [loop(script, ticks // 3 if quick else ticks, latency)
+                for _ in range(1 if quick else LOOP_REPEATS)]
+        runs = [stats for stats in runs if stats is not None]
+        if not runs:
+            print(f"{script}: цикл не дошел до тактов", file=sys.stderr)
+        else:
+            results[f"loop.{name}.ticks_per_s"] = max(r["ticks_per_s"] for r in runs)
+            results[f"loop.{name}.cpu_ms"] = min(r["cpu_ms"] for r in runs)
+    results.update(micro(altitudes))
+    results.update(telemetry(QUICK_SIZES if quick else SIZES))
+    results["plot.append_ns"] = plot_append()
+    from ksp_broadcast import bench
+    for target, ns in bench(20000).items():
+        results[f"broadcast.{target}.publish_ns"] = ns
+    return {name: _entry(name, value) for name, value in results.items()}
+
+
+def save(results, path=BASELINE, latency=LATENCY):
+    meta = {"created": time.time(), "python": platform.python_version(),
+            "machine": platform.machine(), "node": platform.node(), "latency": latency}
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump({"meta": meta, "results": results}, f, ensure_ascii=False, indent=2)
+    os.replace(path + ".tmp", path)
+
+
+def load(path=BASELINE):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def compare(results, baseline, threshold=THRESHOLD):
+    """Строки сравнения и список регрессий (имя, база, сейчас, изменение)."""
+    lines, regressions = [], []
+    for name, entry in results.items():
+        value = entry["value"]
+        base = baseline.get(name, {}).get("value")
+        if not base:
+            lines.append(f"  {name:42s} {value:12.4g} {entry['unit']:4s}  (нет в базе)")
+            continue
+        change = value / base - 1
+        worse = -change if entry["better"] == "higher" else change
+        mark = ""
+        if worse > threshold:
+            mark = "  РЕГРЕССИЯ"
+            regressions.append((name, base, value, change))
+        lines.append(f"  {name:42s} {value:12.4g} {entry['unit']:4s} {change * 100:+7.1f}%{mark}")
+    return lines, regressions
+
+
+def _arguments(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(description="Замеры производительности на модели ksp_sim.")
+    parser.add_argument("--latency", type=float, default=LATENCY, help="задержка одного RPC модели, с")
+    parser.add_argument("--threshold", type=float, default=THRESHOLD, help="допустимое ухудшение, доля")
+    parser.add_argument("--baseline", default=BASELINE, help="файл базы для сравнения")
+    parser.add_argument("--quick", action="store_true", help="короткие прогоны")
+    parser.add_argument("--save", action="store_true", help="записать результаты как новую базу")
+    return parser.parse_args(argv)  # Неизвестный флаг - ошибка до прогона, база не трогается
+
+
+if __name__ == "__main__":
+    args = _arguments()
+    os.environ["MPLBACKEND"] = "Agg"
+    for variable in ("KSP_RECORD", "KSP_METRICS", "KSP_ARCHIVE"):
+        os.environ.pop(variable, None)  # Замер без журналов и архива
+    latency, threshold, path = args.latency, args.threshold, args.baseline
+    results = run(latency, quick=args.quick)
+    baseline = load(path) if os.path.exists(path) else None
+    if baseline is not None and baseline["meta"].get("latency") != latency:
+        print(f"Внимание: база снята с latency {baseline['meta'].get('latency')}", file=sys.stderr)
+    lines, regressions = compare(results, baseline["results"] if baseline else {}, threshold)
+    print("\n".join(lines))
+    if args.save:
+        save(results, path, latency)
+        print(f"База записана в {path}")
+    elif regressions:
+        print(f"Ухудшение больше {threshold * 100:.0f}%: {len(regressions)}")
+        sys.exit(1)
@@ -0,0 +1,404 @@
+"""Трансляция телеметрии полета для нескольких потребителей на той же машине.
+
+Пульты, самописец и анализ смотрят полет вживую, не открывая своих
+подключений к kRPC (каждое - лишняя нагрузка на сервер). Скрипт один раз
+за такт публикует снимок TelemetryStream из save_telemetry() кадром
+фиксированного формата: float64 на каждое поле снимка в порядке
+Snapshot._fields, None - nan. Транспорты:
+
+    - shm: кольцо кадров в разделяемой памяти (файл в /dev/shm, mmap)
+
+          заголовок: MAGIC, длина и JSON описания (имя, поля, слотов)
+          счетчики:  записано кадров, полет завершен - своя строка кэша
+          слоты:     slots кадров подряд, кадр n - в слоте n % slots
+
+      publish() - два struct.pack_into без системных вызовов: кадр в слот,
+      затем счетчик. Читатели отображают тот же файл и видят кольцо как
+      массив NumPy без копирования; отставший читатель теряет старые
+      кадры, но писателя не тормозит. Новый полет заменяет файл целиком,
+      читатели переоткрывают его сами;
+    - udp: групповая рассылка (multicast) с TTL 0 - только эта машина.
+      Один sendto на кадр, сокет неблокирующий: переполненный буфер
+      теряет кадр, а не задерживает такт. Описание полей рассылается
+      раз в ANNOUNCE кадров, так что подключиться можно в любой момент.
+
+    broadcast = Broadcaster.from_env("ksp_tel")  # KSP_BROADCAST=shm | udp[://группа:порт] | shm,udp
+    broadcast.publish(snap)
+    broadcast.close()
+
+    reader = subscribe("shm", "ksp_tel")
+    frames = reader.read()  # новые кадры: структурированный массив
+    frames["altitude"].max()
+
+    python ksp_broadcast.py ksp_tel                      # пульт в терминале
+    python ksp_broadcast.py ksp_tel udp --tlm live.tlm   # самописец из рассылки
+"""
+import json
+import math
+import mmap
+import os
+import socket
+import struct
+import sys
+import tempfile
+import time
+
+from ksp_startup import lazy
+
+np = lazy("numpy")  # нужен только читателям
+
+MAGIC = b"KSPBRD1\n"
+COUNTERS = struct.Struct("<QQ")  # записано кадров, полет завершен
+LINE = 64  # строка кэша: счетчики не делят ее с заголовком и кадрами
+SLOTS = 4096  # кадров в кольце: 200 с при 20 Гц
+GROUP = "239.255.42.99"
+PORT = 5642
+ANNOUNCE = 50  # кадров между рассылками описания полей
+DATAGRAM = struct.Struct("<cQ")  # вид, номер кадра
+RCVBUF = 1 << 22  # байт буфера приема читателя рассылки
+SPEC, FRAME, END = b"S", b"F", b"E"
+
+
+def ring_path(name):
+    """Файл кольца полета name: в /dev/shm, где он есть (память, не диск)."""
+    base = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+    return os.path.join(base, f"ksp-{name}.ring")
+
+
+def _address(target):
+    # "udp" или "udp://группа:порт" -> (группа, порт)
+    rest = target[len("udp://"):] if target.startswith("udp://") else ""
+    group, _, port = rest.partition(":")
+    return group or GROUP, int(port or PORT)
+
+
+def _values(snap):
+    return [math.nan if v is None else float(v) for v in snap]
+
+
+class Ring:
+    """Кольцо кадров полета name в разделяемой памяти (писатель).
+
+    Файл создается по первому снимку, когда известны поля, и остается
+    после close(): опоздавший читатель дочитает хвост полета.
+    """
+
+    def __init__(self, name, slots=SLOTS, path=None):
+        self.name = name
+        self.slots = slots
+        self.path = path or ring_path(name)
+        self.frame = None  # struct кадра - по первому снимку
+        self.seq = 0
+
+    def _open(self, fields):
+        spec = json.dumps({"name": self.name, "fields": list(fields), "slots": self.slots}).encode()
+        header = MAGIC + struct.pack("<H", len(spec)) + spec
+        self.base = (len(header) + LINE - 1) // LINE * LINE
+        self.data = self.base + LINE
+        self.frame = struct.Struct(f"<{len(fields)}d")
+        size = self.data + self.slots * self.frame.size
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(header.ljust(size, b"\0"))
+        self._file = open(tmp, "r+b")
+        self.map = mmap.mmap(self._file.fileno(), size)
+        os.replace(tmp, self.path)  # Читатели прошлого полета увидят новый файл
+
+    def publish(self, snap):
+        if self.frame is None:
+            self._open(snap._fields)
+        offset = self.data + (self.seq % self.slots) * self.frame.size
+        try:
+            self.frame.pack_into(self.map, offset, *snap)
+        except struct.error:  # None и прочее не-число
+            self.frame.pack_into(self.map, offset, *_values(snap))
+        self.seq += 1
+        COUNTERS.pack_into(self.map, self.base, self.seq, 0)  # Счетчик последним: кадр уже в слоте
+
+    def close(self):
+        if self.frame is not None and not self.map.closed:
+            COUNTERS.pack_into(self.map, self.base, self.seq, 1)
+            self.map.close()
+            self._file.close()
+
+
+class Multicast:
+    """Групповая рассылка кадров полета name по UDP (писатель)."""
+
+    def __init__(self, name, group=GROUP, port=PORT, announce=ANNOUNCE):
+        self.name = name
+        self.address = (group, port)
+        self.announce = announce
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_TTL, 0)
+        self.sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_LOOP, 1)
+        self.sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_IF, socket.inet_aton("127.0.0.1"))
+        self.sock.setblocking(False)
+        self.frame = None
+        self.seq = 0
+        self.dropped = 0  # кадров, не влезших в буфер сокета
+
+    def _send(self, data):
+        try:
+            self.sock.sendto(data, self.address)
+        except OSError:
+            self.dropped += 1
+
+    def publish(self, snap):
+        if self.frame is None:
+            self.frame = struct.Struct(f"<cQ{len(snap)}d")
+            self.spec = json.dumps({"name": self.name, "fields": list(snap._fields)}).encode()
+        if self.seq % self.announce == 0:
+            self._send(DATAGRAM.pack(SPEC, self.seq) + self.spec)
+        try:
+            data = self.frame.pack(FRAME, self.seq, *snap)
+        except struct.error:
+            data = self.frame.pack(FRAME, self.seq, *_values(snap))
+        self._send(data)
+        self.seq += 1
+
+    def close(self):
+        if self.sock.fileno() >= 0:
+            self._send(DATAGRAM.pack(END, self.seq))
+            self.sock.close()
+
+
+def _transport(name, target):
+    if target == "shm":
+        return Ring(name)
+    if target.startswith("udp"):
+        return Multicast(name, *_address(target))
+    raise ValueError(f"Неизвестный транспорт трансляции: {target!r}")
+
+
+class Broadcaster:
+    """Публикация снимков полета name по транспортам targets ("shm", "udp://...")."""
+
+    enabled = True
+
+    def __init__(self, name, targets=("shm",)):
+        self.name = name
+        self.transports = [_transport(name, target.strip()) for target in targets]
+
+    @classmethod
+    def from_env(cls, name, variable="KSP_BROADCAST"):
+        """Трансляция по переменной окружения (транспорты через запятую); без нее выключена."""
+        value = os.environ.get(variable)
+        if not value:
+            return NullBroadcaster()
+        return cls(name, value.split(","))
+
+    def publish(self, snap):
+        """Кадр из снимка TelemetryStream (namedtuple чисел); раз за такт."""
+        for transport in self.transports:
+            transport.publish(snap)
+
+    def close(self):
+        for transport in self.transports:
+            transport.close()
+
+
+class NullBroadcaster:
+    """Трансляция выключена."""
+
+    enabled = False
+
+    def publish(self, snap):
+        pass
+
+    def close(self):
+        pass
+
+
+class RingReader:
+    """Читатель кольца полета name: новые кадры с прошлого read().
+
+    Кольцо отображено только на чтение; view - весь массив слотов без
+    копирования (слоты переписываются на ходу), read() копирует новые
+    кадры и отбрасывает те, что писатель успел перезаписать (lost).
+    """
+
+    def __init__(self, name=None, path=None, timeout=None):
+        self.path = path or ring_path(name)
+        self.map = None
+        self._open(timeout)
+
+    def _open(self, timeout=None):
+        start = time.monotonic()
+        while not os.path.exists(self.path):
+            if timeout is not None and time.monotonic() - start > timeout:
+                raise TimeoutError(f"Нет трансляции: {self.path}")
+            time.sleep(0.1)
+        if self.map is not None:
+            self.view = None  # Иначе mmap не закрыть: на него ссылается массив
+            self.map.close()
+        with open(self.path, "rb") as f:
+            self.inode = os.fstat(f.fileno()).st_ino
+            self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self.map[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{self.path}: не кольцо трансляции")
+        (length,) = struct.unpack_from("<H", self.map, len(MAGIC))
+        spec = json.loads(self.map[len(MAGIC) + 2:len(MAGIC) + 2 + length])
+        self.name = spec["name"]
+        self.fields = spec["fields"]
+        self.slots = spec["slots"]
+        self.base = (len(MAGIC) + 2 + length + LINE - 1) // LINE * LINE
+        self.dtype = np.dtype([(field, "<f8") for field in self.fields])
+        self.view = np.frombuffer(self.map, self.dtype, count=self.slots, offset=self.base + LINE)
+        self.cursor = 0
+        self.lost = 0
+        self.done = False
+
+    def _replaced(self):
+        try:
+            return os.stat(self.path).st_ino != self.inode
+        except FileNotFoundError:
+            return False
+
+    def read(self):
+        """Новые кадры (копия, структурированный массив); после нового старта - с его начала."""
+        head, done = COUNTERS.unpack_from(self.map, self.base)
+        if head == self.cursor and self._replaced():
+            self._open()  # Новый полет: файл заменен
+            head, done = COUNTERS.unpack_from(self.map, self.base)
+        self.done = bool(done)
+        # Слот кадра head (он же кадра head - slots) может писаться прямо сейчас
+        first = max(self.cursor, head - self.slots + 1)
+        frames = self.view[np.arange(first, head) % self.slots]
+        # Кадры, которые писатель успел перезаписать, пока шло копирование
+        (after,) = struct.unpack_from("<Q", self.map, self.base)
+        stale = max(0, after - self.slots + 1 - first)
+        self.lost += first - self.cursor + min(stale, len(frames))
+        self.cursor = head
+        return frames[stale:]
+
+    def latest(self):
+        """Последний кадр (копия) или None."""
+        head, _ = COUNTERS.unpack_from(self.map, self.base)
+        return self.view[(head - 1) % self.slots].copy() if head else None
+
+    def close(self):
+        self.view = None
+        self.map.close()
+
+
+class MulticastReader:
+    """Читатель рассылки: кадры полета name (None - первого услышанного)."""
+
+    def __init__(self, name=None, group=GROUP, port=PORT):
+        self.name = name
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)  # Несколько читателей на порту
+        # Запас на опрос раз в десятки мс; ядро ограничит его net.core.rmem_max
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, RCVBUF)
+        self.sock.bind(("", port))
+        self.sock.setsockopt(socket.IPPROTO_IP, socket.IP_ADD_MEMBERSHIP,
+                             socket.inet_aton(group) + socket.inet_aton("127.0.0.1"))
+        self.sock.setblocking(False)
+        self.source = None  # адрес выбранного писателя
+        self.fields = self.dtype = None
+        self.cursor = None
+        self.lost = 0
+        self.done = False
+
+    def read(self):
+        """Новые кадры из буфера сокета; до описания полей - пустой список."""
+        payloads = []
+        while True:
+            try:
+                data, source = self.sock.recvfrom(65536)
+            except BlockingIOError:
+                break
+            kind, seq = DATAGRAM.unpack_from(data)
+            if kind == SPEC and self.source is None:
+                spec = json.loads(data[DATAGRAM.size:])
+                if self.name in (None, spec["name"]):
+                    self.source, self.name, self.fields = source, spec["name"], spec["fields"]
+                    self.dtype = np.dtype([(field, "<f8") for field in self.fields])
+                    self.cursor = seq
+                continue
+            if source != self.source:
+                continue
+            if kind == END:
+                self.done = True
+            elif kind == FRAME:
+                if seq > self.cursor:
+                    self.lost += seq - self.cursor
+                self.cursor = seq + 1
+                payloads.append(data[DATAGRAM.size:])
+        if self.dtype is None:
+            return []
+        return np.frombuffer(b"".join(payloads), self.dtype)
+
+    def close(self):
+        self.sock.close()
+
+
+def subscribe(target, name=None, timeout=None):
+    """Читатель транспорта target ("shm" или "udp[://группа:порт]") для полета name."""
+    if target == "shm":
+        return RingReader(name, timeout=timeout)
+    if target.startswith("udp"):
+        return MulticastReader(name, *_address(target))
+    raise ValueError(f"Неизвестный транспорт трансляции: {target!r}")
+
+
+def bench(n=100000):
+    """Цена publish() в такте, нс: {транспорт: нс на кадр}."""
+    from collections import namedtuple
+
+    Snapshot = namedtuple("Snapshot", ["ut", "altitude", "speed", "pitch", "apoapsis",
+                                       "periapsis", "mass", "throttle", "fuel"])
+    snap = Snapshot(*range(9))
+    results = {}
+    for target in ("shm", "udp"):
+        broadcaster = Broadcaster(f"bench-{os.getpid()}", [target])
+        start = time.perf_counter()
+        for _ in range(n):
+            broadcaster.publish(snap)
+        results[target] = (time.perf_counter() - start) / n * 1e9
+        broadcaster.close()
+        if target == "shm":
+            os.remove(ring_path(broadcaster.name))
+    return results
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    if args[:1] == ["--bench"]:
+        for target, ns in bench().items():
+            print(f"{target}: {ns:.0f} нс на кадр")
+        sys.exit()
+    tlm = None
+    if "--tlm" in args:
+        i = args.index("--tlm")
+        tlm = args[i + 1]
+        del args[i:i + 2]
+    name = args[0] if args else "ksp_tel"
+    target = args[1] if len(args) > 1 else "shm"
+    reader = subscribe(target, name)
+    buffer = None
+    shown = 0.0
+    try:
+        while not reader.done:
+            frames = reader.read()
+            if len(frames):
+                if tlm is not None:
+                    if buffer is None:
+                        from ksp_telemetry import TelemetryBuffer
+                        buffer = TelemetryBuffer(reader.fields, path=tlm)
+                    for row in frames.tolist():
+                        buffer.append(*row)
+                if time.monotonic() - shown > 0.5:
+                    shown = time.monotonic()
+                    last = frames[-1]
+                    print("  ".join(f"{field} {last[field]:.6g}" for field in reader.fields[:8])
+                          + f"  потеряно {reader.lost}", flush=True)
+            time.sleep(0.05)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if buffer is not None:
+            buffer.close()
+            print(f"{len(buffer)} кадров записано в {tlm}")
+        reader.close()
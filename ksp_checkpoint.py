@@ -0,0 +1,323 @@
+"""Продолжение миссии после обрыва связи: контрольная точка и переподключение.
+
+Раньше обрыв соединения с kRPC посреди выведения ронял скрипт с
+исключением, а вместе с ним пропадали телеметрия в памяти и учет
+ступеней и фаза полета. Здесь два механизма:
+
+    - Checkpoint - запись фиксированного формата в файле, отображенном в
+      память (mmap). save() на каждом такте - два struct.pack_into, без
+      системных вызовов; запись чередуется между двумя слотами, номер
+      записи пишется последним, так что оборванная на середине запись не
+      портит предыдущую. Раз в sync секунд UT сбрасываются на диск буферы
+      телеметрии, курсор которых хранится в точке. Перезапущенный скрипт
+      читает точку через load() и продолжает с того же места;
+    - Session - подключение, которое переживает обрыв: guard() вокруг
+      такта ловит ошибку связи, переподключается с нарастающей паузой и
+      вызывает attach(conn) скрипта - тот заново берет корабль,
+      подписывается на потоки и перепривязывает ControlOutputs (rebind
+      повторно отправит автопилоту последние команды). Состояние в памяти
+      не теряется, управление возвращается через такт-другой.
+
+    checkpoint = Checkpoint("kpkp.ckpt", {"stage": "q", "stage_burn_start": "d", "staging": "8d"})
+    state = checkpoint.load()  # None - начинаем сначала
+    session = Session("KSP Autopilot", attach)
+    while True:
+        with session.guard():
+            ...
+            checkpoint.save(snap.ut, stage=current_stage, ...)
+
+Проверка на модели (check_resume): обрыв связи на заданном UT посреди
+полета, орбита должна совпасть с полетом без обрыва
+
+    python ksp_checkpoint.py kpkp.py 60
+    python ksp_checkpoint.py ksppp.py 60
+"""
+import json
+import math
+import mmap
+import os
+import struct
+import sys
+import time
+
+MAGIC = b"KSPCKP1\n"
+SEQ = struct.Struct("<Q")
+SYNC = 1.0  # с UT между сбросами буферов телеметрии на диск
+STALE = 2.0  # с без изменения UT в снимке до проверки связи RPC
+TOLERANCE = 0.02  # доля расхождения Ap/Pe полета с обрывом и без в проверке на модели
+
+
+def _codec(fields):
+    # Поле -> (код struct, длина списка): "d", "q", "?", "32s" (строка) - длина 0;
+    # "8d" - список не длиннее 8 значений, длиннее save() не запишет
+    layout = []
+    for name, code in fields.items():
+        kind = code[-1]
+        layout.append((name, kind, int(code[:-1]) if code[:-1] and kind != "s" else 0))
+    return layout
+
+
+class Checkpoint:
+    """Состояние миссии в файле path: поля fields {имя: код struct}.
+
+    buffers - объекты со spill() (TelemetryBuffer), сбрасываемые раз в sync
+    секунд UT, чтобы курсор телеметрии в точке не обгонял файл.
+    """
+
+    def __init__(self, path, fields, sync=SYNC, buffers=()):
+        self.path = path
+        self.layout = _codec(fields)
+        self.payload = struct.Struct("<d" + "".join(fields.values()))
+        self.sync = sync
+        self.buffers = list(buffers)
+        spec = json.dumps(fields).encode()
+        header = MAGIC + struct.pack("<H", len(spec)) + spec
+        self.base = (len(header) + 7) // 8 * 8
+        self.slot = (SEQ.size + self.payload.size + 7) // 8 * 8
+        size = self.base + 2 * self.slot
+        fresh = True
+        if os.path.exists(path) and os.path.getsize(path) == size:
+            with open(path, "rb") as f:
+                fresh = f.read(len(header)) != header  # Другой формат - начинаем заново
+        if fresh:
+            with open(path + ".tmp", "wb") as f:
+                f.write(header.ljust(size, b"\0"))
+            os.replace(path + ".tmp", path)
+        self._file = open(path, "r+b")
+        self.map = mmap.mmap(self._file.fileno(), size)
+        self.seq = max(self._slots(), default=(0,))[0]
+        self._synced = -math.inf
+
+    def _slots(self):
+        # Записанные слоты: (номер, смещение)
+        slots = []
+        for i in range(2):
+            offset = self.base + i * self.slot
+            (seq,) = SEQ.unpack_from(self.map, offset)
+            if seq:
+                slots.append((seq, offset))
+        return slots
+
+    def save(self, ut, **values):
+        """Записывает состояние на момент ut; вызывается на каждом такте."""
+        flat = [ut]
+        for name, kind, count in self.layout:
+            value = values.get(name)
+            if kind == "s":
+                flat.append((value or "").encode())  # struct обрежет или дополнит нулями
+            elif count:
+                items = list(value or ())
+                if len(items) > count:
+                    raise ValueError(f"Поле {name}: {len(items)} значений, в формате {count}")
+                flat.extend(items + [math.nan] * (count - len(items)))
+            else:
+                flat.append(math.nan if value is None and kind == "d" else value or 0)
+        self.seq += 1
+        offset = self.base + (self.seq % 2) * self.slot
+        self.payload.pack_into(self.map, offset + SEQ.size, *flat)
+        SEQ.pack_into(self.map, offset, self.seq)  # Номер последним: запись целиком или никак
+        if ut - self._synced >= self.sync:
+            self._synced = ut
+            for buffer in self.buffers:
+                buffer.spill()
+            # msync не нужен: страницы общего отображения переживают падение процесса
+
+    def load(self):
+        """Последнее сохраненное состояние {ut, поля...} или None."""
+        slots = self._slots()
+        if not slots:
+            return None
+        seq, offset = max(slots)
+        flat = list(self.payload.unpack_from(self.map, offset + SEQ.size))
+        state = {"ut": flat.pop(0)}
+        for name, kind, count in self.layout:
+            if kind == "s":
+                state[name] = flat.pop(0).rstrip(b"\0").decode()
+            elif count:
+                items, flat = flat[:count], flat[count:]
+                state[name] = [v for v in items if not math.isnan(v)]
+            else:
+                value = flat.pop(0)
+                state[name] = None if kind == "d" and math.isnan(value) else value
+        return state
+
+    def clear(self):
+        """Миссия завершена: следующий запуск начнет сначала."""
+        self.close()
+        os.remove(self.path)
+
+    def close(self):
+        if not self.map.closed:
+            self.map.flush()
+            self.map.close()
+            self._file.close()
+
+
+def disconnected(exc):
+    """Ошибка - обрыв связи с сервером (а не, например, ошибка файла)."""
+    # krpc сообщает о закрытом сокете как socket.error("Connection closed") без errno
+    return isinstance(exc, ConnectionError) or (type(exc) is OSError and exc.errno is None)
+
+
+class _Guard:
+    def __init__(self, session):
+        self.session = session
+
+    def __enter__(self):
+        return self.session
+
+    def __exit__(self, kind, exc, tb):
+        if exc is None or not disconnected(exc):
+            return False
+        self.session.reconnect(exc)
+        return True  # Такт пропущен, цикл продолжается на новом подключении
+
+
+class Session:
+    """Подключение к kRPC с переподключением после обрыва.
+
+    attach(conn) - функция скрипта: корабль, потоки и перепривязка
+    выходов управления на подключении conn; вызывается сразу и после
+    каждого переподключения. connect(name) - по умолчанию
+    ksp_startup.connect. log(text) - сообщения об обрыве и
+    восстановлении связи, по умолчанию в stderr (ksp_mission передает свой
+    журнал событий).
+    """
+
+    def __init__(self, name, attach, connect=None, attempts=20, delay=0.1, max_delay=5.0,
+                 stale=STALE, log=None):
+        if connect is None:
+            from ksp_startup import connect
+        self.name = name
+        self.attach = attach
+        self.connect = connect
+        self.log = log or (lambda text: print(text, file=sys.stderr))
+        self.attempts = attempts
+        self.delay = delay
+        self.max_delay = max_delay
+        self.stale = stale
+        self._changed = (None, 0.0)  # последний новый UT и когда он пришел
+        self.reconnects = 0
+        self.downtime = 0.0  # реальное время без связи, с
+        self.conn = connect(name=name)
+        attach(self.conn)
+
+    def heartbeat(self, ut):
+        """Проверка связи по UT снимка телеметрии.
+
+        После обрыва потоки kRPC молча отдают последнее значение; если UT
+        не меняется дольше stale секунд, связь проверяется синхронным RPC
+        (ошибка - обрыв, ответ - игра на паузе). Часы - time.time(): на
+        модели ksp_sim они идут по модельному времени.
+        """
+        now = time.time()
+        if ut != self._changed[0]:
+            self._changed = (ut, now)
+        elif now - self._changed[1] > self.stale:
+            self.conn.space_center.ut
+            self._changed = (ut, now)
+
+    def guard(self):
+        """Контекст такта: обрыв связи внутри - переподключение, такт пропускается."""
+        return _Guard(self)
+
+    def run(self, func):
+        """Вызывает func() заново после каждого обрыва, пока он не завершится."""
+        while True:
+            try:
+                return func()
+            except Exception as exc:
+                if not disconnected(exc):
+                    raise
+                self.reconnect(exc)
+
+    def reconnect(self, reason=None):
+        """Новое подключение с нарастающей паузой; затем attach(conn)."""
+        start = time.monotonic()
+        self.log(f"Связь потеряна ({reason}), переподключение...")
+        try:
+            self.conn.close()
+        except Exception:
+            pass
+        delay = self.delay
+        for attempt in range(self.attempts):
+            try:
+                self.conn = self.connect(name=self.name)
+                self.attach(self.conn)
+                break
+            except Exception as exc:
+                if not disconnected(exc) or attempt == self.attempts - 1:
+                    raise
+                time.sleep(delay)
+                delay = min(delay * 2, self.max_delay)
+        self.reconnects += 1
+        self._changed = (None, 0.0)
+        self.downtime += time.monotonic() - start
+        self.log(f"Подключение восстановлено (попытка {attempt + 1})")
+        return self.conn
+
+
+def drop_at(install, ut):
+    """На модели ksp_sim: обрыв всех подключений install на UT ut."""
+    sim = install.sim
+
+    def check():
+        if sim.ut >= ut:
+            sim.update_callbacks.remove(check)
+            for conn in install.connections:
+                conn.drop()
+
+    sim.update_callbacks.append(check)
+
+
+def check_resume(script, ut, staged=False):
+    """Полет script на модели ksp_sim без обрыва и с обрывом связи на UT ut.
+
+    Орбиты в конце обоих полетов должны совпасть с точностью TOLERANCE;
+    иначе AssertionError. Возвращает {None или ut: (конец UT, Ap, Pe,
+    подключений, max_q)}. staged (--staged): двигатель первой ступени уже
+    запущен на столе - для скриптов без сброса ступени на старте.
+    """
+    import copy
+    import runpy
+
+    import ksp_sim
+
+    os.environ.setdefault("MPLBACKEND", "Agg")
+    results = {}
+    for drop in (None, ut):
+        sim = ksp_sim.Simulator(copy.deepcopy(ksp_sim.ROCKET))
+        if staged:
+            sim.activate_next_stage()
+        with ksp_sim.install(sim) as env:
+            if drop is not None:
+                drop_at(env, drop)
+            try:
+                runpy.run_path(script, run_name="__main__")
+            except ksp_sim.SimTimeout:
+                pass
+        results[drop] = (sim.ut, *sim.apsides(), len(env.connections), sim.max_q)
+    _, apoapsis, periapsis, _, max_q = results[None]
+    _, resumed_ap, resumed_pe, connections, _ = results[ut]
+    assert max_q > 0, "Ракета не взлетела: проверять продолжение не на чем"
+    assert connections > 1, f"Обрыва на UT {ut:.0f} не было: полет кончился раньше"
+    # Разомкнутая орбита (апоцентр inf) - не результат полета: inf - inf дает nan
+    for drop, (_, ap, pe, _, _) in results.items():
+        label = "без обрыва" if drop is None else f"с обрывом на UT {drop:.0f}"
+        assert math.isfinite(ap) and math.isfinite(pe), \
+            f"Полет {label} кончился не на орбите: Ap {ap}, Pe {pe}"
+    assert abs(resumed_ap - apoapsis) <= TOLERANCE * abs(apoapsis), "Апоцентр после обрыва другой"
+    assert abs(resumed_pe - periapsis) <= TOLERANCE * abs(periapsis), "Перицентр после обрыва другой"
+    return results
+
+
+if __name__ == "__main__":
+    args = [a for a in sys.argv[1:] if a != "--staged"]
+    script = args[0] if args else "kpkp.py"
+    ut = float(args[1]) if len(args) > 1 else 60.0
+    results = check_resume(script, ut, staged="--staged" in sys.argv)
+    for drop, (end, apoapsis, periapsis, connections, _) in results.items():
+        label = "без обрыва" if drop is None else f"обрыв на UT {drop:.0f}"
+        print(f"{label}: конец UT {end:.1f}, Ap {apoapsis / 1000:.1f} км, "
+              f"Pe {periapsis / 1000:.1f} км, подключений {connections}")
+    print("Полет после обрыва совпадает с полетом без обрыва")
@@ -0,0 +1,137 @@
+"""Кэш управляющих воздействий с зоной нечувствительности.
+
+Каждая запись в auto_pilot или control - это отдельный блокирующий RPC.
+ControlOutputs запоминает последнее отправленное значение каждого канала
+(тангаж/курс, крен, газ, автопилот, SAS, RCS), не отправляет изменения
+меньше зоны нечувствительности и сводит все изменения за такт в один
+flush(): если за такт газ меняли три раза, уйдет только последнее значение.
+
+    outputs = ControlOutputs(vessel)
+    outputs.set_pitch_heading(pitch, 90)
+    outputs.set_throttle(1.0)
+    outputs.flush()
+    outputs.stats()  # {'requested': ..., 'sent': ..., 'saved': ...}
+
+listeners получают (канал, значение) каждой действительно отправленной
+записи; сброс ступени stage() уходит сразу, вне кэша.
+"""
+
+# Зоны нечувствительности по умолчанию
+PITCH_DEADBAND = 0.1  # градусы
+ROLL_DEADBAND = 0.5  # градусы
+THROTTLE_DEADBAND = 0.005  # доля полного газа
+
+
+class ControlOutputs:
+    """Выходы управления одного корабля с кэшем последних отправленных значений."""
+
+    def __init__(self, vessel, pitch_deadband=PITCH_DEADBAND,
+                 roll_deadband=ROLL_DEADBAND, throttle_deadband=THROTTLE_DEADBAND):
+        self.auto_pilot = vessel.auto_pilot
+        self.control = vessel.control
+        self.deadband = {
+            "pitch_heading": pitch_deadband,
+            "roll": roll_deadband,
+            "throttle": throttle_deadband,
+        }
+        self.sent = {}  # последнее отправленное значение канала
+        self.pending = {}  # значения, заданные в текущем такте
+        self.requested = 0
+        self.writes = 0
+        self.listeners = []  # вызываются для каждой отправленной записи
+
+    def _set(self, channel, value):
+        self.requested += 1
+        self.pending[channel] = value
+
+    def set_pitch_heading(self, pitch, heading):
+        self._set("pitch_heading", (float(pitch), float(heading)))
+
+    def set_roll(self, roll):
+        self._set("roll", float(roll))
+
+    def set_throttle(self, throttle):
+        self._set("throttle", min(max(float(throttle), 0.0), 1.0))
+
+    def engage(self):
+        self._set("engaged", True)
+
+    def disengage(self):
+        self._set("engaged", False)
+
+    def set_sas(self, value):
+        self._set("sas", bool(value))
+
+    def set_rcs(self, value):
+        self._set("rcs", bool(value))
+
+    def _changed(self, channel, value):
+        if channel not in self.sent:
+            return True
+        old = self.sent[channel]
+        band = self.deadband.get(channel)
+        if band is None:
+            return value != old
+        if channel == "throttle" and value in (0.0, 1.0):
+            # Полный газ и выключение отправляем всегда точно
+            return value != old
+        if isinstance(value, tuple):
+            return any(abs(a - b) > band for a, b in zip(value, old))
+        return abs(value - old) > band
+
+    def flush(self):
+        """Отправляет изменившиеся за такт каналы; возвращает число записей."""
+        writes = 0
+        for channel, value in self.pending.items():
+            if not self._changed(channel, value):
+                continue
+            if channel == "pitch_heading":
+                self.auto_pilot.target_pitch_and_heading(*value)
+            elif channel == "roll":
+                self.auto_pilot.target_roll = value
+            elif channel == "throttle":
+                self.control.throttle = value
+            elif channel == "engaged":
+                if value:
+                    self.auto_pilot.engage()
+                else:
+                    self.auto_pilot.disengage()
+            elif channel == "sas":
+                self.control.sas = value
+            elif channel == "rcs":
+                self.control.rcs = value
+            self.sent[channel] = value
+            writes += 1
+            for listener in self.listeners:
+                listener(channel, value)
+        self.pending.clear()
+        self.writes += writes
+        return writes
+
+    def stage(self):
+        """Сбрасывает ступень: сразу, без кэша (каждый вызов - новая ступень)."""
+        self.control.activate_next_stage()
+        for listener in self.listeners:
+            listener("stage", ())
+
+    def invalidate(self, channel=None):
+        """Забывает отправленные значения (например, после смены корабля)."""
+        if channel is None:
+            self.sent.clear()
+        else:
+            self.sent.pop(channel, None)
+
+    def rebind(self, vessel):
+        """Переходит на корабль нового подключения (после обрыва связи).
+
+        Автопилот сервер отпускает вместе с клиентом, поэтому все
+        отправленные раньше значения уйдут заново со следующим flush().
+        """
+        self.auto_pilot = vessel.auto_pilot
+        self.control = vessel.control
+        self.pending = {**self.sent, **self.pending}
+        self.sent.clear()
+
+    def stats(self):
+        return {"requested": self.requested, "sent": self.writes,
+                "saved": self.requested - self.writes}
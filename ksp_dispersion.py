@@ -0,0 +1,242 @@
+"""Разброс исходов выведения (Монте-Карло) при неопределенности параметров ракеты.
+
+Константы ракет kpkp.py и ksppp.py (VEHICLES) - точечные оценки. Здесь
+тяга, удельный импульс, массы, Cd*S и характерная высота атмосферы каждого
+варианта выбираются из нормального распределения вокруг номинала
+(относительные сигмы SIGMAS), и варианты интегрируются пакетной моделью
+ksp_batch по chunk_size штук за раз. Пакеты раздаются процессам по
+числу ядер.
+
+Каждый готовый пакет сразу дописывается в файл результатов в формате
+ksp_telemetry (сырые строки float64 и заголовок .json), поэтому прерванный
+прогон продолжается с того же места: пакеты, уже записанные в файл,
+пропускаются. Случайные числа пакета зависят только от seed и номера
+пакета, так что результат тот же, что и без перерыва.
+
+    python ksp_dispersion.py ksppp disp.tlm 100000
+    python ksp_dispersion.py --help
+    summarize(open_telemetry("disp.tlm"))
+"""
+import json
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from ksp_batch import score, search, simulate, stages_from_burn_times
+from ksp_guidance import stages_from_constants
+from ksp_physics import KERBIN, ROCKET
+from ksp_telemetry import open_telemetry
+
+# Относительные сигмы (1 sigma) нормального разброса вокруг номинала
+SIGMAS = {
+    "thrust": 0.02,
+    "isp": 0.01,
+    "fuel_mass": 0.01,
+    "dry_mass": 0.03,
+    "payload": 0.02,
+    "cd_area": 0.10,
+    "scale_height": 0.05,
+}
+STAGE_KEYS = ("thrust", "isp", "fuel_mass", "dry_mass")
+PERCENTILES = (1, 5, 50, 95, 99)
+CHUNK = 2000  # вариантов в пакете
+
+# Номинальные ракеты. В профилях нет сухих масс и Cd*S, которые нужны
+# модели, поэтому константы повторены здесь.
+VEHICLES = {
+    "sim": ROCKET,
+    # Ступени kpkp.py: тяга и время работы (135, 150 и 40 с, как события missions/kpkp.toml)
+    "kpkp": {"payload": 500.0, "cd_area": 1.0, "stages": stages_from_burn_times([
+        {"thrust": 2150000, "burn_time": 135},
+        {"thrust": 1000000, "burn_time": 150},
+        {"thrust": 500000, "burn_time": 40},
+    ])},
+    # params missions/ksppp.toml: тяга, удельный импульс, топливо и mass_payload
+    "ksppp": {"payload": 5400.0, "cd_area": 1.0, "stages": stages_from_constants(
+        [3253600, 744800], [300, 330], [125000, 125000])},
+}
+
+
+def fields(rocket):
+    """Колонки файла результатов: исходы и разыгранные параметры."""
+    names = ["chunk", "ok", "apoapsis", "periapsis", "fuel_margin", "max_q", "t_cutoff"]
+    for j in range(len(rocket["stages"])):
+        names += [f"{key}_{j + 1}" for key in STAGE_KEYS]
+    return names + ["payload", "cd_area", "scale_height"]
+
+
+def sample(rocket, body, n, rng, sigmas=None):
+    """Разыгрывает n вариантов ракеты и атмосферы: параметры - массивы длины n."""
+    sigmas = SIGMAS if sigmas is None else sigmas
+
+    def draw(value, key):
+        # Множитель не меньше 0.05: отрицательная тяга или масса бессмысленны
+        return value * np.maximum(rng.normal(1.0, sigmas.get(key, 0.0), n), 0.05)
+
+    stages = []
+    for s in rocket["stages"]:
+        stage = dict(s)
+        for key in STAGE_KEYS:
+            stage[key] = draw(s[key], key)
+        # Тяга у поверхности меняется в той же пропорции, что и в вакууме
+        stage["thrust_sl"] = s["thrust_sl"] * stage["thrust"] / s["thrust"]
+        stages.append(stage)
+    rocket = dict(rocket, stages=stages, payload=draw(rocket["payload"], "payload"),
+                  cd_area=draw(rocket["cd_area"], "cd_area"))
+    body = dict(body, scale_height=draw(body["scale_height"], "scale_height"))
+    return rocket, body
+
+
+def _chunk_size(config, chunk):
+    return min(config["chunk_size"], config["n"] - chunk * config["chunk_size"])
+
+
+def run_chunk(config, chunk):
+    """Считает пакет номер chunk; возвращает структурированный массив строк."""
+    n = _chunk_size(config, chunk)
+    rng = np.random.default_rng([config["seed"], chunk])
+    rocket, body = sample(VEHICLES[config["vehicle"]], KERBIN, n, rng, config["sigmas"])
+    profiles = {key: np.full(n, value) for key, value in config["profile"].items()}
+    target = config["target_apoapsis"]
+    results = simulate(profiles, rocket, body, target, dt=config["dt"])
+    margin = score(results, target)
+    ok = np.isfinite(margin)
+
+    out = np.zeros(n, dtype=[(name, np.float64) for name in config["fields"]])
+    out["chunk"] = chunk
+    out["ok"] = ok
+    out["apoapsis"] = results["apoapsis"]
+    out["periapsis"] = results["periapsis"]
+    out["fuel_margin"] = np.where(ok, margin, np.nan)
+    out["max_q"] = results["max_q"]
+    out["t_cutoff"] = results["t_cutoff"]
+    for j, stage in enumerate(rocket["stages"]):
+        for key in STAGE_KEYS:
+            out[f"{key}_{j + 1}"] = stage[key]
+    out["payload"] = rocket["payload"]
+    out["cd_area"] = rocket["cd_area"]
+    out["scale_height"] = body["scale_height"]
+    return out
+
+
+def _resume(path, config):
+    """Номера пакетов, уже записанных в path. Недописанный последний пакет
+    отрезается; файл другого прогона - ошибка."""
+    if not (os.path.exists(path) and os.path.exists(path + ".json")):
+        return set()
+    with open(path + ".json") as f:
+        saved = json.load(f).get("dispersion")
+    if saved is None:
+        raise ValueError(f"{path}: это не файл разброса")
+    if config["profile"] is None:
+        config["profile"] = saved["profile"]
+    if saved != config:
+        raise ValueError(f"{path}: записан прогон с другими параметрами")
+    row = 8 * len(config["fields"])
+    size = os.path.getsize(path) // row * row
+    chunks = np.zeros(0)
+    if size:
+        data = np.memmap(path, dtype=np.float64, mode="r", shape=(size // row, len(config["fields"])))
+        chunks = np.array(data[:, 0])
+        del data
+    done = set()
+    if len(chunks):
+        ids, counts = np.unique(chunks, return_counts=True)
+        for chunk, count in zip(ids.astype(int), counts):
+            if count == _chunk_size(config, chunk):
+                done.add(int(chunk))
+        # Пакет пишется одним блоком, поэтому неполным может быть только последний
+        last = int(chunks[-1])
+        if last not in done:
+            size -= int((chunks == last).sum()) * row
+    with open(path, "r+b") as f:
+        f.truncate(size)
+    return done
+
+
+def sweep(path, n, vehicle="sim", target_apoapsis=80000.0, profile=None, sigmas=None,
+          seed=0, chunk_size=CHUNK, workers=None, dt=0.1):
+    """Прогоняет n вариантов с записью в path и возвращает данные файла.
+
+    profile - профиль разворота (turn_start, turn_end, shape); по умолчанию
+    подбирается ksp_batch.search для номинальной ракеты. Если path уже
+    содержит часть этого прогона, считаются только недостающие пакеты.
+    """
+    if vehicle not in VEHICLES:
+        raise ValueError(f"Неизвестная ракета {vehicle!r}, есть: {', '.join(VEHICLES)}")
+    rocket = VEHICLES[vehicle]
+    config = {
+        "vehicle": vehicle, "n": int(n), "seed": int(seed), "chunk_size": int(chunk_size),
+        "target_apoapsis": float(target_apoapsis), "dt": float(dt),
+        "sigmas": dict(SIGMAS if sigmas is None else sigmas),
+        "profile": profile, "fields": fields(rocket),
+    }
+    done = _resume(path, config)
+    if config["profile"] is None:
+        best = search(rocket, target_apoapsis, n=2000, seed=seed, dt=dt)
+        if best is None:
+            raise ValueError(f"{vehicle}: номинальная ракета не выходит на орбиту")
+        config["profile"] = best[0]
+    if not done:
+        open(path, "wb").close()
+        with open(path + ".json", "w") as f:
+            json.dump({"fields": config["fields"], "dispersion": config}, f)
+
+    pending = [i for i in range(math.ceil(n / chunk_size)) if i not in done]
+    with open(path, "ab") as f, ProcessPoolExecutor(workers) as pool:
+        futures = [pool.submit(run_chunk, config, chunk) for chunk in pending]
+        try:
+            for future in as_completed(futures):
+                f.write(future.result().tobytes())
+                f.flush()
+        except BaseException:
+            # Прерывание: записанные пакеты остаются, остальные отменяются
+            pool.shutdown(wait=False, cancel_futures=True)
+            raise
+    return open_telemetry(path)
+
+
+def summarize(data, percentiles=PERCENTILES):
+    """Доля успешных выведений и процентили исходов.
+
+    Орбита и запас топлива - по успешным вариантам, max_q - по всем.
+    """
+    ok = data["ok"] > 0
+    result = {"runs": len(data), "success": float(ok.mean()) if len(data) else 0.0}
+    for key in ("apoapsis", "periapsis", "fuel_margin", "max_q"):
+        values = np.asarray(data[key] if key == "max_q" else data[key][ok])
+        values = values[np.isfinite(values)]
+        result[key] = {}
+        if len(values):
+            result[key] = dict(zip((f"p{q}" for q in percentiles),
+                                   np.percentile(values, percentiles).tolist()))
+    return result
+
+
+def _arguments(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(description="Разброс исходов выведения (Монте-Карло) на ksp_batch.")
+    parser.add_argument("vehicle", nargs="?", default="sim", choices=list(VEHICLES), help="номинальная ракета")
+    parser.add_argument("path", nargs="?", help="файл результатов, по умолчанию dispersion_<ракета>.tlm")
+    parser.add_argument("n", nargs="?", type=int, default=20000, help="число вариантов")
+    parser.add_argument("--seed", type=int, default=0, help="зерно случайных чисел прогона")
+    parser.add_argument("--workers", type=int, default=None, help="процессов, по умолчанию по числу ядер")
+    return parser.parse_args(argv)  # Неизвестная ракета или флаг - ошибка до прогона, файл не трогается
+
+
+if __name__ == "__main__":
+    args = _arguments()
+    path = args.path or f"dispersion_{args.vehicle}.tlm"
+    start = time.perf_counter()
+    data = sweep(path, args.n, args.vehicle, seed=args.seed, workers=args.workers)
+    print(f"{len(data)} вариантов, {time.perf_counter() - start:.1f} с ({os.cpu_count()} ядер)")
+    summary = summarize(data)
+    print(f"Успешных выведений: {summary['success'] * 100:.1f}%")
+    units = {"apoapsis": ("км", 1e-3), "periapsis": ("км", 1e-3),
+             "fuel_margin": ("м/с", 1.0), "max_q": ("кПа", 1e-3)}
+    for key, (unit, scale) in units.items():
+        row = ", ".join(f"{name} {value * scale:.1f}" for name, value in summary[key].items())
+        print(f"{key} ({unit}): {row}")
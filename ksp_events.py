@@ -0,0 +1,139 @@
+"""Триггеры на серверных выражениях и событиях kRPC.
+
+Условие ("топливо кончилось", "апоцентр >= X", "высота >= Y") собирается
+из conn.krpc.Expression и регистрируется на сервере через
+conn.krpc.add_event. Сервер сам проверяет его на каждом кадре, а клиент
+просыпается только при срабатывании - без опроса и без RPC на такте.
+
+    triggers = Triggers(conn)
+    fuel_out = triggers.fuel_depleted(vessel, "SolidFuel")
+    fuel_out.on(vessel.control.activate_next_stage)
+    triggers.apoapsis_above(vessel, 80000).wait()
+
+Условия фаз ksp_mission (until и events профиля) - такие же триггеры:
+миссия регистрирует их при входе в фазу, а на такте читает только
+флаги сработавших.
+"""
+import threading
+
+
+class Trigger:
+    """Зарегистрированное на сервере событие."""
+
+    def __init__(self, conn, expression, name):
+        self.conn = conn
+        self.expression = expression
+        self.name = name
+        self.event = conn.krpc.add_event(expression)
+        # Поток события запускаем сразу, чтобы fired() читал готовое значение
+        self.event.start()
+
+    def fired(self):
+        """Выполнено ли условие сейчас (значение потока, без RPC)."""
+        return bool(self.event.stream())
+
+    def wait(self, timeout=None):
+        """Блокирует до срабатывания или таймаута; возвращает fired()."""
+        with self.event.condition:
+            self.event.wait(timeout)
+        return self.fired()
+
+    def on(self, callback):
+        """Вызывает callback() при каждом срабатывании (в потоке клиента kRPC)."""
+        self.event.add_callback(callback)
+
+    def remove(self):
+        self.event.remove()
+
+    def __repr__(self):
+        return f"<Trigger {self.name}>"
+
+
+class Triggers:
+    """Фабрика типовых триггеров для одного подключения."""
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.expr = conn.krpc.Expression
+
+    def _compare(self, name, op, call, value, constant="constant_double"):
+        left = self.expr.call(call)
+        right = getattr(self.expr, constant)(value)
+        return Trigger(self.conn, getattr(self.expr, op)(left, right), name)
+
+    def fuel_depleted(self, vessel, resource="LiquidFuel", threshold=0.1):
+        """Ресурса осталось меньше threshold."""
+        call = self.conn.get_call(vessel.resources.amount, resource)
+        return self._compare(f"{resource} < {threshold}", "less_than",
+                             call, threshold, "constant_float")
+
+    def apoapsis_above(self, vessel, altitude):
+        call = self.conn.get_call(getattr, vessel.orbit, "apoapsis_altitude")
+        return self._compare(f"Ap >= {altitude}", "greater_than_or_equal", call, altitude)
+
+    def periapsis_above(self, vessel, altitude):
+        call = self.conn.get_call(getattr, vessel.orbit, "periapsis_altitude")
+        return self._compare(f"Pe >= {altitude}", "greater_than_or_equal", call, altitude)
+
+    def altitude_above(self, vessel, altitude, reference_frame=None):
+        flight = vessel.flight() if reference_frame is None else vessel.flight(reference_frame)
+        call = self.conn.get_call(getattr, flight, "mean_altitude")
+        return self._compare(f"h >= {altitude}", "greater_than_or_equal", call, altitude)
+
+    def speed_above(self, vessel, speed, reference_frame=None):
+        flight = vessel.flight() if reference_frame is None else vessel.flight(reference_frame)
+        call = self.conn.get_call(getattr, flight, "speed")
+        return self._compare(f"v >= {speed}", "greater_than_or_equal", call, speed)
+
+    def thrust_below(self, vessel, thrust):
+        """Доступная тяга меньше thrust, Н: двигатели ступени выгорели."""
+        call = self.conn.get_call(getattr, vessel, "available_thrust")
+        return self._compare(f"F < {thrust}", "less_than", call, thrust, "constant_float")
+
+    def mass_below(self, vessel, mass):
+        call = self.conn.get_call(getattr, vessel, "mass")
+        return self._compare(f"m <= {mass}", "less_than_or_equal", call, mass, "constant_float")
+
+    def ut_after(self, ut):
+        call = self.conn.get_call(getattr, self.conn.space_center, "ut")
+        return self._compare(f"UT >= {ut}", "greater_than_or_equal", call, ut)
+
+    def any(self, *triggers):
+        """Триггер, срабатывающий по любому из условий (or на сервере)."""
+        expression = triggers[0].expression
+        for trigger in triggers[1:]:
+            expression = self.expr.or_(expression, trigger.expression)
+        name = " | ".join(t.name for t in triggers)
+        return Trigger(self.conn, expression, name)
+
+    def all(self, *triggers):
+        """Триггер, срабатывающий, когда выполнены все условия (and на сервере).
+
+        События отдельных условий больше не нужны и снимаются.
+        """
+        expression = triggers[0].expression
+        for trigger in triggers[1:]:
+            expression = self.expr.and_(expression, trigger.expression)
+        for trigger in triggers:
+            trigger.remove()
+        name = " & ".join(t.name for t in triggers)
+        return Trigger(self.conn, expression, name)
+
+    def wait_any(self, *triggers, timeout=None):
+        """Ждет первого из условий; возвращает список сработавших триггеров."""
+        combined = self.any(*triggers)
+        try:
+            combined.wait(timeout)
+            fired = [t for t in triggers if t.fired()]
+            if combined.fired() and not fired:
+                # Потоки отдельных событий могли еще не получить обновление
+                done = threading.Event()
+                self.conn.add_stream_update_callback(done.set)
+                try:
+                    done.wait(1.0)
+                finally:
+                    self.conn.remove_stream_update_callback(done.set)
+                fired = [t for t in triggers if t.fired()]
+            return fired
+        finally:
+            combined.remove()
@@ -0,0 +1,164 @@
+"""Одновременное управление несколькими кораблями из одного процесса.
+
+Скрипты летают на space_center.active_vessel через одно подключение.
+Здесь несколько кораблей (ускорители, верхние ступени, выведенные
+спутники) управляются сразу:
+
+    - ConnectionPool держит небольшое число подключений kRPC (у каждого
+      свой канал потоков); корабли раздаются наименее загруженным, так
+      что десятки кораблей делят несколько сокетов;
+    - каждый корабль - отдельная миссия ksp_mission со своим планировщиком
+      (свои сроки, промахи и stop()), часы общие на подключение;
+    - такты всех кораблей выполняются в общем пуле потоков: пока один
+      корабль ждет RPC или считает, остальные идут по своим срокам, а
+      опоздавший пропускает такты, а не копит их;
+    - законы наведения с "offload": true считаются в пуле процессов
+      (compute), чтобы тяжелый расчет не занимал GIL и не тормозил
+      чужие такты;
+    - ускорение времени в игре одно на всех: решает флот (FleetWarp),
+      корабли только голосуют, и время ускоряется, лишь когда это
+      безопасно для каждого корабля;
+    - ошибка одного корабля не останавливает остальные.
+
+    pool = ConnectionPool(4)
+    fleet = Fleet(pool)
+    fleet.add("Booster", load_profile("missions/kpkp.toml"))
+    fleet.add("Sat-1", load_profile("missions/ksp_tel.toml"))
+    reports = fleet.run()
+
+    python ksp_fleet.py missions/ksp_tel.toml "Sat-1" "Sat-2" ...
+    python ksp_fleet.py missions/ksp_tel.toml --sim 24   # на модели ksp_sim
+"""
+import asyncio
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from ksp_mission import Mission, load_profile
+from ksp_scheduler import Scheduler, SimClock, UTClock
+from ksp_warp import FleetWarp
+
+
+class ConnectionPool:
+    """Несколько подключений kRPC, раздаваемых кораблям."""
+
+    def __init__(self, size=4, name="Fleet", connect=None):
+        if connect is None:
+            import krpc
+            connect = krpc.connect
+        self.connections = [connect(name=f"{name} {i + 1}") for i in range(size)]
+        self.load = [0] * size  # кораблей на подключении
+
+    def acquire(self):
+        """Наименее загруженное подключение."""
+        i = min(range(len(self.connections)), key=self.load.__getitem__)
+        self.load[i] += 1
+        return self.connections[i]
+
+    def release(self, conn):
+        self.load[self.connections.index(conn)] -= 1
+
+    def close(self):
+        for conn in self.connections:
+            conn.close()
+
+
+def find_vessel(conn, name):
+    """Корабль с именем name, видимый через это подключение."""
+    for vessel in conn.space_center.vessels:
+        if vessel.name == name:
+            return vessel
+    raise ValueError(f"Корабль не найден: {name}")
+
+
+def _per_vessel(profile, name):
+    # Свои файлы на корабль: ksp_tel.tlm -> ksp_tel-Sat-1.tlm. Без графиков
+    # (процесс рисования на каждый корабль) и без контрольной точки: флот
+    # после падения начинает заново
+    vessel = {key: value for key, value in profile.items() if key not in ("plot", "checkpoint")}
+    vessel["id"] = f"{profile.get('id') or profile['name']}-{name}"
+    return vessel
+
+
+class Fleet:
+    """Миссии нескольких кораблей на общем пуле подключений и потоков.
+
+    processes=0 отключает пул процессов: все законы наведения считаются
+    в потоке такта.
+    """
+
+    def __init__(self, pool, threads=64, processes=None):
+        self.pool = pool
+        self.executor = ThreadPoolExecutor(threads, thread_name_prefix="fleet")
+        self.compute = ProcessPoolExecutor(processes) if processes != 0 else None
+        self.missions = {}
+        self.warp = None  # пул подключен к одной игре - и множитель один
+        self._clocks = {}
+
+    def clock(self, conn):
+        """Часы подключения; у модели ksp_sim - одни на все подключения к ней."""
+        sim = getattr(conn, "sim", None)
+        key = id(conn) if sim is None else id(sim)
+        if key not in self._clocks:
+            self._clocks[key] = UTClock(conn) if sim is None else SimClock(sim)
+        return self._clocks[key]
+
+    def add(self, name, profile):
+        """Добавляет корабль name с профилем миссии; возвращает Mission."""
+        conn = self.pool.acquire()
+        vessel = find_vessel(conn, name)
+        clock = self.clock(conn)
+        # Модель не потокобезопасна: на ней такты идут в цикле событий
+        scheduler = Scheduler(clock, threads=not isinstance(clock, SimClock),
+                              executor=self.executor)
+        if self.warp is None:
+            self.warp = FleetWarp(conn)
+        mission = Mission(_per_vessel(profile, name), conn, vessel, scheduler, self.compute, self.warp)
+        self.missions[name] = mission
+        return mission
+
+    async def run_async(self):
+        """Все миссии сразу; {имя: отчет или исключение}."""
+        names = list(self.missions)
+        results = await asyncio.gather(*(self.missions[n].run_async() for n in names),
+                                       return_exceptions=True)
+        return dict(zip(names, results))
+
+    def run(self):
+        return asyncio.run(self.run_async())
+
+    def close(self):
+        self.executor.shutdown()
+        if self.compute is not None:
+            self.compute.shutdown()
+        self.pool.close()
+
+
+def _sim_pool(count, size):
+    # Группа из count кораблей в одном модельном времени
+    import ksp_sim
+    group = ksp_sim.Group(ksp_sim.Simulator(max_ut=1e6, name=f"Sim-{i + 1}") for i in range(count))
+    pool = ConnectionPool(size, connect=lambda name: ksp_sim.connect(name=name, sim=group))
+    return pool, [sim.name for sim in group.sims]
+
+
+if __name__ == "__main__":
+    profile = load_profile(sys.argv[1])
+    if sys.argv[2:3] == ["--sim"]:
+        pool, names = _sim_pool(int(sys.argv[3]) if len(sys.argv) > 3 else 8, 4)
+    else:
+        pool, names = ConnectionPool(4), sys.argv[2:]
+    fleet = Fleet(pool)
+    for name in names:
+        fleet.add(name, profile)
+    start = time.perf_counter()
+    reports = fleet.run()
+    wall = time.perf_counter() - start
+    for name, report in reports.items():
+        if isinstance(report, BaseException):
+            print(f"{name}: ошибка {report!r}")
+            continue
+        missed = sum(t["missed"] for t in report["tasks"].values())
+        print(f"{name}: фаза {report['phase']}, пропущено сроков {missed}")
+    print(f"{len(names)} кораблей на {len(pool.connections)} подключениях за {wall:.1f} с")
+    fleet.close()
@@ -0,0 +1,393 @@
+"""Замкнутое наведение на выведении: упрощенный PEG (Powered Explicit Guidance).
+
+Линейные программы тангажа (calculate_pitch, pitch_angle, разворот
+frac * 90 в kpkp.py) не смотрят на текущее состояние. PEG на каждом такте
+заново решает задачу по вектору состояния: закон управления синусом
+тангажа sin(pitch) = A + B*t + C (C компенсирует гравитацию минус
+центробежное ускорение) и время работы T до выхода на круговую орбиту
+заданной высоты. Решение - явные формулы на NumPy, поэтому одна и та же
+функция считает и одно состояние, и тысячи сразу (для ksp_batch).
+
+В плотной атмосфере PEG не используется: до peg_altitude работает обычный
+разворот по высоте, как в kpkp.py/ksp.py, дальше - PEG. Последние
+terminal секунд решение не пересчитывается (оно вырождается при T -> 0),
+T просто отсчитывается до выключения.
+
+Данные ступеней читаются с корабля (stages_from_vessel: двигатели и массы
+деталей каждой ступени отделения) или берутся из таблицы stages в [peg]
+профиля миссии (stages_from_burn_times, stages_from_constants). Из них
+берется скорость истечения текущей ступени и тяга, если телеметрия в
+момент разделения показывает ноль.
+
+    guidance = AscentGuidance(mu, radius, 80000, stages)
+    pitch, throttle = guidance.command(ut, altitude, vertical_speed,
+                                       horizontal_speed, thrust, mass, stage)
+
+Сравнение с линейными разворотами на модели ksp_sim:
+    python ksp_guidance.py
+"""
+import math
+import sys
+import time
+
+from ksp_physics import g0
+from ksp_startup import lazy
+
+np = lazy("numpy")  # нужен с включения PEG, не при старте
+
+PEG_ALTITUDE = 35000.0  # высота включения PEG, м
+TERMINAL = 2.0  # секунд до выключения, когда решение замораживается
+ITERATIONS = 3  # итераций на такт (при первом решении - больше)
+
+
+def _integrals(a, ve, T):
+    # Интегралы тяги ступени с начальным ускорением a за время T:
+    # b0 = ∫a, b1 = ∫a*t, c0 = ∫∫a, c1 = ∫∫a*t
+    tau = ve / a
+    T = np.minimum(T, 0.999 * tau)
+    b0 = -ve * np.log1p(-T / tau)
+    b1 = b0 * tau - ve * T
+    c0 = b0 * T - b1
+    c1 = c0 * tau - ve * T * T / 2
+    return tau, b0, b1, c0, c1
+
+
+def peg_solve(r, rdot, vtheta, r_target, mu, lower, final, T, iterations=ITERATIONS):
+    """Итерации многоступенчатого PEG для массивов состояний.
+
+    r, rdot, vtheta - радиус, вертикальная и горизонтальная скорость.
+    lower - ступени до последней: [(ускорение при включении, скорость
+    истечения, время работы)], первая из них работает сейчас; final -
+    (ускорение, скорость истечения) последней ступени; T - оценка времени
+    ее работы. Возвращает A, B, T, C: sin(pitch) = A + B*t + C.
+    """
+    r, rdot, vtheta = np.broadcast_arrays(*map(np.asarray, (r, rdot, vtheta)))
+    T = np.array(np.broadcast_to(np.asarray(T, float), r.shape))
+    a_f, ve_f = final
+    a_now = lower[0][0] if lower else a_f
+    omega = vtheta / r
+    v_target = np.sqrt(mu / r_target)
+    omega_target = v_target / r_target
+    dh = r_target * v_target - r * vtheta
+    r_mean = (r + r_target) / 2
+    C = (mu / (r * r) - omega * omega * r) / a_now
+
+    for _ in range(iterations):
+        T = np.maximum(T, 1e-3)
+        # Радиальное движение: A*B0 + B*B1 = -rdot, A*C0 + B*C1 = r_target - r - rdot*t
+        t = 0.0
+        B0 = B1 = C0 = C1 = 0.0
+        dv_lower = 0.0
+        for a_i, ve_i, T_i in list(lower) + [(a_f, ve_f, T)]:
+            tau_i, b0, b1, c0, c1 = _integrals(a_i, ve_i, T_i)
+            C0 = C0 + c0 + T_i * B0
+            C1 = C1 + c1 + t * c0 + T_i * B1
+            B0 = B0 + b0
+            B1 = B1 + b1 + t * b0
+            t = t + T_i
+            if T_i is not T:
+                dv_lower = dv_lower + b0
+        rz = r_target - r - rdot * t
+        det = B0 * C1 - B1 * C0
+        A = (-rdot * C1 - B1 * rz) / det
+        B = (B0 * rz + C0 * rdot) / det
+
+        # Тангенциальная часть: набрать момент импульса круговой орбиты
+        # с потерями на косинус тангажа, средним по участку (Симпсон)
+        tau_f = ve_f / a_f
+        a_T = a_f / (1 - np.minimum(T / tau_f, 0.999))
+        C_T = (mu / (r_target * r_target) - omega_target * omega_target * r_target) / a_T
+        cos_mean = 0.0
+        for weight, s in ((1 / 6, 0.0), (4 / 6, 0.5), (1 / 6, 1.0)):
+            f = np.clip(A + B * t * s + C + (C_T - C) * s, -1.0, 1.0)
+            cos_mean = cos_mean + weight * np.sqrt(1 - f * f)
+        dv = dh / r_mean / np.maximum(cos_mean, 0.1) - dv_lower
+        T = tau_f * (1 - np.exp(-np.maximum(dv, 0.0) / ve_f))
+    return A, B, T, C
+
+
+def pitch_from(A, B, C, dt=0.0):
+    """Тангаж в градусах по решению PEG через dt секунд после него."""
+    return np.degrees(np.arcsin(np.clip(A + B * dt + C, -1.0, 1.0)))
+
+
+class PEG:
+    """Состояние PEG между тактами для одного корабля."""
+
+    def __init__(self, mu, radius, target_altitude, terminal=TERMINAL):
+        self.mu = mu
+        self.r_target = radius + target_altitude
+        self.radius = radius
+        self.terminal = terminal
+        self.A = self.B = self.C = 0.0
+        self.T = None  # время работы последней ступени
+        self.remaining = None  # время до выключения с учетом нижних ступеней
+        self.solved_at = None
+
+    def update(self, ut, altitude, rdot, vtheta, lower, final):
+        """Пересчитывает решение; возвращает (тангаж, время до выключения).
+
+        lower и final - как в peg_solve.
+        """
+        r = self.radius + altitude
+        if self.T is None:
+            # Первая оценка: время набора недостающей скорости последней ступенью
+            a_f, ve_f = final
+            dv = max(math.sqrt(self.mu / self.r_target) - vtheta, 1.0)
+            dv -= sum(ve * -math.log1p(-min(t * a / ve, 0.999)) for a, ve, t in lower)
+            self.T = ve_f / a_f * (1 - math.exp(-max(dv, 1.0) / ve_f))
+            iterations = 10
+        else:
+            dt = ut - self.solved_at
+            self.A += self.B * dt
+            if not lower:
+                self.T -= dt
+            iterations = ITERATIONS
+        self.solved_at = ut
+        if lower or self.T > self.terminal:
+            A, B, T, C = peg_solve(r, rdot, vtheta, self.r_target, self.mu,
+                                   lower, final, self.T, iterations)
+            if np.isfinite(A) and np.isfinite(B) and np.isfinite(T):
+                self.A, self.B, self.T, self.C = float(A), float(B), float(T), float(C)
+        self.remaining = self.T + sum(t for a, ve, t in lower)
+        return float(pitch_from(self.A, self.B, self.C)), self.remaining
+
+
+class AscentGuidance:
+    """Разворот в атмосфере, затем PEG до выхода на круговую орбиту.
+
+    stages - ступени модели (thrust, isp, dry_mass, fuel_mass), снизу вверх.
+    """
+
+    def __init__(self, mu, radius, target_altitude, stages, turn_start=250.0,
+                 turn_end=45000.0, peg_altitude=PEG_ALTITUDE, heading=90.0):
+        self.stages = stages
+        self.turn_start = turn_start
+        self.turn_end = turn_end
+        self.peg_altitude = peg_altitude
+        self.heading = heading
+        self.peg = PEG(mu, radius, target_altitude)
+        self.done = False
+        self.remaining = None  # время до выключения по PEG, с
+
+    # Состояние между тактами - для контрольной точки ksp_checkpoint
+    STATE = ("done", "remaining", "peg_A", "peg_B", "peg_C", "peg_T", "peg_remaining", "peg_solved_at")
+
+    def state(self):
+        """Внутреннее состояние наведения: {имя: число или None}."""
+        peg = self.peg
+        return {"done": float(self.done), "remaining": self.remaining, "peg_A": peg.A,
+                "peg_B": peg.B, "peg_C": peg.C, "peg_T": peg.T,
+                "peg_remaining": peg.remaining, "peg_solved_at": peg.solved_at}
+
+    def restore(self, state):
+        """Продолжает с состояния, сохраненного state()."""
+        peg = self.peg
+        self.done = bool(state["done"])
+        self.remaining = state["remaining"]
+        peg.A, peg.B, peg.C = state["peg_A"] or 0.0, state["peg_B"] or 0.0, state["peg_C"] or 0.0
+        peg.T, peg.remaining, peg.solved_at = state["peg_T"], state["peg_remaining"], state["peg_solved_at"]
+
+    def ramp(self, altitude):
+        frac = min(max((altitude - self.turn_start) / (self.turn_end - self.turn_start), 0.0), 1.0)
+        return 90.0 - frac * 90.0
+
+    def burns(self, stage, thrust, mass, burn_left):
+        """Ступени для peg_solve: текущая и промежуточные с известным
+        временем работы, последняя - с неизвестным."""
+        last = len(self.stages) - 1
+        stage = min(stage, last)
+        spec = self.stages[stage]
+        a = (thrust or spec["thrust"]) / mass
+        if stage == last or burn_left is None:
+            return [], (a, spec["isp"] * g0)
+        ve = spec["isp"] * g0
+        lower = [(a, ve, burn_left)]
+        m = mass - spec["thrust"] / ve * burn_left - spec["dry_mass"]
+        for spec in self.stages[stage + 1:last]:
+            ve = spec["isp"] * g0
+            burn = spec["fuel_mass"] * ve / spec["thrust"]
+            lower.append((spec["thrust"] / m, ve, burn))
+            m -= spec["fuel_mass"] + spec["dry_mass"]
+        spec = self.stages[last]
+        return lower, (spec["thrust"] / m, spec["isp"] * g0)
+
+    def command(self, ut, altitude, rdot, vtheta, thrust, mass, stage=0, burn_left=None):
+        """Тангаж и газ на этот такт.
+
+        burn_left - оставшееся время работы текущей ступени, если она не
+        последняя (по таблице stages или по остатку топлива).
+        """
+        if self.done:
+            return 0.0, 0.0
+        ramp = self.ramp(altitude)
+        if altitude < self.peg_altitude:
+            return ramp, 1.0
+        lower, final = self.burns(stage, thrust, mass, burn_left)
+        pitch, self.remaining = self.peg.update(ut, altitude, rdot, vtheta, lower, final)
+        if self.remaining <= 0:
+            self.done = True
+            return pitch, 0.0
+        return pitch, 1.0
+
+
+def stages_from_vessel(vessel):
+    """Ступени модели по деталям корабля, снизу вверх: еще не отделенные
+    ступени отделения с двигателями (тяга и удельный импульс в вакууме,
+    сухая масса и масса топлива деталей).
+
+    Детали ступени без двигателей (обтекатели, переходники) - сухая масса
+    следующей ступени с двигателями, полезная нагрузка - последней.
+    """
+    parts = vessel.parts
+    stages = []
+    carried = 0.0
+    for decouple in range(vessel.control.current_stage - 1, -2, -1):
+        thrust = flow = dry = fuel = 0.0
+        for part in parts.in_decouple_stage(decouple):
+            mass, dry_mass = part.mass, part.dry_mass
+            dry += dry_mass
+            fuel += mass - dry_mass
+            engine = part.engine
+            if engine is not None:
+                engine_thrust, isp = engine.max_vacuum_thrust, engine.vacuum_specific_impulse
+                if engine_thrust > 0 and isp > 0:
+                    thrust += engine_thrust
+                    flow += engine_thrust / isp
+        if thrust <= 0:
+            carried += dry + fuel
+            continue
+        stages.append({"dry_mass": dry + carried, "fuel_mass": fuel,
+                       "thrust": thrust, "isp": thrust / flow})
+        carried = 0.0
+    if stages:
+        stages[-1]["dry_mass"] += carried
+    return stages
+
+
+def stages_from_constants(thrusts, isps, fuel_masses, dry_fraction=0.1):
+    """Ступени модели из тяги, удельного импульса и массы топлива (params missions/ksppp.toml)."""
+    return [{"resource": "LiquidFuel", "dry_mass": fuel * dry_fraction, "fuel_mass": fuel,
+             "thrust": thrust, "thrust_sl": thrust * 0.9, "isp": isp}
+            for thrust, isp, fuel in zip(thrusts, isps, fuel_masses)]
+
+
+# Сравнение на модели
+
+def _fly(sim, pitch_law, dt=0.1, t_max=1500.0):
+    """Полет с законом pitch_law(sim) -> (тангаж, газ); закон возвращает
+    None, когда орбита набрана. Возвращает (топливо, Ap, Pe) или None вместо
+    топлива, если орбита не достигнута."""
+    sim.activate_next_stage()
+    sim.autopilot_engaged = True
+    m0 = sim.mass()
+    while sim.ut < t_max and not sim.crashed:
+        command = pitch_law(sim)
+        if command is None:
+            ap, pe = sim.apsides()
+            if math.isinf(ap):
+                break  # ушли с орбиты Кербина
+            return m0 - sim.mass(), ap, pe
+        sim.target_pitch, sim.throttle = command
+        sim.advance(dt)
+        stage = sim.current_stage()
+        if stage is not None and stage["fuel_mass"] <= 0:
+            if sim.stage_index + 1 >= len(sim.stages):
+                break
+            sim.activate_next_stage()
+    ap, pe = sim.apsides()
+    return None, ap, pe
+
+
+def ramp_law(turn_start, turn_end, target_altitude, end_pitch=0.0):
+    """Линейный разворот, выключение по апоцентру и довыведение в апоцентре
+    до перицентра target_altitude - 5 км."""
+    state = {"phase": "ascent"}
+
+    def law(sim):
+        ap, pe = sim.apsides()
+        h = sim.altitude()
+        if state["phase"] == "ascent":
+            frac = min(max((h - turn_start) / (turn_end - turn_start), 0.0), 1.0)
+            if ap >= target_altitude:
+                state["phase"] = "coast"
+            return 90.0 - frac * (90.0 - end_pitch), 1.0
+        if pe >= target_altitude - 5000:
+            return None
+        a, e, time_to_ap = sim.orbit()
+        if state["phase"] == "coast":
+            thrust = sim.available_thrust() or sim.stages[-1]["thrust"]
+            burn = 0.5 * (math.sqrt(sim.body["mu"] / (sim.body["radius"] + ap)) - sim.speed()) \
+                * sim.mass() / thrust
+            if time_to_ap > burn:
+                return 0.0, 0.0
+            state["phase"] = "circularize"
+        return 0.0, 1.0
+
+    return law
+
+
+def peg_law(guidance):
+    def law(sim):
+        if guidance.done:
+            return None
+        r = sim.radius()
+        rdot = (sim.x * sim.vx + sim.y * sim.vy) / r
+        vtheta = (sim.y * sim.vx - sim.x * sim.vy) / r
+        stage = sim.current_stage()
+        burn_left = stage["fuel_mass"] * stage["isp"] * g0 / stage["thrust"]
+        return guidance.command(sim.ut, sim.altitude(), rdot, vtheta, sim.available_thrust(),
+                                sim.mass(), max(sim.stage_index, 0), burn_left)
+
+    return law
+
+
+def benchmark(target_altitude=80000.0, solves=2000):
+    """Время решения PEG и расход топлива до орбиты против линейных разворотов."""
+    import ksp_sim
+    from ksp_physics import KERBIN, ROCKET
+
+    mu, R = KERBIN["mu"], KERBIN["radius"]
+    stages = ROCKET["stages"]
+    result = {}
+
+    # Время решения на такт: две ступени впереди и одна
+    guidance = AscentGuidance(mu, R, target_altitude, stages, peg_altitude=0.0)
+    start = time.perf_counter()
+    for i in range(solves):
+        guidance.command(0.1 * i, 40000.0 + i, 600.0, 1200.0 + i * 0.1, 300000.0, 9000.0, 0, 30.0)
+    result["solve_us"] = (time.perf_counter() - start) / solves * 1e6
+    n = 10000
+    rng = np.random.default_rng(0)
+    lower = [(rng.uniform(20, 40, n), 300 * g0, rng.uniform(5, 40, n))]
+    start = time.perf_counter()
+    peg_solve(R + rng.uniform(30000, 70000, n), rng.uniform(200, 900, n),
+              rng.uniform(800, 2000, n), R + target_altitude, mu,
+              lower, (15.0, 345 * g0), 100.0, iterations=10)
+    result["batch_solve_us"] = (time.perf_counter() - start) * 1e6
+    result["batch_size"] = n
+
+    laws = {
+        "kpkp.py (45-90 км)": ramp_law(45000, 90000, target_altitude),
+        "ksp.py (0.25-45 км)": ramp_law(250, 45000, target_altitude),
+        "ksp1.py (90 - h/H*90)": ramp_law(0, 500000, target_altitude),
+    }
+    runs = {}
+    for name, law in laws.items():
+        runs[name] = _fly(ksp_sim.Simulator(), law)
+    guidance = AscentGuidance(mu, R, target_altitude, stages, turn_start=250, turn_end=45000)
+    runs["PEG"] = _fly(ksp_sim.Simulator(), peg_law(guidance))
+    result["runs"] = runs
+    return result
+
+
+if __name__ == "__main__":
+    target = float(sys.argv[1]) if len(sys.argv) > 1 else 80000.0
+    result = benchmark(target)
+    print(f"PEG: решение за такт {result['solve_us']:.0f} мкс, "
+          f"{result['batch_size']} состояний за {result['batch_solve_us'] / 1000:.1f} мс")
+    for name, (fuel, ap, pe) in result["runs"].items():
+        if fuel is None:
+            print(f"{name}: орбита не достигнута (Ap {ap / 1000:.0f} км)")
+        else:
+            print(f"{name}: топливо до орбиты {fuel:.0f} кг, Ap {ap / 1000:.1f} км, Pe {pe / 1000:.1f} км")
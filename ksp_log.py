@@ -0,0 +1,105 @@
+"""Вывод в консоль и журнал вне цикла управления.
+
+Цикл управления только кладет компактную запись (шаблон и числа) в
+очередь - форматирование и запись в консоль, файл или панель делает
+фоновый поток. Очередь - collections.deque: добавление атомарно и не
+ждет блокировок. Если в очереди maxlen записей, новые строки состояния
+отбрасываются (счетчик dropped), так что медленный терминал или забитый
+канал никогда не задержат команды; события не отбрасываются.
+
+Статусные строки (status) выводятся в консоль не чаще console_rate раз
+в секунду - из идущих подряд показывается самая свежая. События (event)
+выводятся всегда. Консоль и файл получают записи в порядке поступления:
+строка состояния перед событием выводится до него. В файл пишется все,
+что не отброшено.
+
+    log = StatusLog(path="flight.log")
+    log.status("Высота: {:.1f} м, Скорость: {:.1f} м/с", altitude, speed)
+    log.event("Орбита достигнута!")
+    log.close()
+"""
+import sys
+import threading
+import time
+from collections import deque
+
+STATUS = 0
+EVENT = 1
+
+
+class StatusLog:
+    """Очередь записей и фоновый поток вывода."""
+
+    def __init__(self, path=None, console_rate=5.0, maxlen=4096, stream=None, sinks=()):
+        self.queue = deque()
+        self.maxlen = maxlen
+        self.dropped = 0
+        self.written = 0
+        self.stream = stream or sys.stdout
+        self.file = open(path, "a", encoding="utf-8") if path else None
+        self.sinks = list(sinks)  # дополнительные приемники: f(kind, text)
+        self.interval = 1.0 / console_rate
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="status-log", daemon=True)
+        self._thread.start()
+
+    def _push(self, kind, fmt, args):
+        if kind == STATUS and len(self.queue) >= self.maxlen:
+            self.dropped += 1  # Под нагрузкой теряются только строки состояния
+            return
+        self.queue.append((kind, time.time(), fmt, args))
+
+    def status(self, fmt, *args):
+        """Строка состояния: в консоль не чаще console_rate раз в секунду."""
+        self._push(STATUS, fmt, args)
+
+    def event(self, fmt, *args):
+        """Событие полета: выводится всегда."""
+        self._push(EVENT, fmt, args)
+
+    def _drain(self):
+        latest = None
+        lines = []
+        while True:
+            try:
+                kind, stamp, fmt, args = self.queue.popleft()
+            except IndexError:
+                break
+            text = fmt.format(*args) if args else fmt
+            if self.file is not None:
+                self.file.write(f"{stamp:.3f}\t{text}\n")
+            for sink in self.sinks:
+                sink(kind, text)
+            if kind == EVENT:
+                if latest is not None:
+                    lines.append(latest)  # Состояние до события - перед ним
+                    latest = None
+                lines.append(text)
+            else:
+                latest = text
+            self.written += 1
+        if latest is not None:
+            lines.append(latest)
+        if lines:
+            self.stream.write("\n".join(lines) + "\n")
+            self.stream.flush()
+        if self.file is not None:
+            self.file.flush()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._drain()
+        self._drain()
+
+    def close(self):
+        """Дожидается вывода оставшихся записей."""
+        self._stop.set()
+        self._thread.join()
+        if self.file is not None:
+            self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,290 @@
+"""Замеры задержек RPC, периода цикла и времени наведения.
+
+Metrics оборачивает подключение kRPC и собирает:
+    - гистограммы задержки каждого вызова по имени процедуры
+      (Flight.mean_altitude, AutoPilot.target_pitch_and_heading, ...);
+    - период и дрожание циклов управления (tick);
+    - время в разделах кода (section), например расчет наведения,
+      чтобы сравнить его с временем ожидания RPC.
+
+В конце полета export() пишет файл в текстовом формате Prometheus и
+сводку JSON (доля каждой процедуры в общем времени ввода-вывода).
+Выключенный Metrics ничего не оборачивает: tick() сразу возвращается,
+section() отдает общий пустой контекст.
+
+    metrics = Metrics.from_env("kpkp")  # включается KSP_METRICS=каталог
+    metrics.attach(conn)
+    while True:
+        metrics.tick("loop")
+        with metrics.section("guidance"):
+            ...
+    metrics.export()
+"""
+import bisect
+import contextlib
+import json
+import math
+import os
+import re
+import threading
+import time
+
+# Верхние границы корзин гистограмм, с
+BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025,
+           0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_NULL = contextlib.nullcontext()
+
+
+def _snake(name):
+    return re.sub(r"(?<=[a-z0-9])([A-Z])|(?<=[A-Z])([A-Z])(?=[a-z])", r"_\1\2", name).lower()
+
+
+def procedure_name(service, procedure):
+    """Имя вызова в виде Класс.свойство: Flight_get_MeanAltitude -> Flight.mean_altitude."""
+    parts = procedure.split("_")
+    if len(parts) == 1:
+        return f"{service}.{_snake(parts[0])}"
+    if parts[0] in ("get", "set"):
+        return f"{service}.{_snake(parts[1])}"
+    if len(parts) == 3 and parts[1] in ("get", "set"):
+        return f"{parts[0]}.{_snake(parts[2])}"
+    return f"{parts[0]}.{_snake(parts[-1])}"
+
+
+class Histogram:
+    """Гистограмма с фиксированными корзинами (как в Prometheus)."""
+
+    def __init__(self, buckets=BUCKETS):
+        self.bounds = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+        if value > self.max:
+            self.max = value
+
+    def quantile(self, q):
+        """Оценка квантиля по верхней границе корзины."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, n in zip(self.bounds, self.counts):
+            seen += n
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+    def summary(self):
+        mean = self.sum / self.count if self.count else 0.0
+        return {"count": self.count, "total": self.sum, "mean": mean,
+                "p50": self.quantile(0.5), "p95": self.quantile(0.95),
+                "p99": self.quantile(0.99), "max": self.max}
+
+
+class LoopStats:
+    """Период цикла: гистограмма и дрожание (стандартное отклонение)."""
+
+    def __init__(self):
+        self.period = Histogram()
+        self.last = None
+        self._mean = 0.0
+        self._m2 = 0.0
+
+    def tick(self, now):
+        if self.last is not None:
+            dt = now - self.last
+            self.period.observe(dt)
+            n = self.period.count
+            delta = dt - self._mean
+            self._mean += delta / n
+            self._m2 += delta * (dt - self._mean)
+        self.last = now
+
+    def summary(self):
+        n = self.period.count
+        result = self.period.summary()
+        result["jitter"] = math.sqrt(self._m2 / (n - 1)) if n > 1 else 0.0
+        return result
+
+
+class _TimedConnection:
+    # Обертка над сокетом RPC клиента krpc: запрос и ответ идут под
+    # блокировкой клиента, поэтому время между ними - задержка вызова
+    def __init__(self, inner, metrics):
+        self._inner = inner
+        self._metrics = metrics
+        self._name = None
+        self._start = 0.0
+
+    def send_message(self, message):
+        calls = getattr(message, "calls", None)
+        if calls is None:
+            self._name = None
+        elif len(calls) == 1:
+            self._name = procedure_name(calls[0].service, calls[0].procedure)
+        else:
+            self._name = "KRPC.Batch"
+        self._start = time.perf_counter()
+        return self._inner.send_message(message)
+
+    def receive_message(self, typ):
+        result = self._inner.receive_message(typ)
+        if self._name is not None:
+            self._metrics.observe(self._name, time.perf_counter() - self._start)
+        return result
+
+    def __getattr__(self, name):
+        return getattr(self._inner, name)
+
+
+class Metrics:
+    """Сбор и выгрузка метрик одного полета."""
+
+    def __init__(self, name="flight", enabled=True, directory="."):
+        self.name = name
+        self.enabled = enabled
+        self.directory = directory
+        self.calls = {}  # процедура -> Histogram
+        self.loops = {}  # цикл -> LoopStats
+        self.sections = {}  # раздел -> Histogram
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls, name, variable="KSP_METRICS"):
+        """Включен, если задана переменная окружения (каталог для выгрузки)."""
+        directory = os.environ.get(variable)
+        return cls(name, enabled=bool(directory), directory=directory or ".")
+
+    def attach(self, conn):
+        """Оборачивает подключение: настоящий клиент krpc или модель ksp_sim."""
+        if not self.enabled:
+            return conn
+        if hasattr(conn, "_rpc_connection"):
+            conn._rpc_connection = _TimedConnection(conn._rpc_connection, self)
+        else:
+            call = conn._call
+
+            def timed_call(procedure):
+                start = time.perf_counter()
+                call(procedure)
+                if not conn._streaming:
+                    self.observe(procedure, time.perf_counter() - start)
+
+            conn._call = timed_call
+        return conn
+
+    def observe(self, name, seconds):
+        with self._lock:
+            histogram = self.calls.get(name)
+            if histogram is None:
+                histogram = self.calls[name] = Histogram()
+            histogram.observe(seconds)
+
+    def tick(self, loop="loop"):
+        """Отметка начала такта цикла loop."""
+        if not self.enabled:
+            return
+        stats = self.loops.get(loop)
+        if stats is None:
+            stats = self.loops[loop] = LoopStats()
+        stats.tick(time.perf_counter())
+
+    def section(self, name):
+        """Контекст замера времени раздела кода (например, расчета наведения)."""
+        if not self.enabled:
+            return _NULL
+        return self._section(name)
+
+    @contextlib.contextmanager
+    def _section(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                histogram = self.sections.get(name)
+                if histogram is None:
+                    histogram = self.sections[name] = Histogram()
+                histogram.observe(elapsed)
+
+    def summary(self):
+        """Сводка: вызовы по убыванию общего времени, циклы, разделы."""
+        io_total = sum(h.sum for h in self.calls.values())
+        calls = {}
+        for name, h in sorted(self.calls.items(), key=lambda item: -item[1].sum):
+            calls[name] = h.summary()
+            calls[name]["share"] = h.sum / io_total if io_total else 0.0
+        return {
+            "name": self.name,
+            "io_total": io_total,
+            "calls": calls,
+            "loops": {name: s.summary() for name, s in self.loops.items()},
+            "sections": {name: h.summary() for name, h in self.sections.items()},
+        }
+
+    def prometheus(self):
+        """Метрики в текстовом формате Prometheus."""
+        lines = []
+
+        def histogram(metric, label, key, h):
+            cumulative = 0
+            for bound, n in zip(h.bounds, h.counts):
+                cumulative += n
+                lines.append(f'{metric}_bucket{{{label}="{key}",le="{bound}"}} {cumulative}')
+            lines.append(f'{metric}_bucket{{{label}="{key}",le="+Inf"}} {h.count}')
+            lines.append(f'{metric}_sum{{{label}="{key}"}} {h.sum!r}')
+            lines.append(f'{metric}_count{{{label}="{key}"}} {h.count}')
+
+        lines.append("# HELP krpc_call_seconds Задержка вызова kRPC по процедурам.")
+        lines.append("# TYPE krpc_call_seconds histogram")
+        for name, h in sorted(self.calls.items()):
+            histogram("krpc_call_seconds", "procedure", name, h)
+        lines.append("# HELP control_loop_period_seconds Период такта цикла управления.")
+        lines.append("# TYPE control_loop_period_seconds histogram")
+        for name, s in sorted(self.loops.items()):
+            histogram("control_loop_period_seconds", "loop", name, s.period)
+        lines.append("# HELP control_loop_jitter_seconds Стандартное отклонение периода.")
+        lines.append("# TYPE control_loop_jitter_seconds gauge")
+        for name, s in sorted(self.loops.items()):
+            lines.append(f'control_loop_jitter_seconds{{loop="{name}"}} {s.summary()["jitter"]!r}')
+        lines.append("# HELP section_seconds Время в разделах кода.")
+        lines.append("# TYPE section_seconds histogram")
+        for name, h in sorted(self.sections.items()):
+            histogram("section_seconds", "section", name, h)
+        return "\n".join(lines) + "\n"
+
+    def export(self, directory=None):
+        """Пишет <name>.prom и <name>.json; возвращает сводку."""
+        if not self.enabled:
+            return None
+        directory = directory or self.directory
+        os.makedirs(directory, exist_ok=True)
+        base = os.path.join(directory, self.name)
+        with open(base + ".prom", "w", encoding="utf-8") as f:
+            f.write(self.prometheus())
+        summary = self.summary()
+        with open(base + ".json", "w", encoding="utf-8") as f:
+            json.dump(summary, f, ensure_ascii=False, indent=2)
+        return summary
+
+    def report(self, top=10):
+        """Короткая таблица самых дорогих вызовов."""
+        summary = self.summary()
+        lines = [f"Ввод-вывод: {summary['io_total'] * 1000:.1f} мс"]
+        for name, s in list(summary["calls"].items())[:top]:
+            lines.append(f"  {name}: {s['count']} вызовов, {s['total'] * 1000:.1f} мс "
+                         f"({s['share'] * 100:.0f}%), p95 {s['p95'] * 1000:.2f} мс")
+        for name, s in summary["sections"].items():
+            lines.append(f"  [{name}]: {s['total'] * 1000:.1f} мс за {s['count']} раз")
+        for name, s in summary["loops"].items():
+            lines.append(f"  цикл {name}: период {s['mean'] * 1000:.1f} мс, "
+                         f"дрожание {s['jitter'] * 1000:.2f} мс")
+        return "\n".join(lines)
@@ -0,0 +1,880 @@
+"""Общий движок миссий с декларативными профилями.
+
+Скрипты kpkp.py, ksp.py, ksp1.py, ksp1_update.py, ksp_tel.py и ksppp.py
+повторяли одно и то же: подключение, настройка автопилота, программа
+тангажа, сброс ступеней, проверка орбиты, телеметрия. Здесь это сделано
+один раз: миссия описывается профилем (словарь или TOML/YAML-файл в
+missions/) из фаз, условий и законов наведения, а каждый скрипт только
+запускает свой профиль - launch(path). Движок выполняет все фазы в одном
+цикле на одном подключении и одном конвейере телеметрии (потоки
+TelemetryStream, кэш команд ControlOutputs, планировщик Scheduler,
+буфер TelemetryBuffer).
+
+Профиль:
+    name       - имя миссии; connection - имя подключения kRPC
+    id         - имя файлов миссии, по умолчанию имя файла профиля:
+                 {id}.tlm, {id}.png, {id}.log, {id}.ckpt, журналы
+                 KSP_RECORD, KSP_METRICS, KSP_BROADCAST и запись в архиве
+                 KSP_ARCHIVE
+    setup, finish - действия в начале и в конце полета
+    on_attach  - действия на каждом подключении, в том числе после обрыва
+                 связи (настройки автопилота сервер сбрасывает с клиентом)
+    rates      - частоты задач, Гц: {"guidance": 20, "telemetry": 10}
+    max_duration - предел полета, с UT
+    telemetry  - {"columns": {колонка: поле снимка или "elapsed"}} - буфер
+                 {id}.tlm; без columns - все поля снимка
+    resources  - {поле снимка: ресурс}: остаток ресурса корабля как поле
+                 снимка, например {"fuel": "LiquidFuel"}; остаток поля fuel
+                 в конце полета - fuel_remaining в архиве (без поля -
+                 ресурс условия fuel_below или LiquidFuel)
+    plot       - {"panels": [...]} - графики по колонкам телеметрии (ksp_plot)
+    status     - {"format": "...", "fields": [...]} - строка состояния на
+                 такте телеметрии (ksp_log); поля - как в columns
+    log        - true: события и строки состояния еще и в {id}.log
+    checkpoint - true: контрольная точка {id}.ckpt на каждом такте; после
+                 падения скрипт продолжает полет с той же фазы (ksp_checkpoint)
+    peg        - замкнутое наведение ksp_guidance.AscentGuidance: target,
+                 turn_start, turn_end; ступени модели читаются с корабля
+                 (ksp_guidance.stages_from_vessel), а stages -
+                 [{thrust, burn_time}, ...] или [{thrust, isp, fuel_mass}, ...]
+                 снизу вверх - задает их таблицей
+    params     - параметры полета для архива
+    phases     - фазы
+
+Фаза профиля:
+    name       - имя фазы
+    on_enter   - действия при входе в фазу
+    guidance   - закон тангажа: {"law": "ramp" | "linear" | "k" | "hold" | "peg", ...};
+                 "offload": true - считать в пуле процессов compute (для
+                 тяжелых законов, у легких передача дороже расчета)
+    rates      - частоты задач в этой фазе, Гц: {"guidance": 1, "telemetry": 1}
+    events     - последовательные события внутри фазы: [{"when": {...}, "do": [...]}],
+                 проверяется только первое еще не сработавшее
+    until      - условия окончания фазы (любое из них)
+    cutoff     - апоцентр, м: фаза кончается в расчетный момент выключения
+                 двигателя по прогнозу ksp_orbit.OrbitPredictor - разовым
+                 сроком планировщика между тактами
+    then       - действия при выходе из фазы
+    warp       - ускорять время до ближайшего условия по времени (duration,
+                 since_stage, ut_after) в until или events, см. ksp_warp;
+                 в ksp_fleet множитель общий: пока другой корабль под
+                 управлением, время не ускоряется
+
+Условия: altitude_above, apoapsis_above, periapsis_above, speed_above,
+orbital_speed (скорость >= круговой на заданной высоте), fuel_below
+[ресурс, остаток] (остаток всего корабля, вместе с верхними ступенями),
+thrust_below (доступная тяга, Н: 1 - двигатели ступени выгорели),
+mass_below, duration (секунд UT в фазе), since_stage (секунд UT после
+последнего сброса ступени), ut_after, peg_done (PEG выключил двигатель, и
+апоцентр и перицентр не дальше допуска от высоты target: true - PEG_TOLERANCE,
+число - допуск, м). Все, кроме peg_done, - серверные выражения kRPC
+(ksp_events): при входе в фазу и после каждого события они регистрируются
+на сервере, сервер проверяет их сам, а такт читает только флаги
+сработавших.
+
+Действия: "stage", "ignite" (сброс ступени, только если двигатели еще не
+работают: тот же профиль для корабля на столе и уже взлетевшего; ступень
+наведения PEG не меняет), "end" (завершить миссию), {"throttle": x},
+{"engage": true}, {"sas": true}, {"rcs": false}, {"pitch_heading": [p, h]},
+{"roll": r}, {"print": "текст"},
+{"autopilot": {"stopping_time": ..., "max_rotation_rate": ...}}.
+
+Без conn миссия подключается сама через ksp_checkpoint.Session: после
+обрыва связи - новое подключение, on_attach заново, и планировщик
+продолжает с той же фазы.
+
+    python ksp_mission.py missions/ksp_tel.toml
+"""
+import os
+import sys
+import threading
+from collections import namedtuple
+from types import SimpleNamespace
+
+from ksp_broadcast import Broadcaster
+from ksp_checkpoint import Checkpoint, Session, disconnected
+from ksp_control import ControlOutputs
+from ksp_events import Triggers
+from ksp_metrics import Metrics
+from ksp_orbit import OrbitPredictor, orbital_speed
+from ksp_physics import from_server, g0
+from ksp_recorder import Recorder
+from ksp_scheduler import clock_for, scheduler_for
+from ksp_startup import lazy
+from ksp_stream import FIELDS, TelemetryStream
+from ksp_telemetry import TelemetryBuffer
+from ksp_warp import WarpManager
+
+# Импорт asyncio стоит десятки мс - до первой команды он не нужен
+asyncio = lazy("asyncio")
+
+RATES = {"guidance": 20, "telemetry": 10}
+PEG_TOLERANCE = 5000.0  # допуск апсид от целевой высоты PEG для peg_done, м
+STAGE_KEYS = ("thrust", "isp", "dry_mass", "fuel_mass")
+
+
+# Законы наведения: (параметры фазы, снимок) -> (тангаж, курс) или None
+
+def law_hold(g, snap):
+    return g.get("pitch", 90.0), g.get("heading", 90.0)
+
+
+def law_ramp(g, snap):
+    """Линейный разворот kpkp.py/ksp.py: 90 -> end_pitch между start и end."""
+    start, end = g["start"], g["end"]
+    if snap.altitude <= start:
+        return None
+    frac = min((snap.altitude - start) / (end - start), 1.0)
+    return 90.0 - frac * (90.0 - g.get("end_pitch", 0.0)), g.get("heading", 90.0)
+
+
+def law_linear(g, snap):
+    """Закон ksp1.py/ksp_tel.py: 90 - h / target * span в пределах [min, max]."""
+    pitch = 90.0 - snap.altitude / g["target"] * g.get("span", 90.0)
+    return max(g.get("min", 0.0), min(pitch, g.get("max", 90.0))), g.get("heading", 90.0)
+
+
+def law_k(g, snap):
+    """Закон k * (h - h_start) в пределах [0, 90]."""
+    pitch = g.get("k", 0.00001) * (snap.altitude - g.get("h_start", 0.0))
+    return max(0.0, min(pitch, 90.0)), g.get("heading", 90.0)
+
+
+# "peg" - не функция: у наведения есть состояние, его ведет Mission
+GUIDANCE = {"hold": law_hold, "ramp": law_ramp, "linear": law_linear, "k": law_k}
+
+
+def _trigger(mission, name, value):
+    """Серверный триггер ksp_events для условия; None - условие проверяет клиент."""
+    triggers, vessel = mission.triggers, mission.vessel
+    if name == "altitude_above":
+        return triggers.altitude_above(vessel, value)
+    if name == "apoapsis_above":
+        return triggers.apoapsis_above(vessel, value)
+    if name == "periapsis_above":
+        return triggers.periapsis_above(vessel, value)
+    if name == "speed_above":
+        return triggers.speed_above(vessel, value, mission.frame)
+    if name == "orbital_speed":
+        return triggers.all(
+            triggers.altitude_above(vessel, value),
+            triggers.speed_above(vessel, orbital_speed(mission.mu, mission.radius, value), mission.frame))
+    if name == "fuel_below":
+        resource, threshold = value
+        return triggers.fuel_depleted(vessel, resource, threshold)
+    if name == "thrust_below":
+        # Сервер видит состояние уже после сброса ступени, а не снимок до него
+        return triggers.thrust_below(vessel, value)
+    if name == "mass_below":
+        return triggers.mass_below(vessel, value)
+    if name == "duration":
+        return triggers.ut_after(mission.phase_start + value)
+    if name == "since_stage":
+        return triggers.ut_after(mission.last_stage + value)
+    if name == "ut_after":
+        return triggers.ut_after(value)
+    if name == "peg_done":
+        return None  # Газ PEG знает только клиент
+    raise ValueError(f"Неизвестное условие: {name}")
+
+
+def _check(mission, name, value, snap):
+    # Условия без серверного выражения
+    if name == "peg_done":
+        # Выключение по PEG еще не орбита: если модель ступеней разошлась с
+        # ракетой, фаза не кончается, и профиль решает событиями, что дальше
+        if not value or mission.peg_throttle != 0.0:
+            return False
+        tolerance = PEG_TOLERANCE if value is True else value
+        target = mission.profile["peg"]["target"]
+        return (abs(snap.apoapsis - target) <= tolerance and abs(snap.periapsis - target) <= tolerance
+                and snap.periapsis >= mission.physics.atmosphere_depth)
+    raise ValueError(f"Неизвестное условие: {name}")
+
+
+Fired = namedtuple("Fired", ["mask"])
+
+
+class _Fired:
+    # Флаги сработавших триггеров фазы (бит - номер условия). Обратные
+    # вызовы событий только ставят биты, а такт наведения читает их через
+    # самописец: для логики это вход, как снимок телеметрии, и при
+    # воспроизведении он берется из журнала
+    _tuple = Fired
+
+    def __init__(self):
+        self.mask = 0
+        self._lock = threading.Lock()
+
+    def set(self, bit):
+        with self._lock:
+            self.mask |= bit
+
+    def clear(self):
+        with self._lock:
+            self.mask = 0
+
+    def read(self):
+        return Fired(self.mask)
+
+
+class _VesselStages:
+    # Ступени корабля для PEG - тоже вход логики: читаются через самописец,
+    # и при воспроизведении таблица берется из журнала, а не с модели
+    _tuple = None
+
+    def __init__(self, vessel):
+        self.vessel = vessel
+
+    def read(self):
+        from ksp_guidance import stages_from_vessel
+        stages = stages_from_vessel(self.vessel)
+        if not stages:
+            raise ValueError("У корабля нет ступеней с двигателями")
+        names = [f"{key}_{i}" for i in range(len(stages)) for key in STAGE_KEYS]
+        return namedtuple("Stages", names)(*(s[key] for s in stages for key in STAGE_KEYS))
+
+
+def _unpack_stages(table):
+    n = len(STAGE_KEYS)
+    return [dict(zip(STAGE_KEYS, table[i:i + n])) for i in range(0, len(table), n)]
+
+
+def _actions(profile):
+    # Все действия профиля
+    for key in ("setup", "on_attach", "finish"):
+        yield from profile.get(key) or []
+    for phase in profile["phases"]:
+        for key in ("on_enter", "then"):
+            yield from phase.get(key) or []
+        for event in phase.get("events", []):
+            yield from event["do"]
+
+
+def _conditions(profile):
+    # Группы условий профиля: until и when событий всех фаз
+    for phase in profile["phases"]:
+        yield phase.get("until") or {}
+        for event in phase.get("events", []):
+            yield event["when"]
+
+
+def _fields(profile):
+    # Поля снимка, которые профиль читает сверх FIELDS
+    names = set((profile.get("telemetry") or {}).get("columns", {}).values())
+    names.update((profile.get("status") or {}).get("fields", ()))
+    if "ignite" in _actions(profile):
+        names.add("thrust")
+    if profile.get("peg"):
+        names.update(("thrust", "vertical_speed", "horizontal_speed"))
+    return names - {name for name, _, _ in FIELDS} - {"elapsed"}
+
+
+def _stages(peg):
+    # Ступени модели для AscentGuidance из таблицы профиля
+    if all("burn_time" in s for s in peg["stages"]):
+        from ksp_batch import stages_from_burn_times
+        return stages_from_burn_times(peg["stages"])
+    from ksp_guidance import stages_from_constants
+    return stages_from_constants(*zip(*((s["thrust"], s["isp"], s["fuel_mass"]) for s in peg["stages"])))
+
+
+def _release(close):
+    # Потоки прежнего подключения: сервер снял их вместе с клиентом,
+    # ошибка связи при отписке не важна
+    try:
+        close()
+    except Exception as exc:
+        if not disconnected(exc):
+            raise
+
+
+def load_profile(path):
+    """Читает профиль из TOML (.toml) или YAML (.yaml/.yml); id - имя файла."""
+    if path.endswith((".yaml", ".yml")):
+        import yaml
+        with open(path) as f:
+            profile = yaml.safe_load(f)
+    else:
+        import tomllib
+        with open(path, "rb") as f:
+            profile = tomllib.load(f)
+    profile.setdefault("id", os.path.splitext(os.path.basename(path))[0])
+    return profile
+
+
+class Mission:
+    """Выполнение одного профиля на одном подключении.
+
+    По умолчанию управляется активный корабль; conn, vessel, scheduler,
+    compute и warp задает ksp_fleet, когда кораблей несколько: общий пул
+    подключений, свой планировщик на корабль, пул процессов для законов
+    наведения и общее ускорение времени (ksp_warp.FleetWarp), в котором
+    голосует каждый корабль, даже без фаз с warp.
+    """
+
+    def __init__(self, profile, conn=None, vessel=None, scheduler=None, compute=None, warp=None):
+        self.profile = profile
+        self.id = profile.get("id") or profile["name"]
+        self.compute = compute
+        self.shared_warp = warp
+        self.phases = profile["phases"]
+        self.index = -1
+        self.phase_start = 0.0
+        self.last_stage = 0.0
+        self.event_index = 0
+        self.start_ut = None
+        self.stage = 0  # ступень для PEG: 0 - первая работающая
+        self.staging = []  # UT сбросов ступеней для архива
+        self.peg_throttle = None
+        self.cutoff_ut = None
+        self.log = []  # (UT, фаза, сообщение)
+        # Срок выключения и такт наведения идут в разных потоках пула
+        self.lock = threading.RLock()
+        self.fields = _fields(profile)
+
+        self.metrics = Metrics.from_env(self.id)  # KSP_METRICS=каталог
+        self.recorder = Recorder.from_env(self.id)  # KSP_RECORD=каталог
+        self.triggers = None
+        self.armed = []  # (группа "until" | "event", условие, значение, триггер, бит)
+        self.generation = 0  # номер набора триггеров: поздние вызовы старых не считаются
+        self._fired = _Fired()
+        self.fired = self.recorder.batch(self._fired, "triggers")
+        self.broadcast = Broadcaster.from_env(self.id)  # KSP_BROADCAST=shm|udp
+        self.status_log = None
+        if profile.get("status") or profile.get("log"):
+            from ksp_log import StatusLog
+            self.status_log = StatusLog(path=f"{self.id}.log" if profile.get("log") else None)
+
+        self.checkpoint = None
+        self.state = None
+        if profile.get("checkpoint"):
+            self.checkpoint = Checkpoint(f"{self.id}.ckpt", self._checkpoint_fields())
+            self.state = self.checkpoint.load()  # None - новый полет
+        if self.state is not None:
+            self._restore(self.state)
+
+        self.vessel = vessel
+        self.tel = None
+        self.warp = None
+        self.orbit = None
+        self.ascent = None
+        self.outputs = None
+        self.scheduler = None
+        self.session = None
+        if conn is None:
+            # Свое подключение: после обрыва связи - заново и attach();
+            # сообщения о связи - в журнал миссии
+            self.session = Session(profile.get("connection", profile["name"]), self.attach,
+                                   log=self.say)
+        else:
+            self.attach(conn)
+
+        self.telemetry = None
+        self.columns = None
+        if profile.get("telemetry") is not None:
+            columns = profile["telemetry"].get("columns") or {f: f for f in self.tel.Snapshot._fields}
+            self.columns = list(columns.values())
+            self.telemetry = TelemetryBuffer(list(columns), path=f"{self.id}.tlm",
+                                             resume=self.state and self.state["telemetry"])
+            if self.checkpoint is not None:
+                self.checkpoint.buffers.append(self.telemetry)  # Курсор в точке не обгонит файл
+        self.plot = None
+        if profile.get("plot"):
+            from ksp_plot import LivePlot
+            self.plot = LivePlot(self.telemetry.fields, profile["plot"]["panels"], path=f"{self.id}.png")
+
+        self.scheduler = scheduler or scheduler_for(self.conn)
+        rates = dict(RATES, **profile.get("rates", {}))
+        self.scheduler.add("guidance", self.guidance, rates["guidance"])
+        self.scheduler.add("telemetry", self.record, rates["telemetry"])
+        self.until = None
+
+    def attach(self, conn):
+        """Корабль, потоки и выходы управления на подключении: при старте и после обрыва связи."""
+        if self.tel is not None:
+            _release(self.tel.close)
+        if self.warp is not None:
+            _release(self.warp.detach)
+        if self.orbit is not None:
+            _release(self.orbit.close)
+        self.disarm()
+        self.conn = conn
+        self.metrics.attach(conn)  # Без KSP_METRICS подключение не оборачивается
+        if self.session is not None or self.vessel is None:
+            self.vessel = conn.space_center.active_vessel
+        vessel = self.vessel
+        body = vessel.orbit.body
+        # Параметры тела читаем один раз на процесс (кэш ksp_physics)
+        self.physics = from_server(conn, body)
+        self.mu = self.physics.mu
+        self.radius = self.physics.radius
+        self.frame = body.reference_frame
+        self.triggers = Triggers(conn)
+
+        extra = {}
+        if "thrust" in self.fields:
+            extra["thrust"] = (getattr, vessel, "available_thrust")
+        inertial = None
+        for name in ("vertical_speed", "horizontal_speed"):
+            if name in self.fields:
+                # Орбитальные скорости для наведения
+                inertial = inertial or vessel.flight(body.non_rotating_reference_frame)
+                extra[name] = (getattr, inertial, name)
+        for name, resource in (self.profile.get("resources") or {}).items():
+            extra[name] = (vessel.resources.amount, resource)
+        unknown = self.fields - set(extra)
+        if unknown:
+            raise ValueError(f"Неизвестные поля снимка: {', '.join(sorted(unknown))}")
+        self.tel = self.recorder.stream(TelemetryStream(conn, vessel, body.reference_frame, extra=extra))
+        if self.outputs is None:
+            self.outputs = self.recorder.outputs(ControlOutputs(vessel))
+        else:
+            self.outputs.rebind(vessel)  # Сервер отпустил автопилот - последние команды уйдут заново
+
+        if self.ascent is None and self.profile.get("peg"):
+            from ksp_guidance import AscentGuidance
+            peg = self.profile["peg"]
+            if peg.get("stages"):
+                stages = _stages(peg)
+                self.stage_base, self.stages_ut = 0, 0.0
+            else:
+                # Ступени, еще не отделенные к этому моменту: при продолжении
+                # полета первая из них - текущая, с остатком топлива на UT точки
+                stages = _unpack_stages(self.recorder.batch(_VesselStages(vessel), "stages").read())
+                self.stage_base = self.stage
+                self.stages_ut = self.state["ut"] if self.state is not None else 0.0
+            self.ascent = AscentGuidance(self.mu, self.radius, peg["target"], stages,
+                                         turn_start=peg.get("turn_start", 250.0),
+                                         turn_end=peg.get("turn_end", 45000.0))
+            self.burn_times = [s["fuel_mass"] * s["isp"] * g0 / s["thrust"] for s in stages]
+            if self.state is not None:
+                self.ascent.restore(self.state)
+        # Прогноз, ускорение времени и часы планировщика держат подключение
+        self.warp = None
+        if self.shared_warp is not None or any(phase.get("warp") for phase in self.phases):
+            self.warp = WarpManager(conn, vessel, shared=self.shared_warp)
+        self.orbit = None
+        if 0 <= self.index < len(self.phases) and self.phase.get("cutoff") is not None:
+            self.orbit = OrbitPredictor(conn, vessel, recorder=self.recorder)
+        if self.scheduler is not None:
+            self.scheduler.clock = clock_for(conn)
+        if 0 <= self.index < len(self.phases):
+            self.arm()  # События старого подключения сервер снял вместе с ним
+        self.act(self.profile.get("on_attach"), None)
+
+    def _checkpoint_fields(self):
+        # Каждое "stage" вне on_attach срабатывает за полет не больше раза
+        stages = sum(action == "stage" for action in _actions(self.profile))
+        stages -= sum(action == "stage" for action in self.profile.get("on_attach") or [])
+        fields = {"phase": "q", "event": "q", "phase_start": "d", "last_stage": "d",
+                  "start": "d", "stage": "q", "staging": f"{max(stages, 1)}d", "telemetry": "q",
+                  "cutoff_ut": "d", "throttle": "d"}
+        if self.profile.get("peg"):
+            from ksp_guidance import AscentGuidance
+            fields.update({name: "d" for name in AscentGuidance.STATE})
+        return fields
+
+    def _restore(self, state):
+        # Фаза, ступени и сроки прерванного полета; наведение - в attach()
+        self.index = int(state["phase"])
+        self.event_index = int(state["event"])
+        self.phase_start = state["phase_start"]
+        self.last_stage = state["last_stage"]
+        self.start_ut = state["start"]
+        self.stage = int(state["stage"])
+        self.staging = state["staging"]
+        self.cutoff_ut = state["cutoff_ut"]
+
+    def save(self, ut):
+        """Контрольная точка такта: фаза, ступени, газ и состояние наведения."""
+        self.checkpoint.save(
+            ut, phase=self.index, event=self.event_index, phase_start=self.phase_start,
+            last_stage=self.last_stage, start=self.start_ut, stage=self.stage,
+            staging=self.staging, telemetry=len(self.telemetry) if self.telemetry is not None else 0,
+            cutoff_ut=self.cutoff_ut, throttle=self.outputs.sent.get("throttle"),
+            **(self.ascent.state() if self.ascent is not None else {}))
+
+    @property
+    def phase(self):
+        return self.phases[self.index]
+
+    def say(self, text, ut=None):
+        phase = self.phase["name"] if 0 <= self.index < len(self.phases) else None
+        self.log.append((ut, phase, text))
+        if self.status_log is not None:
+            self.status_log.event("{}", text)  # Выводит фоновый поток
+        else:
+            print(text)
+
+    def act(self, actions, ut):
+        for action in actions or []:
+            if action == "ignite":
+                # Тяга из снимка, а не отдельным RPC: вход логики попадает в журнал полета
+                if self.tel.snapshot().thrust > 0:
+                    continue  # Двигатели уже работают: ступень не сбрасываем
+                self.outputs.stage()
+                self.last_stage = ut
+                continue
+            if action == "stage":
+                self.outputs.stage()
+                self.last_stage = ut
+                self.stage += 1
+                self.staging.append(ut)  # Момент отделения для архива полетов
+                continue
+            if action == "end":
+                # Досрочное завершение миссии
+                self.index = len(self.phases)
+                self.scheduler.stop()
+                continue
+            for name, value in action.items():
+                if name == "throttle":
+                    self.outputs.set_throttle(value)
+                elif name == "engage":
+                    self.outputs.engage() if value else self.outputs.disengage()
+                elif name == "sas":
+                    self.outputs.set_sas(value)
+                elif name == "rcs":
+                    self.outputs.set_rcs(value)
+                elif name == "pitch_heading":
+                    self.outputs.set_pitch_heading(*value)
+                elif name == "roll":
+                    self.outputs.set_roll(value)
+                elif name == "print":
+                    self.say(value, ut)
+                elif name == "autopilot":
+                    auto_pilot = self.vessel.auto_pilot
+                    for key, setting in value.items():
+                        if key == "reference_frame" and setting == "surface":
+                            setting = self.vessel.surface_reference_frame
+                        elif isinstance(setting, list):
+                            setting = tuple(setting)
+                        setattr(auto_pilot, key, setting)
+                else:
+                    raise ValueError(f"Неизвестное действие: {name}")
+
+    def enter(self, index, ut):
+        self.index = index
+        self.cutoff_ut = None
+        if self.orbit is not None:
+            self.orbit.close()
+            self.orbit = None
+        if self.warp is not None:
+            self.warp.stop()
+        if index >= len(self.phases):
+            self.disarm()
+            self.scheduler.stop()
+            return
+        self.phase_start = ut
+        self.event_index = 0
+        phase = self.phase
+        if phase.get("cutoff") is not None:
+            # Прогноз апоцентра между тактами: вектор состояния раз в секунду
+            self.orbit = OrbitPredictor(self.conn, self.vessel, recorder=self.recorder)
+        if phase.get("rates"):
+            self.scheduler.set_rates(phase["rates"])
+        self.act(phase.get("on_enter"), ut)
+        self.arm()  # После on_enter: since_stage считается от его сброса ступени
+
+    def leave(self, ut):
+        """Конец текущей фазы: then и вход в следующую."""
+        self.act(self.phase.get("then"), ut)
+        self.outputs.flush()
+        self.enter(self.index + 1, ut)
+
+    def arm(self):
+        """Регистрирует на сервере условия фазы: until и текущего события.
+
+        Сервер проверяет выражения сам, обратный вызов только ставит бит в
+        _fired; такт не считает условия по снимку телеметрии.
+        """
+        self.disarm()
+        self.generation += 1
+        phase = self.phase
+        groups = [("until", phase.get("until") or {})]
+        events = phase.get("events", [])
+        if self.event_index < len(events):
+            groups.append(("event", events[self.event_index]["when"]))
+        for group, conditions in groups:
+            for name, value in conditions.items():
+                trigger = _trigger(self, name, value)
+                bit = 1 << len(self.armed)
+                if trigger is not None:
+                    trigger.on(lambda bit=bit, generation=self.generation: self._hit(bit, generation))
+                self.armed.append((group, name, value, trigger, bit))
+
+    def _hit(self, bit, generation):
+        # Поток клиента kRPC: только флаг, решение - на такте наведения
+        if generation == self.generation:
+            self._fired.set(bit)
+
+    def disarm(self):
+        """Снимает триггеры фазы с сервера."""
+        self.generation += 1
+        self._fired.clear()
+        for _, _, _, trigger, _ in self.armed:
+            if trigger is not None:
+                _release(trigger.remove)
+        self.armed = []
+
+    def conditions_met(self, group, fired, snap):
+        """Выполнено ли условие группы: бит сработавшего триггера или проверка клиента."""
+        return any(fired & bit if trigger is not None else _check(self, name, value, snap)
+                   for g, name, value, trigger, bit in self.armed if g == group)
+
+    def deadline(self, conditions):
+        """UT ближайшего условия по времени или None."""
+        times = []
+        for name, value in (conditions or {}).items():
+            if name == "duration":
+                times.append(self.phase_start + value)
+            elif name == "since_stage":
+                times.append(self.last_stage + value)
+            elif name == "ut_after":
+                times.append(value)
+        return min(times, default=None)
+
+    def peg(self, g, snap):
+        """Тангаж и курс PEG; когда PEG сходится, двигатель выключается.
+
+        Газ PEG остается в peg_throttle для peg_done.
+        """
+        stage = self.stage - self.stage_base
+        burn_left = None
+        if stage < len(self.burn_times) - 1:
+            # PEG планирует следующую ступень после остатка работы текущей
+            burn_left = max(self.burn_times[stage] - (snap.ut - max(self.last_stage, self.stages_ut)), 0.0)
+        pitch, throttle = self.ascent.command(
+            snap.ut, snap.altitude, snap.vertical_speed, snap.horizontal_speed,
+            snap.thrust, snap.mass, stage, burn_left)
+        if throttle == 0.0 and self.peg_throttle != 0.0:
+            self.outputs.set_throttle(0.0)
+            self.say(f"PEG: выключение двигателя, Ap {snap.apoapsis / 1000:.1f} км, "
+                     f"Pe {snap.periapsis / 1000:.1f} км", snap.ut)
+        self.peg_throttle = throttle
+        return pitch, g.get("heading", 90.0)
+
+    def guidance(self, ut):
+        self.metrics.tick("guidance")
+        # Расчет, отправка команд и запись точки - в разных разделах замеров
+        with self.lock:
+            with self.metrics.section("guidance"):
+                snap = self.tel.snapshot()
+                if self.session is not None:
+                    self.session.heartbeat(snap.ut)  # Потоки после обрыва молча стоят: UT не меняется
+                self.step(snap)
+            with self.metrics.section("flush"):
+                self.outputs.flush()  # Одна отправка изменившихся команд за такт
+            if self.checkpoint is not None and self.index < len(self.phases):
+                with self.metrics.section("checkpoint"):
+                    self.save(snap.ut)
+
+    def step(self, snap):
+        if self.index < 0:
+            self.enter(0, snap.ut)
+        if self.index >= len(self.phases):
+            return
+        phase = self.phase
+
+        g = phase.get("guidance")
+        if g:
+            if g["law"] == "peg":
+                command = self.peg(g, snap)
+            elif self.compute is None or not g.get("offload"):
+                command = GUIDANCE[g["law"]](g, snap)
+            else:
+                # Расчет в пуле процессов: ждет только такт этого корабля
+                command = self.compute.submit(
+                    GUIDANCE[g["law"]], g, SimpleNamespace(**snap._asdict())).result()
+            if command is not None:
+                self.outputs.set_pitch_heading(*command)
+
+        fired = int(self.fired.read().mask)  # Вход логики: в журнал полета (там float64)
+        events = phase.get("events", [])
+        advanced = False
+        if self.event_index < len(events):
+            event = events[self.event_index]
+            if self.conditions_met("event", fired, snap):
+                self.act(event["do"], snap.ut)
+                self.event_index += 1
+                advanced = True
+                if self.index >= len(self.phases):
+                    return
+
+        until = phase.get("until")
+        if phase.get("warp"):
+            # Ускорение до ближайшего события фазы, снимается заранее
+            deadlines = [self.deadline(until)]
+            if self.event_index < len(events):
+                deadlines.append(self.deadline(events[self.event_index]["when"]))
+            deadlines = [t for t in deadlines if t is not None]
+            if deadlines:
+                self.warp.update(snap.ut, min(deadlines))
+            else:
+                self.warp.stop()
+
+        if phase.get("cutoff") is not None and self.cutoff(phase["cutoff"], snap):
+            self.leave(snap.ut)
+        elif until and self.conditions_met("until", fired, snap):
+            self.leave(snap.ut)
+        elif advanced:
+            self.arm()  # Следующее событие фазы; since_stage - от нового сброса
+
+    def cutoff(self, target, snap):
+        """Пора ли выключать двигатель на этом такте; если момент придется
+        между тактами - разовый срок планировщика, такт его не ждет."""
+        if self.cutoff_ut is not None:
+            # Срок пропадает вместе с планировщиком (обрыв связи) - тогда по такту
+            return snap.ut >= self.cutoff_ut
+        period = self.scheduler.tasks["guidance"].period
+        remaining = self.orbit.cutoff(target, horizon=period, ut=snap.ut)
+        if remaining is None:
+            return snap.apoapsis >= target
+        if not remaining:
+            return True
+        self.cutoff_ut = snap.ut + remaining
+        index = self.index
+        self.scheduler.at(self.cutoff_ut, lambda ut: self._cutoff_engine(ut, index))
+        return False
+
+    def _cutoff_engine(self, ut, index):
+        with self.lock:
+            # Фазу мог закончить такт наведения, пока срок ждал очереди
+            if self.index == index:
+                self.leave(ut)
+                self.outputs.flush()
+
+    def record(self, ut):
+        self.metrics.tick("telemetry")
+        with self.metrics.section("telemetry"):
+            snap = self.tel.snapshot()
+            values = snap._asdict()
+            values["elapsed"] = snap.ut - self.start_ut
+            if self.telemetry is not None:
+                row = [values[name] for name in self.columns]
+                self.telemetry.append(*row)
+                if self.plot is not None:
+                    self.plot.append(*row)
+            self.broadcast.publish(snap)  # Кадр снимка в кольцо или рассылку
+            status = self.profile.get("status")
+            if status:
+                # Только кладем в очередь, форматирует фоновый поток
+                self.status_log.status(status["format"], *(values[name] for name in status["fields"]))
+
+    def start(self):
+        """Начальные команды: setup нового полета или продолжение прерванного."""
+        snap = self.tel.snapshot()
+        setup = self.profile.get("setup") or []
+        if self.state is None:
+            self.start_ut = self.last_stage = snap.ut
+            self.act(setup, snap.ut)
+        else:
+            # Ступени уже сброшены и сообщения выведены: только настройки и газ той фазы
+            self.act([a for a in setup if isinstance(a, dict) and "print" not in a], snap.ut)
+            if self.state["throttle"] is not None:
+                self.outputs.set_throttle(self.state["throttle"])
+            if 0 <= self.index < len(self.phases) and self.phase.get("rates"):
+                self.scheduler.set_rates(self.phase["rates"])
+            name = self.phase["name"] if 0 <= self.index < len(self.phases) else "done"
+            self.say(f"Продолжение полета с UT {self.state['ut']:.1f}, фаза {name}", snap.ut)
+        self.outputs.flush()
+        if self.profile.get("max_duration"):
+            self.until = self.start_ut + self.profile["max_duration"]
+
+    def finish(self):
+        """Полет завершен: finish, архив, метрики; контрольная точка больше не нужна."""
+        snap = self.tel.snapshot()
+        self.act(self.profile.get("finish"), snap.ut)
+        self.outputs.flush()
+        if self.telemetry is not None:
+            self.telemetry.close()  # Остаток телеметрии - на диск
+            from ksp_archive import Archive  # NumPy и SQLite нужны только после полета
+            archive = Archive.from_env()  # KSP_ARCHIVE=каталог: полет в архив
+            if archive is not None:
+                run = archive.add(self.id, self.telemetry.data(), staging=self.staging,
+                                  summary={"fuel_remaining": self.fuel_remaining(snap)},
+                                  params=self.profile.get("params"))
+                self.say(f"Полет {run} сохранен в архив")
+        if self.checkpoint is not None:
+            self.checkpoint.clear()  # Следующий запуск начнет сначала
+            self.checkpoint = None
+        if self.metrics.export():  # {id}.prom и {id}.json в каталоге KSP_METRICS
+            self.say(self.metrics.report())
+
+    def fuel_remaining(self, snap):
+        """Остаток топлива для архива: поле fuel снимка, без него - один
+        запрос после полета (ресурс условия fuel_below или LiquidFuel)."""
+        if "fuel" in snap._fields:
+            return snap.fuel
+        resource = next((conditions["fuel_below"][0] for conditions in _conditions(self.profile)
+                         if "fuel_below" in conditions), "LiquidFuel")
+        return self.vessel.resources.amount(resource)
+
+    def close(self):
+        """Освобождает ресурсы миссии, в том числе прерванной."""
+        self.disarm()
+        if self.warp is not None:
+            self.warp.close()
+        if self.telemetry is not None:
+            self.telemetry.close()
+        if self.plot is not None:
+            self.plot.close()
+        if self.checkpoint is not None:
+            self.checkpoint.close()  # Прерванный полет продолжится со следующего запуска
+        self.broadcast.close()  # Пульты видят конец полета
+        self.recorder.close()  # Дописываем последний блок журнала
+        if self.status_log is not None:
+            self.status_log.close()  # Дожидаемся вывода оставшихся записей
+
+    async def run_async(self):
+        self.start()
+        try:
+            await self.scheduler.run(self.until)
+            self.finish()
+        finally:
+            self.close()
+        return self.report()
+
+    def run(self):
+        if self.session is None:
+            return asyncio.run(self.run_async())
+        self.start()
+        try:
+            # Обрыв связи: переподключение и планировщик заново с той же фазы
+            self.session.run(lambda: self.scheduler.run_sync(self.until))
+            self.finish()
+        finally:
+            self.close()
+        return self.report()
+
+    def report(self):
+        return {"name": self.profile["name"],
+                "phase": self.phase["name"] if 0 <= self.index < len(self.phases) else "done",
+                "tasks": self.scheduler.report(),
+                "commands": self.outputs.stats()}
+
+
+def run_many(missions):
+    """Выполняет несколько миссий в одном процессе и одном цикле событий."""
+    async def main():
+        return await asyncio.gather(*(m.run_async() for m in missions))
+    return asyncio.run(main())
+
+
+def launch(path):
+    """Полет по профилю path с выводом сводки - весь скрипт миссии."""
+    report = Mission(load_profile(path)).run()
+    for name, stats in report["tasks"].items():
+        print(f"{name}: тактов {stats['runs']}, пропущено сроков {stats['missed']}, "
+              f"дрожание {stats['jitter'] * 1000:.1f} мс")
+    print(f"Команды: {report['commands']}")
+    return report
+
+
+if __name__ == "__main__":
+    paths = sys.argv[1:] or [os.path.join(os.path.dirname(__file__), "missions", "ksp_tel.toml")]
+    if len(paths) == 1:
+        launch(paths[0])
+    else:
+        for report in run_many([Mission(load_profile(path)) for path in paths]):
+            print(report)
@@ -0,0 +1,110 @@
+"""Пакетное чтение: несколько геттеров kRPC за один запрос.
+
+Протокол kRPC позволяет положить в один KRPC.Request несколько вызовов
+процедур, сервер отвечает всеми результатами сразу. Batch собирает
+вызовы один раз (как add_stream) и потом читает их все за один RPC:
+
+    state = Batch(conn)
+    state.add("altitude", getattr, flight, "mean_altitude")
+    state.add("apoapsis", getattr, vessel.orbit, "apoapsis_altitude")
+    state.add("fuel", vessel.resources.amount, "LiquidFuel")
+    s = state.read()
+    s.altitude, s.apoapsis, s.fuel
+
+Сравнение с последовательным чтением на модели с задержкой:
+    python ksp_multicall.py 0.002
+"""
+import sys
+import time
+from collections import namedtuple
+
+
+class Batch:
+    """Набор вызовов, читаемых за один запрос к серверу."""
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.names = []
+        self.calls = []
+        self.types = []
+        self._tuple = None
+        self._request = None
+
+    def add(self, name, func, *args, **kwargs):
+        """Добавляет вызов func(*args); для свойств - getattr, obj, "имя"."""
+        self.names.append(name)
+        self.calls.append(self.conn.get_call(func, *args, **kwargs))
+        get_type = getattr(self.conn, "_get_return_type", None)
+        self.types.append(get_type(func, *args, **kwargs) if get_type else None)
+        self._tuple = None
+        self._request = None
+        return self
+
+    def read(self):
+        """Выполняет все вызовы за один RPC; возвращает namedtuple по именам."""
+        if self._tuple is None:
+            self._tuple = namedtuple("State", self.names)
+        invoke = getattr(self.conn, "invoke_batch", None)
+        if invoke is not None:
+            values = invoke(self.calls)
+        else:
+            values = self._invoke_krpc()
+        return self._tuple(*values)
+
+    def _invoke_krpc(self):
+        # Клиент krpc сам отправляет по одному вызову в запросе, поэтому
+        # запрос с несколькими вызовами собираем вручную
+        from krpc.decoder import Decoder
+        import krpc.schema.KRPC_pb2 as KRPC
+
+        conn = self.conn
+        if self._request is None:
+            self._request = KRPC.Request()
+            self._request.calls.extend(self.calls)
+        with conn._rpc_connection_lock:
+            conn._rpc_connection.send_message(self._request)
+            response = conn._rpc_connection.receive_message(KRPC.Response)
+        if response.HasField("error"):
+            raise conn._build_error(response.error)
+        values = []
+        for result, typ in zip(response.results, self.types):
+            if result.HasField("error"):
+                raise conn._build_error(result.error)
+            values.append(Decoder.decode(conn, result.value, typ))
+        return values
+
+
+def benchmark(latency=0.001, ticks=200):
+    """Время такта при последовательном и пакетном чтении пяти значений."""
+    import ksp_sim
+
+    conn = ksp_sim.connect(latency=latency)
+    vessel = conn.space_center.active_vessel
+    flight = vessel.flight()
+    orbit = vessel.orbit
+    resources = vessel.resources
+
+    start = time.perf_counter()
+    for _ in range(ticks):
+        flight.mean_altitude, flight.speed, orbit.apoapsis_altitude
+        vessel.mass, resources.amount("LiquidFuel")
+    serial = (time.perf_counter() - start) / ticks
+
+    state = Batch(conn)
+    state.add("altitude", getattr, flight, "mean_altitude")
+    state.add("speed", getattr, flight, "speed")
+    state.add("apoapsis", getattr, orbit, "apoapsis_altitude")
+    state.add("mass", getattr, vessel, "mass")
+    state.add("fuel", resources.amount, "LiquidFuel")
+    start = time.perf_counter()
+    for _ in range(ticks):
+        state.read()
+    batched = (time.perf_counter() - start) / ticks
+    return serial, batched
+
+
+if __name__ == "__main__":
+    latency = float(sys.argv[1]) if len(sys.argv) > 1 else 0.001
+    serial, batched = benchmark(latency)
+    print(f"Задержка RPC {latency * 1000:.1f} мс: последовательно {serial * 1000:.2f} мс/такт, "
+          f"пакетом {batched * 1000:.2f} мс/такт ({serial / batched:.1f}x)")
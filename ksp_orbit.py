@@ -0,0 +1,220 @@
+"""Орбитальная механика на клиенте: прогноз апоцентра между опросами.
+
+Вместо чтения apoapsis_altitude на каждом такте OrbitPredictor изредка
+(раз в resample секунд) читает вектор состояния одним пакетным запросом:
+положение и скорость в невращающейся системе тела, массу, тягу, удельный
+импульс и направление оси. Между опросами состояние интегрируется локально
+(гравитация плюс тяга вдоль оси, масса убывает с расходом), отсюда
+высота, апоцентр, перицентр и время до апоцентра без RPC.
+
+cutoff() считает, через сколько секунд апоцентр дойдет до цели, так что
+двигатель можно выключить точно в этот момент, а не на ближайшем такте.
+Сопротивление воздуха не учитывается - в атмосфере чаще опрашивайте.
+
+    orbit = OrbitPredictor(conn, vessel)
+    ap, pe = orbit.apsides()
+    dt = orbit.cutoff(target_apoapsis, horizon=0.1)
+    if dt is not None:
+        time.sleep(dt)
+        vessel.control.throttle = 0
+        orbit.coast()
+"""
+import math
+
+from ksp_multicall import Batch
+from ksp_physics import from_server, g0
+
+STEP = 0.1  # шаг интегрирования, с
+
+
+def orbital_speed(mu, radius, altitude):
+    """Круговая орбитальная скорость на высоте altitude."""
+    return math.sqrt(mu / (radius + altitude))
+
+
+def _dot(a, b):
+    return a[0] * b[0] + a[1] * b[1] + a[2] * b[2]
+
+
+def _norm(a):
+    return math.sqrt(_dot(a, a))
+
+
+def _h2(r, v):
+    # Квадрат удельного момента импульса |r x v|^2
+    hx = r[1] * v[2] - r[2] * v[1]
+    hy = r[2] * v[0] - r[0] * v[2]
+    hz = r[0] * v[1] - r[1] * v[0]
+    return hx * hx + hy * hy + hz * hz
+
+
+def elements(r, v, mu):
+    """Большая полуось и эксцентриситет; для гиперболы a = inf."""
+    energy = _dot(v, v) / 2 - mu / _norm(r)
+    e = math.sqrt(max(0.0, 1 + 2 * energy * _h2(r, v) / (mu * mu)))
+    if energy >= 0:
+        return math.inf, e
+    return -mu / (2 * energy), e
+
+
+def apsides(r, v, mu, radius):
+    """Высоты апоцентра и перицентра над экваториальным радиусом.
+
+    У разомкнутой орбиты (параболы, гиперболы) апоцентра нет - inf, а
+    перицентр конечный: h^2 / (mu (1 + e)), как periapsis_altitude в KSP.
+    """
+    a, e = elements(r, v, mu)
+    if math.isinf(a):
+        return math.inf, _h2(r, v) / (mu * (1 + e)) - radius
+    return a * (1 + e) - radius, a * (1 - e) - radius
+
+
+def time_to_apoapsis(r, v, mu):
+    a, e = elements(r, v, mu)
+    if math.isinf(a):
+        return math.inf
+    ecos = 1 - _norm(r) / a
+    esin = _dot(r, v) / math.sqrt(mu * a)
+    M = math.atan2(esin, ecos) - esin
+    n = math.sqrt(mu / a ** 3)
+    return ((math.pi - M) % (2 * math.pi)) / n
+
+
+def _accel(r, m, mu, thrust, direction):
+    rn = _norm(r)
+    k = -mu / (rn * rn * rn)
+    f = thrust / m if thrust else 0.0
+    return (k * r[0] + f * direction[0], k * r[1] + f * direction[1], k * r[2] + f * direction[2])
+
+
+def propagate(r, v, m, dt, mu, thrust=0.0, direction=(0.0, 0.0, 0.0), mdot=0.0, step=STEP):
+    """Интегрирует (RK4) состояние на dt секунд; возвращает (r, v, m)."""
+    n = max(1, math.ceil(abs(dt) / step - 1e-9))
+    h = dt / n
+    for _ in range(n):
+        m1 = m
+        m2 = m - mdot * h / 2
+        m3 = m - mdot * h
+        a1 = _accel(r, m1, mu, thrust, direction)
+        r2 = tuple(r[i] + v[i] * h / 2 for i in range(3))
+        v2 = tuple(v[i] + a1[i] * h / 2 for i in range(3))
+        a2 = _accel(r2, m2, mu, thrust, direction)
+        r3 = tuple(r[i] + v2[i] * h / 2 for i in range(3))
+        v3 = tuple(v[i] + a2[i] * h / 2 for i in range(3))
+        a3 = _accel(r3, m2, mu, thrust, direction)
+        r4 = tuple(r[i] + v3[i] * h for i in range(3))
+        v4 = tuple(v[i] + a3[i] * h for i in range(3))
+        a4 = _accel(r4, m3, mu, thrust, direction)
+        r = tuple(r[i] + h / 6 * (v[i] + 2 * v2[i] + 2 * v3[i] + v4[i]) for i in range(3))
+        v = tuple(v[i] + h / 6 * (a1[i] + 2 * a2[i] + 2 * a3[i] + a4[i]) for i in range(3))
+        m = m3
+    return r, v, m
+
+
+class OrbitPredictor:
+    """Прогноз орбиты по редким опросам вектора состояния."""
+
+    def __init__(self, conn, vessel, resample=1.0, step=STEP, recorder=None):
+        body = vessel.orbit.body
+        # Параметры тела читаем один раз на процесс: повторный прогноз
+        # (например, после отделения ступени) обходится без RPC
+        physics = from_server(conn, body)
+        self.mu = physics.mu
+        self.radius = physics.radius
+        self.resample = resample
+        self.step = step
+        self.samples = 0
+        frame = body.non_rotating_reference_frame
+        self._ut = conn.add_stream(getattr, conn.space_center, "ut")
+        self._batch = Batch(conn)
+        self._batch.add("ut", getattr, conn.space_center, "ut")
+        self._batch.add("position", vessel.position, frame)
+        self._batch.add("velocity", vessel.velocity, frame)
+        self._batch.add("direction", vessel.direction, frame)
+        self._batch.add("mass", getattr, vessel, "mass")
+        self._batch.add("thrust", getattr, vessel, "thrust")
+        self._batch.add("isp", getattr, vessel, "specific_impulse")
+        if recorder is not None:
+            # Векторы состояния - тоже входы логики: в журнал полета
+            self._batch = recorder.batch(self._batch, "orbit")
+        self.sample()
+
+    def sample(self):
+        """Читает вектор состояния с сервера (один RPC)."""
+        s = self._batch.read()
+        self.samples += 1
+        self.sampled_at = s.ut
+        self.thrust = s.thrust
+        self.direction = tuple(s.direction)
+        self.mdot = s.thrust / (s.isp * g0) if s.isp > 0 else 0.0
+        self._sample = (s.ut, tuple(s.position), tuple(s.velocity), s.mass)
+        self._state = self._sample
+
+    def close(self):
+        """Снимает поток UT."""
+        self._ut.remove()
+
+    def coast(self):
+        """Двигатель выключен: дальше прогноз без тяги (без RPC)."""
+        t, r, v, m = self.state()
+        self.thrust = 0.0
+        self.mdot = 0.0
+        self._sample = self._state = (t, r, v, m)
+
+    def now(self):
+        return self._ut()
+
+    def state(self, ut=None):
+        """Прогноз (ut, r, v, m) на момент ut; при необходимости опрашивает сервер."""
+        if ut is None:
+            ut = self.now()
+        if ut - self.sampled_at >= self.resample:
+            self.sample()
+        t, r, v, m = self._state
+        if ut < t:
+            t, r, v, m = self._sample
+        if ut > t:
+            r, v, m = propagate(r, v, m, ut - t, self.mu, self.thrust,
+                                self.direction, self.mdot, self.step)
+            self._state = (ut, r, v, m)
+        return ut, r, v, m
+
+    def altitude(self, ut=None):
+        _, r, v, m = self.state(ut)
+        return _norm(r) - self.radius
+
+    def speed(self, ut=None):
+        _, r, v, m = self.state(ut)
+        return _norm(v)
+
+    def apsides(self, ut=None):
+        """(апоцентр, перицентр) - высоты, как apoapsis_altitude/periapsis_altitude."""
+        _, r, v, m = self.state(ut)
+        return apsides(r, v, self.mu, self.radius)
+
+    def time_to_apoapsis(self, ut=None):
+        _, r, v, m = self.state(ut)
+        return time_to_apoapsis(r, v, self.mu)
+
+    def cutoff(self, target_apoapsis, horizon=1.0, ut=None):
+        """Через сколько секунд апоцентр достигнет target_apoapsis при
+        текущей тяге; None, если не в пределах horizon."""
+        _, r, v, m = self.state(ut)
+        ap = apsides(r, v, self.mu, self.radius)[0]
+        if ap >= target_apoapsis:
+            return 0.0
+        t = 0.0
+        h = min(self.step, horizon)
+        while t < horizon - 1e-9:
+            dt = min(h, horizon - t)
+            r, v, m = propagate(r, v, m, dt, self.mu, self.thrust,
+                                self.direction, self.mdot, self.step)
+            next_ap = apsides(r, v, self.mu, self.radius)[0]
+            if next_ap >= target_apoapsis:
+                # Линейная интерполяция внутри шага
+                if math.isinf(next_ap):
+                    return t + dt
+                return t + dt * (target_apoapsis - ap) / (next_ap - ap)
+            ap = next_ap
+            t += dt
+        return None
@@ -0,0 +1,225 @@
+"""Модель тела: параметры с сервера и таблицы атмосферы и тяги.
+
+Скрипты считали давление и тягу своими формулами через exp() на каждом
+вызове, с разными константами (H = 8500 м, 5000 м, радиус Земли вместо
+Кербина). BodyModel собирает все в одном месте:
+
+    - параметры тела (mu, радиус, высота атмосферы, кривая давления и
+      плотности) читаются с сервера один раз, одним пакетным запросом,
+      и кэшируются на весь процесс - повторный from_server() для того же
+      тела не делает ни одного RPC;
+    - давление, плотность, доля давления от поверхностного и тяга
+      двигателя по высоте - таблицы на равномерной сетке с линейной
+      интерполяцией: запрос стоит O(1) и для числа, и для массива высот;
+    - модель ksp_sim и пакетная ksp_batch берут ту же модель из словаря
+      параметров тела (KERBIN); здесь же g0 и ракета по умолчанию ROCKET,
+      чтобы код полета не зависел от модели ksp_sim.
+
+    physics = from_server(conn, vessel.orbit.body)
+    physics.pressure(altitude)              # Па
+    physics.ratio(altitudes)                # p / p0, массив
+    physics.thrust(thrust_vac, thrust_sl, altitude)
+"""
+import math
+
+from ksp_startup import lazy
+
+np = lazy("numpy")  # таблицы строятся при первом запросе, не при подключении
+
+STEP = 10.0  # шаг таблиц по высоте, м
+SAMPLES = 141  # точек кривой давления, читаемых с сервера
+SEA_LEVEL = 0.7  # доля вакуумной тяги у поверхности, если она не задана
+g0 = 9.80665  # стандартное ускорение свободного падения, м/с^2
+
+# Параметры Кербина
+KERBIN = {
+    "name": "Kerbin",
+    "mu": 3.5316e12,  # гравитационный параметр, м^3/с^2
+    "radius": 600000.0,  # радиус, м
+    "atmosphere_depth": 70000.0,  # высота атмосферы, м
+    "p0": 101325.0,  # давление у поверхности, Па
+    "rho0": 1.225,  # плотность у поверхности, кг/м^3
+    "scale_height": 5600.0,  # характерная высота атмосферы, м
+    # наименьшая высота для каждого rails-множителя, м
+    "warp_altitudes": (0.0, 70000.0, 70000.0, 70000.0, 120000.0, 240000.0, 480000.0, 600000.0),
+}
+
+# Ракета по умолчанию (модель ksp_sim, пакетные прогоны): ступени снизу вверх, тяга в Н, массы в кг
+ROCKET = {
+    "payload": 500.0,
+    "cd_area": 1.0,  # Cd * S, м^2
+    "stages": [
+        {"resource": "LiquidFuel", "dry_mass": 2000.0, "fuel_mass": 12000.0,
+         "thrust": 400000.0, "thrust_sl": 350000.0, "isp": 300.0},
+        {"resource": "LiquidFuel", "dry_mass": 800.0, "fuel_mass": 3000.0,
+         "thrust": 60000.0, "thrust_sl": 20000.0, "isp": 345.0},
+    ],
+}
+
+_models = {}  # тело сервера -> BodyModel
+_params = {}  # параметры тела (словарь) -> BodyModel
+
+
+class Table:
+    """Значения на равномерной сетке: линейная интерполяция за O(1).
+
+    Вне сетки - крайние значения. Число дает число (без NumPy), массив
+    или список - массив.
+    """
+
+    def __init__(self, start, step, values):
+        self.start = float(start)
+        self.step = float(step)
+        self.values = np.ascontiguousarray(values, dtype=np.float64)
+        if len(self.values) < 2:
+            self.values = np.repeat(self.values[:1], 2)
+        self._list = self.values.tolist()
+        self._last = len(self._list) - 1
+        self._inv = 1.0 / self.step
+        # Повтор последнего значения: индекс i + 1 верен и на краю сетки
+        self._padded = np.append(self.values, self.values[-1])
+
+    def __call__(self, x):
+        if isinstance(x, (float, int)):
+            u = (x - self.start) * self._inv
+            if u <= 0.0:
+                return self._list[0]
+            if u >= self._last:
+                return self._list[-1]
+            i = int(u)
+            a = self._list[i]
+            return a + (self._list[i + 1] - a) * (u - i)
+        u = np.multiply(x, self._inv, dtype=np.float64)
+        if self.start:
+            u -= self.start * self._inv
+        np.clip(u, 0.0, self._last, out=u)
+        i = u.astype(np.intp)
+        u -= i
+        v = self._padded
+        a = v[i]
+        return a + (v[i + 1] - a) * u
+
+
+class BodyModel:
+    """Параметры тела и таблицы по высоте.
+
+    params - словарь как KERBIN: mu, radius, atmosphere_depth,
+    p0, rho0 и scale_height (экспоненциальная атмосфера) или
+    pressure_curve/density_curve - пары (высота, значение) с сервера.
+    """
+
+    def __init__(self, params, step=STEP):
+        self.params = params
+        self.name = params.get("name", "")
+        self.mu = float(params["mu"])
+        self.radius = float(params["radius"])
+        self.atmosphere_depth = float(params.get("atmosphere_depth", 0.0))
+        self.step = step
+        self._thrust = {}
+
+    # Таблицы и величины по ним - при первом обращении: до первой команды
+    # скрипту нужны только mu и радиус
+    _TABLES = ("scale_height", "p0", "rho0", "pressure", "density", "ratio")
+
+    def __getattr__(self, name):
+        if name not in self._TABLES:
+            raise AttributeError(name)
+        self._build()
+        return self.__dict__[name]
+
+    def _build(self):
+        params, step = self.params, self.step
+        n = max(2, math.ceil(self.atmosphere_depth / step) + 1)
+        h = np.arange(n) * step
+        if "pressure_curve" in params:
+            pressure = _log_interp(h, params["pressure_curve"])
+            density = _log_interp(h, params["density_curve"])
+            # Характерная высота по первым километрам кривой - для разброса
+            # атмосферы в пакетной модели
+            ratio = pressure[min(n - 1, int(1000 / step))] / pressure[0] if pressure[0] > 0 else 1.0
+            self.scale_height = 1000.0 / -math.log(ratio) if 0 < ratio < 1 else math.inf
+        elif self.atmosphere_depth > 0:
+            # У ракетных вариантов ksp_dispersion scale_height - массив:
+            # таблица строится по среднему, отклонения - масштабом высоты
+            self.scale_height = float(np.mean(params["scale_height"]))
+            decay = np.exp(-h / self.scale_height)
+            pressure = params["p0"] * decay
+            density = params["rho0"] * decay
+        else:
+            self.scale_height = math.inf
+            pressure = density = np.zeros(n)
+        # Выше атмосферы давления нет
+        pressure[-1] = density[-1] = 0.0
+        self.p0 = float(pressure[0])
+        self.rho0 = float(density[0])
+        self.pressure = Table(0.0, step, pressure)
+        self.density = Table(0.0, step, density)
+        self.ratio = Table(0.0, step, pressure / self.p0 if self.p0 > 0 else pressure)
+
+    def gravity(self, altitude):
+        r = self.radius + altitude
+        return self.mu / (r * r)
+
+    def thrust_table(self, thrust_vac, thrust_sl=None):
+        """Таблица тяги двигателя по высоте (кэшируется по паре тяг)."""
+        if thrust_sl is None:
+            thrust_sl = thrust_vac * SEA_LEVEL
+        key = (float(thrust_vac), float(thrust_sl))
+        table = self._thrust.get(key)
+        if table is None:
+            table = Table(0.0, self.step, thrust_vac - (thrust_vac - thrust_sl) * self.ratio.values)
+            self._thrust[key] = table
+        return table
+
+    def thrust(self, thrust_vac, thrust_sl, altitude):
+        """Тяга на высоте altitude; thrust_sl=None - SEA_LEVEL от вакуумной."""
+        return self.thrust_table(thrust_vac, thrust_sl)(altitude)
+
+
+def _log_interp(h, curve):
+    # Давление и плотность падают почти экспоненциально, поэтому
+    # интерполяция по логарифму точнее на редких точках с сервера
+    xs, ys = np.asarray(curve, dtype=np.float64).T
+    return np.exp(np.interp(h, xs, np.log(np.maximum(ys, 1e-300))))
+
+
+def body_model(params):
+    """BodyModel для словаря параметров; одна на одинаковые параметры."""
+    key = tuple(sorted((k, v if isinstance(v, (int, float, str)) else float(np.mean(v)))
+                       for k, v in params.items() if k != "warp_altitudes"
+                       and not k.endswith("_curve")))
+    model = _params.get(key)
+    if model is None:
+        model = _params[key] = BodyModel(params)
+    return model
+
+
+def from_server(conn, body, samples=SAMPLES):
+    """Модель тела body с сервера; читается один раз за процесс."""
+    model = _models.get(body)
+    if model is not None:
+        return model
+    from ksp_multicall import Batch
+
+    batch = Batch(conn)
+    batch.add("name", getattr, body, "name")
+    batch.add("mu", getattr, body, "gravitational_parameter")
+    batch.add("radius", getattr, body, "equatorial_radius")
+    batch.add("has_atmosphere", getattr, body, "has_atmosphere")
+    batch.add("atmosphere_depth", getattr, body, "atmosphere_depth")
+    s = batch.read()
+    params = {"name": s.name, "mu": s.mu, "radius": s.radius,
+              "atmosphere_depth": s.atmosphere_depth if s.has_atmosphere else 0.0}
+    if s.has_atmosphere:
+        # Кривые давления и плотности - тоже одним запросом
+        altitudes = [s.atmosphere_depth * i / (samples - 1) for i in range(samples)]
+        curves = Batch(conn)
+        frame = body.reference_frame
+        for i, h in enumerate(altitudes):
+            curves.add(f"p{i}", body.pressure_at, h)
+            curves.add(f"rho{i}", body.density_at, (s.radius + h, 0.0, 0.0), frame)
+        values = curves.read()
+        params["pressure_curve"] = list(zip(altitudes, values[0::2]))
+        params["density_curve"] = list(zip(altitudes, values[1::2]))
+    model = _models[body] = BodyModel(params)
+    return model
@@ -0,0 +1,305 @@
+"""Графики телеметрии в реальном времени, вне процесса управления.
+
+LivePlot запускает отдельный процесс (python ksp_plot.py --worker) и
+передает ему отсчеты сырыми байтами float64 через stdin. Цикл управления
+только кладет строку в ограниченную очередь (старые блоки вытесняются,
+если рисование не успевает), запись в канал делает фоновый поток.
+
+Рабочий процесс прореживает каждую кривую с сохранением минимумов и
+максимумов (Decimator): число точек на графике ограничено, сколько бы ни
+длился полет, поэтому стоимость перерисовки не растет. В окне кривые
+обновляются через blitting (перерисовывается только линия поверх
+сохраненного фона), полная перерисовка - только когда данные выходят за
+пределы осей. В режимах "png"/"svg" картинка сохраняется в файл.
+
+    PANELS = [
+        {"title": "Высота", "ylabel": "Высота", "series": [("altitude", None)]},
+        ...
+    ]
+    plot = LivePlot(["time", "altitude", ...], PANELS, mode="png", path="flight.png")
+    plot.append(ut, altitude, ...)
+    plot.close()
+"""
+import json
+import os
+import subprocess
+import sys
+import threading
+from array import array
+from collections import deque
+from itertools import chain
+
+from ksp_startup import lazy
+
+np = lazy("numpy")  # нужен только процессу рисования
+
+POINTS = 1000  # максимум корзин на кривую
+INTERVAL = 0.5  # период обновления графика, с
+BATCH = 32  # строк в одном блоке передачи
+
+
+class Decimator:
+    """Прореживание с сохранением экстремумов, постоянная память.
+
+    Отсчеты группируются в корзины по width штук, от каждой остаются
+    минимум и максимум. Когда корзин больше points, соседние сливаются
+    попарно и ширина удваивается. Неполная корзина хранится как есть.
+    """
+
+    def __init__(self, points=POINTS):
+        self.points = points
+        self.width = 1
+        self.buckets = np.zeros((0, 4))  # t_min, y_min, t_max, y_max
+        self.tail_t = np.zeros(0)
+        self.tail_y = np.zeros(0)
+
+    def extend(self, t, y):
+        t = np.concatenate([self.tail_t, t])
+        y = np.concatenate([self.tail_y, y])
+        full = len(t) // self.width * self.width
+        if full:
+            tb = t[:full].reshape(-1, self.width)
+            yb = y[:full].reshape(-1, self.width)
+            rows = np.arange(len(yb))
+            lo = yb.argmin(axis=1)
+            hi = yb.argmax(axis=1)
+            new = np.column_stack([tb[rows, lo], yb[rows, lo], tb[rows, hi], yb[rows, hi]])
+            self.buckets = np.concatenate([self.buckets, new])
+        self.tail_t, self.tail_y = t[full:], y[full:]
+        while len(self.buckets) > self.points:
+            self._merge()
+
+    def _merge(self):
+        n = len(self.buckets) // 2 * 2
+        pairs = self.buckets[:n].reshape(-1, 2, 4)
+        lo = pairs[:, :, 1].argmin(axis=1)
+        hi = pairs[:, :, 3].argmax(axis=1)
+        rows = np.arange(len(pairs))
+        merged = np.column_stack([pairs[rows, lo, 0], pairs[rows, lo, 1],
+                                  pairs[rows, hi, 2], pairs[rows, hi, 3]])
+        # Нечетная последняя корзина возвращается в хвост сырыми точками
+        rest = self.buckets[n:]
+        if len(rest):
+            order = np.argsort(rest[0, [0, 2]])
+            self.tail_t = np.concatenate([rest[0, [0, 2]][order], self.tail_t])
+            self.tail_y = np.concatenate([rest[0, [1, 3]][order], self.tail_y])
+        self.buckets = merged
+        self.width *= 2
+
+    def xy(self):
+        """Точки для рисования в порядке времени."""
+        b = self.buckets
+        first = b[:, 0] <= b[:, 2]
+        t = np.where(first[:, None], b[:, [0, 2]], b[:, [2, 0]]).ravel()
+        y = np.where(first[:, None], b[:, [1, 3]], b[:, [3, 1]]).ravel()
+        tail_t, tail_y = self.tail_t, self.tail_y
+        if len(tail_t) > 3:
+            # Неполная корзина: ее экстремумы и последняя точка
+            keep = np.unique([tail_y.argmin(), tail_y.argmax(), len(tail_t) - 1])
+            tail_t, tail_y = tail_t[keep], tail_y[keep]
+        return np.concatenate([t, tail_t]), np.concatenate([y, tail_y])
+
+
+class LivePlot:
+    """Отправляет телеметрию в процесс рисования, не блокируя цикл управления."""
+
+    def __init__(self, fields, panels, mode="auto", path=None, time_field="time",
+                 interval=INTERVAL, points=POINTS, maxlen=256):
+        self.fields = list(fields)
+        self.rows = []
+        self.queue = deque(maxlen=maxlen)
+        self.dropped = 0
+        config = {"fields": self.fields, "panels": panels, "mode": mode, "path": path,
+                  "time_field": time_field, "interval": interval, "points": points}
+        self.process = subprocess.Popen(
+            [sys.executable, os.path.abspath(__file__), "--worker"],
+            stdin=subprocess.PIPE)
+        self.process.stdin.write(json.dumps(config).encode() + b"\n")
+        self.process.stdin.flush()
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._feed, name="live-plot", daemon=True)
+        self._thread.start()
+
+    def append(self, *values):
+        """Добавляет отсчет; значения в порядке fields."""
+        self.rows.append(values)
+        if len(self.rows) >= BATCH:
+            self._push()
+
+    def _push(self):
+        if not self.rows:
+            return
+        if len(self.queue) == self.queue.maxlen:
+            self.dropped += 1
+        block = array("d", chain.from_iterable(self.rows))
+        if sys.byteorder == "big":
+            block.byteswap()  # В канале float64 little-endian, как читает _reader ("<f8")
+        self.queue.append(block.tobytes())
+        self.rows = []
+
+    def _write(self):
+        while True:
+            try:
+                block = self.queue.popleft()
+            except IndexError:
+                break
+            try:
+                self.process.stdin.write(block)
+            except (BrokenPipeError, OSError):
+                # Окно закрыли - дальше данные никому не нужны
+                self.queue.clear()
+                self._stop.set()
+                return
+        try:
+            self.process.stdin.flush()
+        except (BrokenPipeError, OSError):
+            self._stop.set()
+
+    def _feed(self):
+        while not self._stop.wait(self.interval):
+            self._write()
+
+    def close(self, wait=True):
+        """Передает остаток и закрывает канал; wait - дождаться закрытия окна."""
+        self._push()
+        self._stop.set()
+        self._thread.join()
+        self._write()
+        try:
+            self.process.stdin.close()
+        except (BrokenPipeError, OSError):
+            pass
+        if wait:
+            self.process.wait()
+
+
+def _reader(stream, width, pending, lock, done):
+    # Читает строки из stdin в фоне, чтобы главный поток мог рисовать
+    size = 8 * width
+    rest = b""
+    while True:
+        data = stream.read1(65536)
+        if not data:
+            break
+        data = rest + data
+        full = len(data) // size * size
+        rest = data[full:]
+        if full:
+            rows = np.frombuffer(data[:full], dtype="<f8").reshape(-1, width)
+            with lock:
+                pending.append(rows)
+    done.set()
+
+
+def _grow(limits, arrays):
+    # Новые пределы оси с запасом, если данные вышли за текущие;
+    # бесконечности (апогей при уходе с орбиты) не учитываем
+    values = np.concatenate(arrays)
+    values = values[np.isfinite(values)]
+    if not len(values):
+        return None
+    lo, hi = limits
+    vmin, vmax = values.min(), values.max()
+    if vmin >= lo and vmax <= hi:
+        return None
+    span = max(vmax - vmin, abs(vmax) * 0.01, 1.0)
+    return vmin - 0.05 * span, vmax + 0.2 * span
+
+
+def worker(config, stream):
+    """Рабочий процесс: читает отсчеты из stream и обновляет четыре графика."""
+    mode = config["mode"]
+    if mode == "auto":
+        has_display = sys.platform == "win32" or os.environ.get("DISPLAY") or sys.platform == "darwin"
+        mode = "window" if has_display else "png"
+    import matplotlib
+    if mode != "window":
+        matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    fields = config["fields"]
+    column = {name: i for i, name in enumerate(fields)}
+    t_index = column[config["time_field"]]
+    path = config["path"] or f"telemetry.{mode if mode != 'window' else 'png'}"
+    panels = config["panels"]
+
+    fig, axes = plt.subplots(2, 2, figsize=(10, 8))
+    curves = []  # (ось, линия, индекс колонки, прореживатель)
+    for ax, panel in zip(axes.ravel(), panels):
+        for name, label in panel["series"]:
+            line, = ax.plot([], [], label=label, animated=mode == "window")
+            curves.append((ax, line, column[name], Decimator(config["points"])))
+        ax.set_title(panel["title"])
+        ax.set_xlabel(panel.get("xlabel", "Время"))
+        ax.set_ylabel(panel["ylabel"])
+        if len(panel["series"]) > 1:
+            ax.legend()
+    fig.tight_layout()
+
+    pending = []
+    lock = threading.Lock()
+    done = threading.Event()
+    threading.Thread(target=_reader, args=(stream, len(fields), pending, lock, done),
+                     daemon=True).start()
+
+    background = None
+    if mode == "window":
+        plt.show(block=False)
+        fig.canvas.draw()
+        background = fig.canvas.copy_from_bbox(fig.bbox)
+
+    while True:
+        finished = done.wait(config["interval"])
+        with lock:
+            blocks = pending[:]
+            pending.clear()
+        if mode == "window" and not plt.fignum_exists(fig.number):
+            return
+        if blocks:
+            rows = np.concatenate(blocks)
+            redraw = False
+            for ax, line, index, decimator in curves:
+                decimator.extend(rows[:, t_index], rows[:, index])
+                x, y = decimator.xy()
+                line.set_data(x, y)
+            for ax in axes.ravel():
+                lines = [c for c in curves if c[0] is ax]
+                if not lines:
+                    continue
+                xlim = _grow(ax.get_xlim(), [c[1].get_xdata() for c in lines])
+                ylim = _grow(ax.get_ylim(), [c[1].get_ydata() for c in lines])
+                if xlim:
+                    ax.set_xlim(*xlim)
+                if ylim:
+                    ax.set_ylim(*ylim)
+                redraw = redraw or bool(xlim or ylim)
+            if mode == "window":
+                if redraw:
+                    # Пределы осей изменились - нужен новый фон
+                    fig.canvas.draw()
+                    background = fig.canvas.copy_from_bbox(fig.bbox)
+                fig.canvas.restore_region(background)
+                for ax, line, index, decimator in curves:
+                    ax.draw_artist(line)
+                fig.canvas.blit(fig.bbox)
+            else:
+                fig.savefig(path)
+        if mode == "window":
+            fig.canvas.flush_events()
+        if finished and not pending:
+            break
+
+    if mode == "window":
+        # Полет окончен: обычное окно, как раньше plt.show()
+        for ax, line, index, decimator in curves:
+            line.set_animated(False)
+        plt.show()
+    else:
+        fig.savefig(path)
+
+
+if __name__ == "__main__":
+    if sys.argv[1:] == ["--worker"]:
+        stdin = sys.stdin.buffer
+        worker(json.loads(stdin.readline()), stdin)
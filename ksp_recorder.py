@@ -0,0 +1,500 @@
+"""Бортовой самописец и воспроизведение полета без игры.
+
+Recorder пишет все, что цикл управления прочитал (снимки TelemetryStream,
+пакеты Batch), и все, что он отправил (записи ControlOutputs и сброс
+ступеней), в двоичный журнал только на дописывание:
+
+    файл:    MAGIC, затем блоки
+    блок:    BLOCK (b"BLCK", длина сырых данных, длина сжатых, ut первой
+             и последней записи) + сжатые zlib записи
+    запись:  RECORD (вид, канал, ut) + значения float64
+
+Каналы объявляются записью DEFINE (имя и поля в JSON). Снимок, который
+не изменился с прошлого чтения канала, пишется как REPEAT без значений.
+Рядом лежит индекс path + ".idx" (смещение и интервал UT каждого блока),
+по нему чтение с заданного UT начинается с нужного блока; без индекса
+он восстанавливается проходом по заголовкам блоков.
+
+Replayer с тем же интерфейсом подменяет источники: снимки и пакеты берутся
+из журнала по порядку, а команды не уходят в игру, а сравниваются с
+записанными. replay() запускает скрипт на пустой модели ksp_sim (время
+без физики), так что полет воспроизводится с полной скоростью процессора:
+
+    recorder = Recorder.from_env("ksp_tel")  # KSP_RECORD=каталог
+    tel = recorder.stream(TelemetryStream(conn, vessel))
+    outputs = recorder.outputs(ControlOutputs(vessel))
+    ...
+    recorder.close()
+
+    python ksp_recorder.py records/ksp_tel.flt ksp_tel.py
+"""
+import json
+import math
+import os
+import struct
+import sys
+import time
+import zlib
+from collections import namedtuple
+
+MAGIC = b"KSPFLT1\n"
+BLOCK = struct.Struct("<4sIIdd")
+RECORD = struct.Struct("<BHd")
+INDEX = struct.Struct("<Qdd")
+BLOCK_SIZE = 65536  # сырых байт в блоке до сжатия
+
+DEFINE, READ, REPEAT, COMMAND = range(4)
+
+# Каналы команд ControlOutputs и число значений в каждом
+COMMANDS = {"pitch_heading": 2, "roll": 1, "throttle": 1, "engaged": 1,
+            "sas": 1, "rcs": 1, "stage": 0}
+
+
+def _flatten(values):
+    flat = []
+    for value in values:
+        if isinstance(value, (tuple, list)):
+            flat.extend(float(v) for v in value)
+        else:
+            flat.append(float(value))
+    return flat
+
+
+def _shape(values):
+    # Размер каждого поля: 0 - число, n - кортеж из n чисел
+    return [len(v) if isinstance(v, (tuple, list)) else 0 for v in values]
+
+
+def _unflatten(flat, sizes):
+    values, i = [], 0
+    for size in sizes:
+        if size:
+            values.append(tuple(flat[i:i + size]))
+            i += size
+        else:
+            values.append(flat[i])
+            i += 1
+    return values
+
+
+class FlightLog:
+    """Запись журнала: блоки сжатых записей и индекс по UT."""
+
+    def __init__(self, path, block_size=BLOCK_SIZE):
+        self.path = path
+        self.block_size = block_size
+        self.channels = {}  # имя -> (номер, размеры полей)
+        self.records = 0
+        self._buffer = bytearray()
+        self._first = self._last = None
+        self._file = open(path, "wb")
+        self._file.write(MAGIC)
+        self._index = open(path + ".idx", "wb")
+
+    def define(self, name, fields, sizes):
+        channel = len(self.channels)
+        self.channels[name] = (channel, list(sizes))
+        meta = json.dumps({"name": name, "fields": list(fields), "sizes": list(sizes)}).encode()
+        self._append(DEFINE, channel, 0.0, meta)
+        return channel
+
+    def write(self, kind, channel, ut, values=()):
+        self._append(kind, channel, ut, struct.pack(f"<{len(values)}d", *values))
+
+    def _append(self, kind, channel, ut, payload):
+        if kind == DEFINE:
+            payload = struct.pack("<H", len(payload)) + payload
+        self._buffer += RECORD.pack(kind, channel, ut) + payload
+        self.records += 1
+        if kind != DEFINE:
+            if self._first is None:
+                self._first = ut
+            self._last = ut
+        if len(self._buffer) >= self.block_size:
+            self.flush()
+
+    def flush(self):
+        """Сжимает и дописывает текущий блок."""
+        if not self._buffer:
+            return
+        first = self._first if self._first is not None else 0.0
+        last = self._last if self._last is not None else first
+        data = zlib.compress(bytes(self._buffer), 6)
+        offset = self._file.tell()
+        self._file.write(BLOCK.pack(b"BLCK", len(self._buffer), len(data), first, last) + data)
+        self._file.flush()
+        self._index.write(INDEX.pack(offset, first, last))
+        self._index.flush()
+        self._buffer.clear()
+        self._first = self._last = None
+
+    def close(self):
+        self.flush()
+        self._file.close()
+        self._index.close()
+
+
+class LogReader:
+    """Чтение журнала; channels - {имя: (поля, размеры)}."""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"{path}: не журнал полета")
+        self.index = self._load_index()
+        self.channels = {}
+        self._names = {}
+        # Объявления каналов идут раньше их записей, но могут быть в любом блоке
+        for _ in self.records():
+            pass
+
+    def _load_index(self):
+        size = os.path.getsize(self.path)
+        entries = []
+        try:
+            with open(self.path + ".idx", "rb") as f:
+                data = f.read()
+            entries = [INDEX.unpack_from(data, i) for i in range(0, len(data) // INDEX.size * INDEX.size, INDEX.size)]
+        except OSError:
+            pass
+        if entries and entries[-1][0] < size:
+            return entries
+        # Индекса нет или он отстал - проходим по заголовкам блоков
+        entries = []
+        with open(self.path, "rb") as f:
+            offset = len(MAGIC)
+            f.seek(offset)
+            while True:
+                header = f.read(BLOCK.size)
+                if len(header) < BLOCK.size:
+                    break
+                tag, raw, comp, first, last = BLOCK.unpack(header)
+                if tag != b"BLCK":
+                    break
+                entries.append((offset, first, last))
+                offset += BLOCK.size + comp
+                f.seek(offset)
+        return entries
+
+    def _blocks(self, start=None):
+        with open(self.path, "rb") as f:
+            for offset, first, last in self.index:
+                if start is not None and last < start:
+                    continue
+                f.seek(offset)
+                tag, raw, comp, _, _ = BLOCK.unpack(f.read(BLOCK.size))
+                data = f.read(comp)
+                if len(data) < comp:
+                    return  # недописанный последний блок
+                yield zlib.decompress(data)
+
+    def records(self, start=None, stop=None):
+        """Записи (вид, имя канала, ut, значения) с UT в [start, stop]."""
+        for data in self._blocks(start):
+            i = 0
+            while i < len(data):
+                kind, channel, ut = RECORD.unpack_from(data, i)
+                i += RECORD.size
+                if kind == DEFINE:
+                    (n,) = struct.unpack_from("<H", data, i)
+                    meta = json.loads(data[i + 2:i + 2 + n])
+                    i += 2 + n
+                    self._names[channel] = meta["name"]
+                    self.channels[meta["name"]] = (meta["fields"], meta["sizes"])
+                    continue
+                name = self._names[channel]
+                count = sum(s or 1 for s in self.channels[name][1])
+                if kind == REPEAT:
+                    count = 0
+                values = struct.unpack_from(f"<{count}d", data, i)
+                i += 8 * count
+                if start is not None and ut < start:
+                    continue
+                if stop is not None and ut > stop:
+                    return
+                yield kind, name, ut, values
+
+    def repeat(self, name, ut, last):
+        """Значения записи REPEAT: прошлое чтение с ut из заголовка."""
+        fields, sizes = self.channels[name]
+        if "ut" not in fields:
+            return last
+        i = fields.index("ut")
+        offset = sum(size or 1 for size in sizes[:i])
+        return last[:offset] + (ut,) + last[offset + 1:]
+
+    def reads(self, name):
+        """(ut, значения) канала name по порядку чтений."""
+        last = None
+        for kind, channel, ut, values in self.records():
+            if channel != name or kind == COMMAND:
+                continue
+            last = values if kind == READ else self.repeat(name, ut, last)
+            yield ut, last
+
+    def commands(self):
+        """Команды по порядку: (ut, канал, значения)."""
+        for kind, channel, ut, values in self.records():
+            if kind == COMMAND:
+                yield ut, channel, values
+
+
+class _Stream:
+    # Обертка TelemetryStream: каждый снимок, отданный логике, - в журнал
+    def __init__(self, inner, recorder, name):
+        self._inner = inner
+        self._recorder = recorder
+        self._name = name
+
+    def snapshot(self):
+        snap = self._inner.snapshot()
+        self._recorder.read(self._name, snap)
+        return snap
+
+    def __getattr__(self, name):
+        return getattr(self._inner, name)
+
+
+class _Batch:
+    # Обертка Batch: каждый пакет, прочитанный логикой, - в журнал
+    def __init__(self, inner, recorder, name):
+        self._inner = inner
+        self._recorder = recorder
+        self._name = name
+
+    def read(self):
+        state = self._inner.read()
+        self._recorder.read(self._name, state)
+        return state
+
+    def __getattr__(self, name):
+        return getattr(self._inner, name)
+
+
+class Recorder:
+    """Запись чтений и команд одного полета."""
+
+    enabled = True
+
+    def __init__(self, path):
+        self.log = FlightLog(path)
+        self.ut = 0.0
+        self._last = {}
+
+    @classmethod
+    def from_env(cls, name, variable="KSP_RECORD"):
+        """Самописец по переменной окружения (каталог журналов); внутри
+        replay() - воспроизведение; иначе пустой."""
+        if _replaying is not None:
+            return _replaying
+        directory = os.environ.get(variable)
+        if not directory:
+            return NullRecorder()
+        os.makedirs(directory, exist_ok=True)
+        return cls(os.path.join(directory, name + ".flt"))
+
+    def stream(self, tel, name="tel"):
+        return _Stream(tel, self, name)
+
+    def batch(self, batch, name):
+        return _Batch(batch, self, name)
+
+    def outputs(self, outputs):
+        outputs.listeners.append(self.command)
+        return outputs
+
+    def read(self, name, values):
+        fields = getattr(values, "_fields", ())
+        if name not in self.log.channels:
+            self.log.define(name, fields, _shape(values))
+        channel = self.log.channels[name][0]
+        ut = getattr(values, "ut", self.ut)
+        self.ut = ut
+        # Поле ut меняется на каждом снимке и лежит в заголовке записи,
+        # поэтому повтор сравнивается без него
+        key = tuple(v for f, v in zip(fields, values) if f != "ut") if fields else tuple(values)
+        if self._last.get(name) == key:
+            self.log.write(REPEAT, channel, ut)
+        else:
+            self._last[name] = key
+            self.log.write(READ, channel, ut, _flatten(values))
+
+    def command(self, channel, value):
+        if channel not in self.log.channels:
+            self.log.define(channel, (), [0] * COMMANDS[channel])
+        values = value if isinstance(value, tuple) else (value,) if COMMANDS[channel] else ()
+        self.log.write(COMMAND, self.log.channels[channel][0], self.ut, _flatten(values))
+
+    def close(self):
+        self.log.close()
+
+
+class NullRecorder:
+    """Самописец выключен: обертки возвращают объекты как есть."""
+
+    enabled = False
+
+    def stream(self, tel, name="tel"):
+        return tel
+
+    def batch(self, batch, name):
+        return batch
+
+    def outputs(self, outputs):
+        return outputs
+
+    def close(self):
+        pass
+
+
+class ReplayFinished(Exception):
+    """Журнал закончился - воспроизводить больше нечего."""
+
+
+class _ReplayStream:
+    def __init__(self, replayer, name, make):
+        self._replayer = replayer
+        self._name = name
+        self._make = make
+
+    def snapshot(self):
+        return self._replayer.next_read(self._name, self._make)
+
+    read = snapshot
+
+    def __getattr__(self, name):
+        raise AttributeError(name)
+
+
+class Replayer:
+    """Воспроизведение: чтения из журнала, команды сравниваются с записью."""
+
+    enabled = True
+
+    def __init__(self, path, tolerance=1e-9):
+        self.reader = LogReader(path)
+        self.tolerance = tolerance
+        self._reads = {}  # канал -> значения чтений в обратном порядке
+        self._expected = []  # (ut, канал, значения) записанных команд
+        last = {}
+        for kind, channel, ut, values in self.reader.records():
+            if kind == COMMAND:
+                self._expected.append((ut, channel, values))
+                continue
+            if kind == REPEAT:
+                values = self.reader.repeat(channel, ut, last[channel])
+            last[channel] = values
+            self._reads.setdefault(channel, []).append(values)
+        for channel in self._reads:
+            self._reads[channel].reverse()
+        self.position = 0  # номер следующей ожидаемой команды
+        self.reads = 0
+        self.mismatches = []  # (номер, ожидалось, получено)
+        self.ut = 0.0
+
+    def stream(self, tel, name="tel"):
+        fields, sizes = self.reader.channels[name]
+        if tuple(fields) != tuple(tel.Snapshot._fields):
+            raise ValueError(f"Канал {name}: поля снимка изменились, журнал не подходит")
+        return _ReplayStream(self, name, lambda flat: tel.Snapshot(*_unflatten(flat, sizes)))
+
+    def batch(self, batch, name):
+        fields, sizes = self.reader.channels[name]
+        make = batch._tuple or namedtuple("State", fields)
+        return _ReplayStream(self, name, lambda flat: make(*_unflatten(flat, sizes)))
+
+    def outputs(self, outputs):
+        # Команды не уходят в игру: только сравнение с записанными
+        outputs.listeners.append(self.command)
+        outputs.control = outputs.auto_pilot = _Sink()
+        return outputs
+
+    def next_read(self, name, make):
+        pending = self._reads.get(name)
+        if not pending:
+            raise ReplayFinished(name)
+        self.reads += 1
+        value = make(pending.pop())
+        self.ut = getattr(value, "ut", self.ut)
+        return value
+
+    def command(self, channel, value):
+        values = tuple(_flatten(value if isinstance(value, tuple) else (value,) if COMMANDS[channel] else ()))
+        actual = (self.ut, channel, values)
+        expected = self._expected[self.position] if self.position < len(self._expected) else None
+        self.position += 1
+        if expected is None or expected[1] != channel or any(
+                abs(a - b) > self.tolerance * max(1.0, abs(b)) for a, b in zip(values, expected[2])):
+            self.mismatches.append((self.position - 1, expected, actual))
+
+    def report(self):
+        return {"reads": self.reads, "commands": self.position,
+                "expected": len(self._expected),
+                "missing": max(0, len(self._expected) - self.position),
+                "mismatches": self.mismatches}
+
+    def close(self):
+        pass
+
+
+class _Sink:
+    # Вместо auto_pilot и control при воспроизведении: все вызовы - мимо
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: None
+
+    def __setattr__(self, name, value):
+        pass
+
+
+_replaying = None
+
+
+class _Clock:
+    # Модель без физики: время идет, ничего не интегрируется
+    @staticmethod
+    def patch(sim):
+        def advance(seconds):
+            sim.ut += seconds
+            for callback in list(sim.update_callbacks):
+                callback()
+
+        sim.advance = advance
+        return sim
+
+
+def replay(path, script, tolerance=1e-9):
+    """Прогоняет script на журнале path; возвращает сравнение команд и время."""
+    global _replaying
+    import ksp_sim
+
+    replayer = Replayer(path, tolerance)
+    sim = _Clock.patch(ksp_sim.Simulator(max_ut=math.inf))
+    os.environ.setdefault("MPLBACKEND", "Agg")
+    start = time.perf_counter()
+    _replaying = replayer
+    try:
+        with ksp_sim.install(sim):
+            try:
+                import runpy
+                runpy.run_path(script, run_name="__main__")
+            except ReplayFinished:
+                pass
+    finally:
+        _replaying = None
+    result = replayer.report()
+    result["wall_time"] = time.perf_counter() - start
+    return result
+
+
+if __name__ == "__main__":
+    # Скрипт импортирует ksp_recorder заново, а не этот __main__: _replaying
+    # должен стоять в том модуле, который увидит Recorder.from_env
+    import ksp_recorder
+    result = ksp_recorder.replay(sys.argv[1], sys.argv[2])
+    print(f"Чтений {result['reads']}, команд {result['commands']} из {result['expected']}, "
+          f"за {result['wall_time']:.2f} с")
+    for position, expected, actual in result["mismatches"][:10]:
+        print(f"  #{position}: ожидалось {expected}, получено {actual}")
+    if not result["mismatches"] and not result["missing"]:
+        print("Команды совпадают с записью")
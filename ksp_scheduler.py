@@ -0,0 +1,347 @@
+"""Планировщик задач управления на asyncio с фиксированной частотой.
+
+Каждая задача (наведение, ступени, телеметрия, журнал) идет со своей
+частотой по модельному времени UT. Следующий срок считается от момента
+старта задачи (start + k * period), а не "после работы + sleep", поэтому
+время на RPC не накапливается в дрейф. Если задача не успела к сроку,
+пропущенные периоды засчитываются как промахи и не догоняются пачкой.
+
+Синхронные задачи выполняются в пуле потоков, так что ожидание RPC одной
+задачи перекрывается работой других. Частоты можно менять на ходу:
+
+    scheduler = scheduler_for(conn)
+    scheduler.add("guidance", guidance, 50)
+    scheduler.add("telemetry", save_telemetry, 10)
+    ...
+    scheduler.set_rate("guidance", 1)  # фаза работы спутника
+    scheduler.at(ut + 0.03, cut_engine)  # разовый срок между тактами
+
+Разовый срок at() нужен там, где событие известно точнее периода задачи
+(расчетный момент выключения двигателя): задача ставит срок и сразу
+возвращается, не занимая свой такт ожиданием.
+"""
+import heapq
+import math
+import time
+
+from ksp_startup import lazy
+
+# Импорт asyncio стоит десятки мс - до первой команды он не нужен
+asyncio = lazy("asyncio")
+inspect = lazy("inspect")
+
+
+STALE = 2.0  # с реального времени без обновлений UT до проверки связи
+
+
+class UTClock:
+    """Часы по conn.space_center.ut (поток, без RPC на чтение).
+
+    Скорость хода UT относительно реального времени оценивается по
+    наблюдениям, так что ожидание остается верным и при ускорении времени.
+    Если поток UT замер дольше STALE, связь проверяется синхронным RPC:
+    после обрыва kRPC поток молча отдает последнее значение, а RPC падает.
+    """
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.ut = conn.add_stream(getattr, conn.space_center, "ut")
+        self._ref = (self.ut(), time.monotonic())
+        self._changed = self._ref
+        self.rate = 1.0
+
+    def now(self):
+        return self.ut()
+
+    def register(self):
+        pass
+
+    def unregister(self):
+        pass
+
+    async def sleep_until(self, t):
+        while True:
+            ut, mono = self.ut(), time.monotonic()
+            if ut != self._changed[0]:
+                self._changed = (ut, mono)
+            elif mono - self._changed[1] > STALE:
+                self.conn.space_center.ut  # Обрыв - исключение; игра на паузе - ждем дальше
+                self._changed = (ut, mono)
+            ut0, mono0 = self._ref
+            if mono - mono0 > 0.5 and ut > ut0:
+                self.rate = (ut - ut0) / (mono - mono0)
+                self._ref = (ut, mono)
+            if ut >= t:
+                return
+            await asyncio.sleep(min((t - ut) / max(self.rate, 1e-3), 1.0))
+
+
+class WallClock:
+    """Часы по time.monotonic(), для задач вне игры."""
+
+    def now(self):
+        return time.monotonic()
+
+    def register(self):
+        pass
+
+    def unregister(self):
+        pass
+
+    async def sleep_until(self, t):
+        delay = t - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+class SimClock:
+    """Часы модели ksp_sim: время двигается, когда все задачи ждут.
+
+    Модель продвигается сразу к ближайшему сроку, поэтому прогон идет
+    с той скоростью, с какой считает процессор.
+    """
+
+    def __init__(self, sim):
+        self.sim = sim
+        self.tasks = 0
+        self._waiters = []
+        self._seq = 0
+
+    def now(self):
+        return self.sim.ut
+
+    def register(self):
+        self.tasks += 1
+
+    def unregister(self):
+        self.tasks -= 1
+        self._wake()
+
+    async def sleep_until(self, t):
+        if t <= self.sim.ut:
+            await asyncio.sleep(0)
+            return
+        future = asyncio.get_running_loop().create_future()
+        self._seq += 1
+        entry = (t, self._seq, future)
+        heapq.heappush(self._waiters, entry)
+        self._wake()
+        try:
+            await future
+        except asyncio.CancelledError:
+            # Отмененный разовый срок не должен считаться ждущей задачей
+            if entry in self._waiters:
+                self._waiters.remove(entry)
+                heapq.heapify(self._waiters)
+            raise
+
+    def _wake(self):
+        if not self._waiters or len(self._waiters) < self.tasks:
+            return
+        t = self._waiters[0][0]
+        if t > self.sim.ut:
+            self.sim.advance(t - self.sim.ut)
+        while self._waiters and self._waiters[0][0] <= self.sim.ut + 1e-9:
+            future = heapq.heappop(self._waiters)[2]
+            if not future.done():
+                future.set_result(None)
+
+
+class TaskStats:
+    """Статистика задачи: запуски, промахи сроков, период и дрожание."""
+
+    def __init__(self):
+        self.runs = 0
+        self.missed = 0
+        self.max_lateness = 0.0
+        self.busy = 0.0  # реальное время работы задачи, с
+        self._last = None
+        self._n = 0
+        self._mean = 0.0
+        self._m2 = 0.0
+
+    def record_start(self, t, period):
+        if self._last is not None:
+            # Отклонение фактического периода от заданного:
+            # онлайн-среднее и дисперсия (Уэлфорд)
+            error = (t - self._last) - period
+            self._n += 1
+            delta = error - self._mean
+            self._mean += delta / self._n
+            self._m2 += delta * (error - self._mean)
+        self._last = t
+
+    def as_dict(self):
+        jitter = math.sqrt(self._m2 / self._n) if self._n > 1 else 0.0
+        return {"runs": self.runs, "missed": self.missed,
+                "max_lateness": self.max_lateness, "period_error": self._mean,
+                "jitter": jitter, "busy": self.busy}
+
+
+class Task:
+    def __init__(self, name, func, rate):
+        self.name = name
+        self.func = func
+        self.period = 1.0 / rate
+        self.stats = TaskStats()
+        self.is_async = None  # проверяется при запуске, когда inspect уже нужен
+
+
+class Scheduler:
+    """Запускает задачи с фиксированными частотами на одном подключении.
+
+    threads=False выполняет синхронные задачи прямо в цикле событий
+    (нужно для SimClock, где модель не потокобезопасна). executor - общий
+    пул потоков для нескольких планировщиков (ksp_fleet).
+    """
+
+    def __init__(self, clock, threads=True, workers=4, executor=None):
+        self.clock = clock
+        self.tasks = {}
+        self.threads = threads
+        self.workers = workers
+        self.executor = executor if threads else None  # пул создается на время run()
+        self._stopped = False
+        self._loop = None
+        self._once = set()  # разовые сроки at(), еще не выполненные
+        self._error = None  # исключение разового срока - поднимается из run()
+
+    def add(self, name, func, rate):
+        """Добавляет задачу func(ut) с частотой rate, Гц."""
+        self.tasks[name] = Task(name, func, rate)
+
+    def set_rate(self, name, rate):
+        """Меняет частоту задачи; новый период действует со следующего срока."""
+        self.tasks[name].period = 1.0 / rate
+
+    def set_rates(self, rates):
+        for name, rate in rates.items():
+            self.set_rate(name, rate)
+
+    def stop(self):
+        self._stopped = True
+
+    def at(self, t, func):
+        """Разовый вызов func(now) в момент t по часам; только во время run().
+
+        Можно звать из задачи (в том числе из потока пула): задача не ждет
+        срока сама, и ее сетка тактов не сбивается. Часы узнают о сроке
+        сразу, так что модель SimClock не проскочит t до следующего такта.
+        """
+        self.clock.register()
+        self._loop.call_soon_threadsafe(self._start_once, t, func)
+
+    def _start_once(self, t, func):
+        task = asyncio.ensure_future(self._run_once(t, func))
+        self._once.add(task)
+        task.add_done_callback(self._once.discard)
+
+    async def _run_once(self, t, func):
+        try:
+            await self.clock.sleep_until(t)
+            if self._stopped:
+                return
+            now = self.clock.now()
+            if inspect.iscoroutinefunction(func):
+                await func(now)
+            elif self.executor is not None:
+                await asyncio.get_running_loop().run_in_executor(self.executor, func, now)
+            else:
+                func(now)
+        except asyncio.CancelledError:
+            raise
+        except BaseException as exc:
+            # Как у периодических задач: ошибка останавливает остальных
+            self._error = self._error or exc
+            self._stopped = True
+        finally:
+            self.clock.unregister()
+
+    async def _run_task(self, task):
+        loop = asyncio.get_running_loop()
+        task.is_async = inspect.iscoroutinefunction(task.func)
+        deadline = self.clock.now()
+        period = task.period
+        self.clock.register()
+        try:
+            while not self._stopped:
+                await self.clock.sleep_until(deadline)
+                if self._stopped:
+                    break
+                now = self.clock.now()
+                task.stats.record_start(now, period)
+                lateness = now - deadline
+                task.stats.max_lateness = max(task.stats.max_lateness, lateness)
+                start = time.perf_counter()
+                if task.is_async:
+                    await task.func(now)
+                elif self.executor is not None:
+                    await loop.run_in_executor(self.executor, task.func, now)
+                else:
+                    task.func(now)
+                task.stats.busy += time.perf_counter() - start
+                task.stats.runs += 1
+
+                # Следующий срок - по сетке от старта, пропущенные не догоняем
+                period = task.period
+                deadline += period
+                now = self.clock.now()
+                if now > deadline:
+                    skipped = math.ceil((now - deadline) / period)
+                    task.stats.missed += skipped
+                    deadline += skipped * period
+        except BaseException:
+            # Ошибка одной задачи (например, обрыв связи) останавливает остальные:
+            # на SimClock оставшаяся задача иначе гоняла бы модель одна
+            self._stopped = True
+            raise
+        finally:
+            self.clock.unregister()
+
+    async def run(self, until=None):
+        """Работает до stop() или до момента until по часам."""
+        self._stopped = False
+        self._error = None
+        self._loop = asyncio.get_running_loop()
+        # Свой пул закрывается в конце run(); общий пул ksp_fleet - нет
+        own = self.threads and self.executor is None
+        if own:
+            from concurrent.futures import ThreadPoolExecutor
+            self.executor = ThreadPoolExecutor(self.workers)
+        if until is not None:
+            self.add("_until", lambda ut: self.stop() if ut >= until else None, 10)
+        try:
+            await asyncio.gather(*(self._run_task(t) for t in list(self.tasks.values())))
+        finally:
+            self.tasks.pop("_until", None)
+            # Сроки, до которых задачи не дожили (остановка, обрыв связи), отменяются
+            once = list(self._once)
+            for task in once:
+                task.cancel()
+            await asyncio.gather(*once, return_exceptions=True)
+            self._loop = None
+            if own:
+                self.executor.shutdown(wait=False)
+                self.executor = None
+        if self._error is not None:
+            raise self._error
+
+    def run_sync(self, until=None):
+        asyncio.run(self.run(until))
+        return self.report()
+
+    def report(self):
+        """Статистика по задачам: {имя: {runs, missed, jitter, ...}}."""
+        return {name: t.stats.as_dict() for name, t in self.tasks.items()}
+
+
+def clock_for(conn):
+    """Часы для подключения: модель ksp_sim или UT игры."""
+    sim = getattr(conn, "sim", None)
+    return SimClock(sim) if sim is not None else UTClock(conn)
+
+
+def scheduler_for(conn, workers=4):
+    """Планировщик с подходящими часами: UT игры или модель ksp_sim."""
+    clock = clock_for(conn)
+    return Scheduler(clock, threads=not isinstance(clock, SimClock), workers=workers)
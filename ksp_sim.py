@@ -0,0 +1,948 @@
+"""Локальная замена сервера kRPC с простой физикой выведения.
+
+Реализует тот кусок API krpc, которым пользуются наши скрипты:
+space_center.active_vessel, flight(), orbit, auto_pilot, control,
+resources.amount, available_thrust, mass, ut и activate_next_stage,
+position/velocity/direction корабля, детали по ступеням отделения
+(parts.in_decouple_stage: масса, двигатель), ускорение времени (rails/physics
+warp, warp_to), список кораблей space_center.vessels (модель Group),
+а также потоки (add_stream) и события на выражениях (krpc.add_event).
+За кулисами - точечная масса в плоскости экватора, экспоненциальная
+атмосфера и ступени с постоянным расходом топлива. Время модельное и
+идет с той скоростью, с какой считает процессор.
+
+Запуск скрипта без игры:
+    python ksp_sim.py ksp_tel.py
+"""
+import math
+import os
+import runpy
+import sys
+import threading
+import time
+import types
+
+from ksp_orbit import apsides
+from ksp_physics import KERBIN, ROCKET, body_model, g0
+from ksp_warp import PHYSICS_RATES, RAILS_RATES
+
+PHYSICS_DT = 0.02  # шаг физики KSP, с
+RAILS_STEP = 1.0  # наибольший шаг интегрирования при rails-ускорении, с
+
+FUEL_DENSITY = 5.0  # кг на единицу ресурса, как в KSP
+
+
+class SimTimeout(Exception):
+    """Модельное время вышло за предел max_ut."""
+
+
+class Simulator:
+    """Интегратор выведения точечной массы со ступенями."""
+
+    def __init__(self, rocket=None, body=None, max_ut=3600.0, dt=PHYSICS_DT, name="Sim"):
+        self.name = name
+        self.rocket = rocket or ROCKET
+        self.body = body or KERBIN
+        self.model = body_model(self.body)  # таблицы давления и плотности
+        self.max_ut = max_ut
+        self.dt = dt
+        self.stages = [dict(s) for s in self.rocket["stages"]]
+        self.stage_index = -1  # ни одна ступень еще не запущена
+        self.ut = 0.0
+        self.x, self.y = 0.0, self.body["radius"]
+        self.vx, self.vy = 0.0, 0.0
+        self.throttle = 0.0
+        self.pitch, self.heading = 90.0, 90.0
+        self.target_pitch, self.target_heading = 90.0, 90.0
+        self.autopilot_engaged = False
+        self.rails_warp = 0  # номер в RAILS_RATES
+        self.physics_warp = 0  # номер в PHYSICS_RATES
+        self.landed = True
+        self.crashed = False
+        self.max_q = 0.0
+        self.physics_time = 0.0  # реальное время, потраченное на физику
+        self.update_callbacks = []
+
+    # Состояние
+    def radius(self):
+        return math.hypot(self.x, self.y)
+
+    def altitude(self):
+        return self.radius() - self.body["radius"]
+
+    def speed(self):
+        return math.hypot(self.vx, self.vy)
+
+    def pressure(self, h=None):
+        h = self.altitude() if h is None else h
+        if h >= self.body["atmosphere_depth"]:
+            return 0.0
+        return self.model.pressure(h)
+
+    def density(self, h=None):
+        h = self.altitude() if h is None else h
+        if h >= self.body["atmosphere_depth"]:
+            return 0.0
+        return self.model.density(h)
+
+    def mass(self):
+        start = max(self.stage_index, 0)
+        m = self.rocket["payload"]
+        for s in self.stages[start:]:
+            m += s["dry_mass"] + s["fuel_mass"]
+        return m
+
+    def current_stage(self):
+        if 0 <= self.stage_index < len(self.stages):
+            return self.stages[self.stage_index]
+        return None
+
+    def available_thrust(self):
+        s = self.current_stage()
+        if s is None or s["fuel_mass"] <= 0:
+            return 0.0
+        p = self.pressure() / self.body["p0"]
+        return s["thrust"] - (s["thrust"] - s["thrust_sl"]) * p
+
+    def resource_amount(self, name):
+        start = max(self.stage_index, 0)
+        return sum(s["fuel_mass"] for s in self.stages[start:]
+                   if s["resource"] == name) / FUEL_DENSITY
+
+    def direction(self):
+        """Единичный вектор оси корабля (куда направлена тяга)."""
+        r = self.radius()
+        ux, uy = self.x / r, self.y / r
+        p = math.radians(self.pitch)
+        horizontal = math.cos(p) * math.sin(math.radians(self.heading))
+        return (math.sin(p) * ux + horizontal * uy, math.sin(p) * uy - horizontal * ux, 0.0)
+
+    # Ускорение времени
+    def warp_rate(self):
+        return RAILS_RATES[self.rails_warp] * PHYSICS_RATES[self.physics_warp]
+
+    def max_rails_warp(self):
+        """Наибольший допустимый rails-множитель: по высоте и без тяги, как в KSP."""
+        if self.throttle > 0 and self.available_thrust() > 0:
+            return 0
+        h = self.altitude()
+        factor = 0
+        for i, limit in enumerate(self.body.get("warp_altitudes", (0.0,))):
+            if h >= limit:
+                factor = i
+        return factor
+
+    def set_rails_warp(self, factor):
+        self.rails_warp = max(0, min(int(factor), self.max_rails_warp()))
+        if self.rails_warp:
+            self.physics_warp = 0
+
+    def set_physics_warp(self, factor):
+        self.physics_warp = max(0, min(int(factor), len(PHYSICS_RATES) - 1))
+        if self.physics_warp:
+            self.rails_warp = 0
+
+    def warp_to(self, ut, max_rails_rate=100000.0, max_physics_rate=2.0):
+        """Как SpaceCenter.warp_to: наибольшее допустимое ускорение до ut, затем 1x."""
+        self.set_rails_warp(max(i for i, r in enumerate(RAILS_RATES) if r <= max_rails_rate))
+        if not self.rails_warp:
+            self.set_physics_warp(max(i for i, r in enumerate(PHYSICS_RATES) if r <= max_physics_rate))
+        if ut > self.ut:
+            self.advance(ut - self.ut)
+        self.rails_warp = self.physics_warp = 0
+
+    def activate_next_stage(self):
+        if self.stage_index + 1 > len(self.stages):
+            return
+        self.stage_index += 1
+
+    def orbit(self):
+        """Элементы орбиты по вектору состояния: (a, e, время до апоцентра)."""
+        mu = self.body["mu"]
+        r = self.radius()
+        v2 = self.vx ** 2 + self.vy ** 2
+        energy = v2 / 2 - mu / r
+        h = self.x * self.vy - self.y * self.vx
+        e = math.sqrt(max(0.0, 1 + 2 * energy * h * h / (mu * mu)))
+        if energy >= 0:
+            return math.inf, e, math.inf
+        a = -mu / (2 * energy)
+        rv = self.x * self.vx + self.y * self.vy
+        # Эксцентрическая аномалия из r = a(1 - e cos E) и r·v = e sin E sqrt(mu a)
+        ecos = 1 - r / a
+        esin = rv / math.sqrt(mu * a)
+        E = math.atan2(esin, ecos)
+        M = E - esin
+        n = math.sqrt(mu / a ** 3)
+        time_to_ap = ((math.pi - M) % (2 * math.pi)) / n
+        return a, e, time_to_ap
+
+    def apsides(self):
+        """(апоцентр, перицентр) - высоты по правилу ksp_orbit.apsides."""
+        return apsides((self.x, self.y, 0.0), (self.vx, self.vy, 0.0),
+                       self.body["mu"], self.body["radius"])
+
+    # Интегрирование
+    def step(self, dt):
+        mu = self.body["mu"]
+        if self.autopilot_engaged:
+            self.pitch, self.heading = self.target_pitch, self.target_heading
+        r = self.radius()
+        ux, uy = self.x / r, self.y / r  # радиальное направление
+        ex, ey = uy, -ux  # "восток" - горизонталь по направлению полета
+        m = self.mass()
+
+        ax = -mu * ux / (r * r)
+        ay = -mu * uy / (r * r)
+
+        # На rails корабль летит по кеплеровой орбите: без тяги и сопротивления
+        on_rails = self.rails_warp > 0
+        thrust = 0.0 if on_rails else self.available_thrust() * self.throttle
+        if thrust > 0:
+            s = self.current_stage()
+            burned = s["thrust"] * self.throttle / (s["isp"] * g0) * dt
+            if burned >= s["fuel_mass"]:
+                thrust *= s["fuel_mass"] / burned
+                burned = s["fuel_mass"]
+            s["fuel_mass"] -= burned
+            p = math.radians(self.pitch)
+            horizontal = math.cos(p) * math.sin(math.radians(self.heading))
+            ax += thrust / m * (math.sin(p) * ux + horizontal * ex)
+            ay += thrust / m * (math.sin(p) * uy + horizontal * ey)
+
+        v = self.speed()
+        if v > 0 and not on_rails:
+            q = 0.5 * self.density() * v * v
+            self.max_q = max(self.max_q, q)
+            drag = q * self.rocket["cd_area"] / m
+            ax -= drag * self.vx / v
+            ay -= drag * self.vy / v
+
+        if self.landed:
+            # Стоим на столе, пока тяга не превысит вес
+            if (ax * ux + ay * uy) <= 0:
+                self.ut += dt
+                return
+            self.landed = False
+
+        self.vx += ax * dt
+        self.vy += ay * dt
+        self.x += self.vx * dt
+        self.y += self.vy * dt
+        self.ut += dt
+
+        if self.radius() < self.body["radius"]:
+            # Касание поверхности
+            self.crashed = self.crashed or self.speed() > 10.0
+            k = self.body["radius"] / self.radius()
+            self.x, self.y = self.x * k, self.y * k
+            self.vx = self.vy = 0.0
+            self.landed = True
+
+    def advance(self, seconds):
+        """Продвигает модельное время на заданное число секунд UT.
+
+        При ускорении шаг физики растет вместе с множителем (на rails - до
+        RAILS_STEP), а rails-ускорение сбрасывается, если стало недопустимым.
+        """
+        start = time.perf_counter()
+        end = self.ut + seconds
+        while self.ut < end - 1e-9:
+            dt = self.dt * self.warp_rate()
+            if self.rails_warp:
+                dt = min(dt, RAILS_STEP)
+            self.step(min(dt, end - self.ut))
+            if self.rails_warp and self.rails_warp > self.max_rails_warp():
+                self.rails_warp = self.max_rails_warp()
+        self.physics_time += time.perf_counter() - start
+        # Сервер присылает обновления потоков после каждого шага физики
+        for callback in list(self.update_callbacks):
+            callback()
+        if self.ut > self.max_ut:
+            raise SimTimeout(f"UT {self.ut:.1f} > {self.max_ut:.1f}")
+
+
+class Group:
+    """Несколько кораблей в общем модельном времени.
+
+    Для часов и событий ведет себя как Simulator (ut, dt, advance,
+    update_callbacks); корабли видны через space_center.vessels, первый -
+    активный.
+    """
+
+    def __init__(self, sims):
+        self.sims = list(sims)
+        self.dt = self.sims[0].dt
+        self.update_callbacks = []
+
+    @property
+    def ut(self):
+        return self.sims[0].ut
+
+    # Ускорение времени в KSP одно на всю игру: множитель ставится всем
+    # кораблям группы, rails - только если он допустим для каждого
+    @property
+    def rails_warp(self):
+        return min(sim.rails_warp for sim in self.sims)
+
+    @property
+    def physics_warp(self):
+        return min(sim.physics_warp for sim in self.sims)
+
+    def warp_rate(self):
+        return RAILS_RATES[self.rails_warp] * PHYSICS_RATES[self.physics_warp]
+
+    def max_rails_warp(self):
+        return min(sim.max_rails_warp() for sim in self.sims)
+
+    def set_rails_warp(self, factor):
+        factor = max(0, min(int(factor), self.max_rails_warp()))
+        for sim in self.sims:
+            sim.set_rails_warp(factor)
+
+    def set_physics_warp(self, factor):
+        for sim in self.sims:
+            sim.set_physics_warp(factor)
+
+    def warp_to(self, ut, max_rails_rate=100000.0, max_physics_rate=2.0):
+        self.set_rails_warp(max(i for i, r in enumerate(RAILS_RATES) if r <= max_rails_rate))
+        if not self.rails_warp:
+            self.set_physics_warp(max(i for i, r in enumerate(PHYSICS_RATES) if r <= max_physics_rate))
+        if ut > self.ut:
+            self.advance(ut - self.ut)
+        self.set_rails_warp(0)
+        self.set_physics_warp(0)
+
+    def advance(self, seconds):
+        end = self.ut + seconds
+        for sim in self.sims:
+            sim.advance(end - sim.ut)
+        # Один корабль сбросил rails (атмосфера, тяга) - сбрасывается у всех
+        rails = self.rails_warp
+        for sim in self.sims:
+            sim.rails_warp = min(sim.rails_warp, rails)
+        for callback in list(self.update_callbacks):
+            callback()
+
+
+# Заглушки объектов krpc. Каждое обращение к удаленному свойству или
+# методу считается одним RPC, как в настоящем клиенте.
+
+def rpc_property(procedure, fget, fset=None):
+    def getter(self):
+        self._conn._call(procedure)
+        return fget(self)
+
+    if fset is None:
+        return property(getter)
+
+    def setter(self, value):
+        self._conn._call(procedure)
+        fset(self, value)
+
+    return property(getter, setter)
+
+
+def rpc_method(procedure):
+    def decorator(func):
+        def wrapper(self, *args, **kwargs):
+            self._conn._call(procedure)
+            return func(self, *args, **kwargs)
+
+        wrapper.__name__ = func.__name__
+        wrapper.__doc__ = func.__doc__
+        return wrapper
+
+    return decorator
+
+
+class Remote:
+    def __init__(self, conn, sim=None):
+        self._conn = conn
+        self._sim = sim or conn.active
+
+
+class ReferenceFrame:
+    def __init__(self, name):
+        self.name = name
+
+    def __repr__(self):
+        return f"<ReferenceFrame {self.name}>"
+
+
+class CelestialBody(Remote):
+    def __init__(self, conn, sim=None):
+        super().__init__(conn, sim)
+        self._frame = ReferenceFrame(self._sim.body["name"])
+
+    name = rpc_property("CelestialBody.name", lambda s: s._sim.body["name"])
+    reference_frame = rpc_property("CelestialBody.reference_frame", lambda s: s._frame)
+    non_rotating_reference_frame = rpc_property(
+        "CelestialBody.non_rotating_reference_frame", lambda s: s._frame)
+    gravitational_parameter = rpc_property(
+        "CelestialBody.gravitational_parameter", lambda s: s._sim.body["mu"])
+    equatorial_radius = rpc_property(
+        "CelestialBody.equatorial_radius", lambda s: s._sim.body["radius"])
+    atmosphere_depth = rpc_property(
+        "CelestialBody.atmosphere_depth", lambda s: s._sim.body["atmosphere_depth"])
+    has_atmosphere = rpc_property("CelestialBody.has_atmosphere", lambda s: True)
+    surface_gravity = rpc_property(
+        "CelestialBody.surface_gravity",
+        lambda s: s._sim.body["mu"] / s._sim.body["radius"] ** 2)
+    mass = rpc_property(
+        "CelestialBody.mass", lambda s: s._sim.body["mu"] / 6.67430e-11)
+
+    @rpc_method("CelestialBody.pressure_at")
+    def pressure_at(self, altitude):
+        return self._sim.pressure(altitude)
+
+    @rpc_method("CelestialBody.density_at")
+    def density_at(self, position, reference_frame):
+        return self._sim.density(math.hypot(*position) - self._sim.body["radius"])
+
+    # Как у объектов krpc: один и тот же объект сервера равен сам себе
+    def __eq__(self, other):
+        return isinstance(other, CelestialBody) and other._sim.body is self._sim.body
+
+    def __hash__(self):
+        return id(self._sim.body)
+
+
+class Flight(Remote):
+    """Все системы отсчета дают значения относительно центра тела."""
+
+    def _vertical(s):
+        r = s._sim.radius()
+        return (s._sim.x * s._sim.vx + s._sim.y * s._sim.vy) / r
+
+    def _horizontal(s):
+        r = s._sim.radius()
+        return (s._sim.y * s._sim.vx - s._sim.x * s._sim.vy) / r
+
+    mean_altitude = rpc_property("Flight.mean_altitude", lambda s: s._sim.altitude())
+    surface_altitude = rpc_property("Flight.surface_altitude", lambda s: s._sim.altitude())
+    speed = rpc_property("Flight.speed", lambda s: s._sim.speed())
+    velocity = rpc_property("Flight.velocity", lambda s: (s._sim.vx, s._sim.vy, 0.0))
+    vertical_speed = rpc_property("Flight.vertical_speed", _vertical)
+    horizontal_speed = rpc_property("Flight.horizontal_speed", _horizontal)
+    pitch = rpc_property("Flight.pitch", lambda s: s._sim.pitch)
+    heading = rpc_property("Flight.heading", lambda s: s._sim.heading)
+    static_pressure = rpc_property("Flight.static_pressure", lambda s: s._sim.pressure())
+    atmosphere_density = rpc_property("Flight.atmosphere_density", lambda s: s._sim.density())
+    dynamic_pressure = rpc_property(
+        "Flight.dynamic_pressure", lambda s: 0.5 * s._sim.density() * s._sim.speed() ** 2)
+
+
+class Orbit(Remote):
+    def __init__(self, conn, sim=None):
+        super().__init__(conn, sim)
+        self._body = CelestialBody(conn, sim)
+
+    body = rpc_property("Orbit.body", lambda s: s._body)
+    apoapsis_altitude = rpc_property("Orbit.apoapsis_altitude", lambda s: s._sim.apsides()[0])
+    periapsis_altitude = rpc_property("Orbit.periapsis_altitude", lambda s: s._sim.apsides()[1])
+    apoapsis = rpc_property(
+        "Orbit.apoapsis", lambda s: s._sim.apsides()[0] + s._sim.body["radius"])
+    periapsis = rpc_property(
+        "Orbit.periapsis", lambda s: s._sim.apsides()[1] + s._sim.body["radius"])
+    semi_major_axis = rpc_property("Orbit.semi_major_axis", lambda s: s._sim.orbit()[0])
+    eccentricity = rpc_property("Orbit.eccentricity", lambda s: s._sim.orbit()[1])
+    time_to_apoapsis = rpc_property("Orbit.time_to_apoapsis", lambda s: s._sim.orbit()[2])
+    speed = rpc_property("Orbit.speed", lambda s: s._sim.speed())
+    radius = rpc_property("Orbit.radius", lambda s: s._sim.radius())
+    inclination = rpc_property("Orbit.inclination", lambda s: 0.0)
+
+
+class AutoPilot(Remote):
+    def __init__(self, conn, sim=None):
+        super().__init__(conn, sim)
+        self._settings = {"target_roll": 0.0, "reference_frame": None,
+                          "stopping_time": (0.5, 0.5, 0.5),
+                          "max_rotation_rate": (1.0, 1.0, 1.0)}
+
+    @rpc_method("AutoPilot.engage")
+    def engage(self):
+        self._sim.autopilot_engaged = True
+
+    @rpc_method("AutoPilot.disengage")
+    def disengage(self):
+        self._sim.autopilot_engaged = False
+
+    @rpc_method("AutoPilot.target_pitch_and_heading")
+    def target_pitch_and_heading(self, pitch, heading):
+        self._sim.target_pitch = float(pitch)
+        self._sim.target_heading = float(heading)
+
+    def _setting(name):
+        return rpc_property(
+            "AutoPilot." + name,
+            lambda s: s._settings[name],
+            lambda s, value: s._settings.__setitem__(name, value))
+
+    target_pitch = rpc_property(
+        "AutoPilot.target_pitch", lambda s: s._sim.target_pitch,
+        lambda s, v: setattr(s._sim, "target_pitch", float(v)))
+    target_heading = rpc_property(
+        "AutoPilot.target_heading", lambda s: s._sim.target_heading,
+        lambda s, v: setattr(s._sim, "target_heading", float(v)))
+    target_roll = _setting("target_roll")
+    reference_frame = _setting("reference_frame")
+    stopping_time = _setting("stopping_time")
+    max_rotation_rate = _setting("max_rotation_rate")
+
+
+class Control(Remote):
+    def __init__(self, conn, sim=None):
+        super().__init__(conn, sim)
+        self._flags = {"sas": False, "rcs": False}
+
+    throttle = rpc_property(
+        "Control.throttle", lambda s: s._sim.throttle,
+        lambda s, v: setattr(s._sim, "throttle", min(max(float(v), 0.0), 1.0)))
+    sas = rpc_property(
+        "Control.sas", lambda s: s._flags["sas"],
+        lambda s, v: s._flags.__setitem__("sas", bool(v)))
+    rcs = rpc_property(
+        "Control.rcs", lambda s: s._flags["rcs"],
+        lambda s, v: s._flags.__setitem__("rcs", bool(v)))
+    current_stage = rpc_property(
+        "Control.current_stage", lambda s: len(s._sim.stages) - 1 - s._sim.stage_index)
+
+    @rpc_method("Control.activate_next_stage")
+    def activate_next_stage(self):
+        self._sim.activate_next_stage()
+        return []
+
+
+class Resources(Remote):
+    @rpc_method("Resources.amount")
+    def amount(self, name):
+        return self._sim.resource_amount(name)
+
+
+class Engine(Remote):
+    def __init__(self, conn, sim, index):
+        super().__init__(conn, sim)
+        self._index = index
+
+    max_vacuum_thrust = rpc_property(
+        "Engine.max_vacuum_thrust", lambda s: s._sim.stages[s._index]["thrust"])
+    vacuum_specific_impulse = rpc_property(
+        "Engine.vacuum_specific_impulse", lambda s: s._sim.stages[s._index]["isp"])
+
+
+class Part(Remote):
+    # Ступень модели - одна деталь (бак с двигателем), полезная нагрузка -
+    # деталь без двигателя, которая не отделяется (index None)
+    def __init__(self, conn, sim, index):
+        super().__init__(conn, sim)
+        self._index = index
+        self._engine = None if index is None else Engine(conn, sim, index)
+
+    def _mass(self, dry):
+        if self._index is None:
+            return self._sim.rocket["payload"]
+        s = self._sim.stages[self._index]
+        return s["dry_mass"] + (0.0 if dry else s["fuel_mass"])
+
+    engine = rpc_property("Part.engine", lambda s: s._engine)
+    mass = rpc_property("Part.mass", lambda s: s._mass(False))
+    dry_mass = rpc_property("Part.dry_mass", lambda s: s._mass(True))
+    decouple_stage = rpc_property(
+        "Part.decouple_stage",
+        lambda s: -1 if s._index is None else len(s._sim.stages) - 2 - s._index)
+
+
+class Parts(Remote):
+    # Номера как в KSP: ступень i отделяется при запуске ступени i + 1,
+    # то есть при current_stage = len - 2 - i; верхняя не отделяется (-1)
+    @rpc_method("Parts.in_decouple_stage")
+    def in_decouple_stage(self, stage):
+        sim = self._sim
+        index = len(sim.stages) - 2 - stage
+        if stage == -1:
+            return [Part(self._conn, sim, len(sim.stages) - 1), Part(self._conn, sim, None)]
+        if max(sim.stage_index, 0) <= index < len(sim.stages) - 1:
+            return [Part(self._conn, sim, index)]
+        return []
+
+
+class Vessel(Remote):
+    def __init__(self, conn, sim=None):
+        super().__init__(conn, sim)
+        self._flight = Flight(conn, sim)
+        self._orbit = Orbit(conn, sim)
+        self._auto_pilot = AutoPilot(conn, sim)
+        self._control = Control(conn, sim)
+        self._resources = Resources(conn, sim)
+        self._parts = Parts(conn, sim)
+        self._surface_frame = ReferenceFrame("surface")
+        self._frame = ReferenceFrame("vessel")
+
+    @rpc_method("Vessel.flight")
+    def flight(self, reference_frame=None):
+        return self._flight
+
+    @rpc_method("Vessel.position")
+    def position(self, reference_frame):
+        return (self._sim.x, self._sim.y, 0.0)
+
+    @rpc_method("Vessel.velocity")
+    def velocity(self, reference_frame):
+        return (self._sim.vx, self._sim.vy, 0.0)
+
+    @rpc_method("Vessel.direction")
+    def direction(self, reference_frame):
+        return self._sim.direction()
+
+    name = rpc_property("Vessel.name", lambda s: s._sim.name)
+    orbit = rpc_property("Vessel.orbit", lambda s: s._orbit)
+    auto_pilot = rpc_property("Vessel.auto_pilot", lambda s: s._auto_pilot)
+    control = rpc_property("Vessel.control", lambda s: s._control)
+    resources = rpc_property("Vessel.resources", lambda s: s._resources)
+    parts = rpc_property("Vessel.parts", lambda s: s._parts)
+    mass = rpc_property("Vessel.mass", lambda s: s._sim.mass())
+    available_thrust = rpc_property("Vessel.available_thrust", lambda s: s._sim.available_thrust())
+    thrust = rpc_property(
+        "Vessel.thrust", lambda s: s._sim.available_thrust() * s._sim.throttle)
+    specific_impulse = rpc_property(
+        "Vessel.specific_impulse",
+        lambda s: (s._sim.current_stage() or {"isp": 0.0})["isp"])
+    surface_reference_frame = rpc_property(
+        "Vessel.surface_reference_frame", lambda s: s._surface_frame)
+    reference_frame = rpc_property("Vessel.reference_frame", lambda s: s._frame)
+
+
+class SpaceCenter(Remote):
+    def __init__(self, conn):
+        super().__init__(conn)
+        self._vessels = [Vessel(conn, sim) for sim in getattr(conn.sim, "sims", [conn.sim])]
+
+    active_vessel = rpc_property("SpaceCenter.active_vessel", lambda s: s._vessels[0])
+    vessels = rpc_property("SpaceCenter.vessels", lambda s: list(s._vessels))
+    ut = rpc_property("SpaceCenter.ut", lambda s: s._sim.ut)
+    # Ускорение - общее для игры: у Group на все корабли сразу
+    rails_warp_factor = rpc_property(
+        "SpaceCenter.rails_warp_factor", lambda s: s._conn.sim.rails_warp,
+        lambda s, v: s._conn.sim.set_rails_warp(v))
+    physics_warp_factor = rpc_property(
+        "SpaceCenter.physics_warp_factor", lambda s: s._conn.sim.physics_warp,
+        lambda s, v: s._conn.sim.set_physics_warp(v))
+    warp_rate = rpc_property("SpaceCenter.warp_rate", lambda s: float(s._conn.sim.warp_rate()))
+    maximum_rails_warp_factor = rpc_property(
+        "SpaceCenter.maximum_rails_warp_factor", lambda s: s._conn.sim.max_rails_warp())
+
+    @rpc_method("SpaceCenter.can_rails_warp_at")
+    def can_rails_warp_at(self, factor=1):
+        return factor <= self._conn.sim.max_rails_warp()
+
+    @rpc_method("SpaceCenter.warp_to")
+    def warp_to(self, ut, max_rails_rate=100000.0, max_physics_rate=2.0):
+        self._conn.sim.warp_to(ut, max_rails_rate, max_physics_rate)
+
+
+class Stream:
+    """Поток: значение вычисляется "на сервере", без RPC."""
+
+    def __init__(self, conn, func, args, kwargs):
+        self._conn = conn
+        self._func, self._args, self._kwargs = func, args, kwargs
+        self._value = None
+
+    def __call__(self):
+        if self._conn.dropped:
+            return self._value  # Как в krpc: после обрыва - последнее полученное значение
+        self._conn._streaming += 1
+        try:
+            self._value = self._func(*self._args, **self._kwargs)
+            return self._value
+        finally:
+            self._conn._streaming -= 1
+
+    def remove(self):
+        pass
+
+
+class Call:
+    """Аналог KRPC.ProcedureCall: отложенный вызов для выражений."""
+
+    def __init__(self, func, args, kwargs):
+        self.func, self.args, self.kwargs = func, args, kwargs
+
+    def __call__(self):
+        return self.func(*self.args, **self.kwargs)
+
+
+class Expression:
+    """Выражение, вычисляемое "на сервере"."""
+
+    def __init__(self, fn):
+        self._fn = fn
+
+    def evaluate(self):
+        return self._fn()
+
+
+class Expressions(Remote):
+    """Аналог conn.krpc.Expression: построение выражений."""
+
+    def _binary(name, op):
+        @rpc_method("Expression." + name)
+        def method(self, a, b):
+            return Expression(lambda: op(a.evaluate(), b.evaluate()))
+
+        method.__name__ = name
+        return method
+
+    @rpc_method("Expression.call")
+    def call(self, call):
+        return Expression(call)
+
+    @rpc_method("Expression.constant_double")
+    def constant_double(self, value):
+        return Expression(lambda: float(value))
+
+    @rpc_method("Expression.constant_float")
+    def constant_float(self, value):
+        return Expression(lambda: float(value))
+
+    @rpc_method("Expression.constant_int")
+    def constant_int(self, value):
+        return Expression(lambda: int(value))
+
+    @rpc_method("Expression.not_")
+    def not_(self, a):
+        return Expression(lambda: not a.evaluate())
+
+    equal = _binary("equal", lambda a, b: a == b)
+    greater_than = _binary("greater_than", lambda a, b: a > b)
+    greater_than_or_equal = _binary("greater_than_or_equal", lambda a, b: a >= b)
+    less_than = _binary("less_than", lambda a, b: a < b)
+    less_than_or_equal = _binary("less_than_or_equal", lambda a, b: a <= b)
+    and_ = _binary("and_", lambda a, b: a and b)
+    or_ = _binary("or_", lambda a, b: a or b)
+    add = _binary("add", lambda a, b: a + b)
+    subtract = _binary("subtract", lambda a, b: a - b)
+
+
+class Event:
+    """Событие по выражению. Проверяется после каждого шага физики,
+    обратные вызовы срабатывают на переходе выражения в True."""
+
+    def __init__(self, conn, expression):
+        self._conn = conn
+        self._stream = Stream(conn, expression.evaluate, (), {})
+        self._callbacks = []
+        self._last = False
+        self._started = False
+        self.condition = threading.Condition()
+
+    @property
+    def stream(self):
+        return self._stream
+
+    def start(self):
+        if not self._started:
+            self._started = True
+            self._conn.sim.update_callbacks.append(self._check)
+
+    def _check(self):
+        value = bool(self._stream())
+        if value and not self._last:
+            for callback in list(self._callbacks):
+                callback()
+        self._last = value
+
+    def wait(self, timeout=None):
+        """Ждет срабатывания; пока ждем, модельное время идет."""
+        sim = self._conn.sim
+        end = math.inf if timeout is None else sim.ut + timeout
+        while not self._stream() and sim.ut < end:
+            sim.advance(sim.dt)
+
+    def add_callback(self, callback):
+        self._callbacks.append(callback)
+
+    def remove_callback(self, callback):
+        self._callbacks.remove(callback)
+
+    def remove(self):
+        if self._started:
+            self._conn.sim.update_callbacks.remove(self._check)
+            self._started = False
+
+
+class KRPC(Remote):
+    """Аналог сервиса conn.krpc."""
+
+    def __init__(self, conn):
+        super().__init__(conn)
+        self.Expression = Expressions(conn)
+
+    @rpc_method("KRPC.AddEvent")
+    def add_event(self, expression):
+        return Event(self._conn, expression)
+
+
+class Connection:
+    """Подключение к модели вместо сервера kRPC."""
+
+    def __init__(self, sim=None, name=None, latency=0.0):
+        self.sim = sim or Simulator()
+        self.active = getattr(self.sim, "sims", [self.sim])[0]  # модель активного корабля
+        self.name = name
+        self.latency = latency  # искусственная задержка одного RPC, с
+        self.rpc_count = 0
+        self.rpc_counts = {}  # число вызовов по именам процедур
+        self._streaming = 0
+        self._callbacks = []
+        self.dropped = False
+        self.space_center = SpaceCenter(self)
+        self.krpc = KRPC(self)
+
+    def _call(self, procedure):
+        if self.dropped:
+            raise ConnectionResetError("Соединение с моделью разорвано")
+        if self._streaming:
+            return
+        self.rpc_count += 1
+        self.rpc_counts[procedure] = self.rpc_counts.get(procedure, 0) + 1
+        if self.latency:
+            _real_sleep(self.latency)
+
+    def add_stream(self, func, *args, **kwargs):
+        self._call("KRPC.AddStream")
+        return Stream(self, func, args, kwargs)
+
+    @staticmethod
+    def get_call(func, *args, **kwargs):
+        if func is getattr:
+            obj, name = args
+            return Call(lambda: getattr(obj, name), (), {})
+        return Call(func, args, kwargs)
+
+    def invoke_batch(self, calls):
+        """Несколько вызовов в одном запросе: один RPC на всех."""
+        self._call("KRPC.Batch")
+        self._streaming += 1
+        try:
+            return [call() for call in calls]
+        finally:
+            self._streaming -= 1
+
+    def add_stream_update_callback(self, callback):
+        self._callbacks.append(callback)
+        self.sim.update_callbacks.append(callback)
+
+    def remove_stream_update_callback(self, callback):
+        self._callbacks.remove(callback)
+        if callback in self.sim.update_callbacks:
+            self.sim.update_callbacks.remove(callback)
+
+    def drop(self):
+        """Обрыв связи: RPC падают, потоки замирают, автопилот клиента
+        отпускает корабль (как в kRPC при отключении клиента)."""
+        self.dropped = True
+        for callback in self._callbacks:
+            if callback in self.sim.update_callbacks:
+                self.sim.update_callbacks.remove(callback)
+        self.active.autopilot_engaged = False
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+_real_sleep = time.sleep
+_real_time = time.time
+
+
+def connect(name=None, sim=None, latency=0.0, **kwargs):
+    """Аналог krpc.connect(); адрес и порты игнорируются."""
+    return Connection(sim, name=name, latency=latency)
+
+
+class install:
+    """Подменяет модуль krpc и часы процесса моделью.
+
+    Внутри блока ``import krpc; krpc.connect()`` возвращает подключение к
+    модели, time.sleep() продвигает модельное время вместо ожидания (с
+    учетом текущего ускорения, как реальная пауза в игре), а time.time()
+    идет по модельному времени.
+    """
+
+    def __init__(self, sim=None, latency=0.0):
+        self.sim = sim or Simulator()
+        self.latency = latency
+        self.connections = []
+
+    def _connect(self, name=None, **kwargs):
+        conn = Connection(self.sim, name=name, latency=self.latency)
+        self.connections.append(conn)
+        return conn
+
+    def __enter__(self):
+        module = types.ModuleType("krpc")
+        module.connect = self._connect
+        self._saved = sys.modules.get("krpc"), time.sleep, time.time
+        sys.modules["krpc"] = module
+        epoch = _real_time()
+        time.sleep = lambda seconds: self.sim.advance(seconds * self.sim.warp_rate())
+        time.time = lambda: epoch + self.sim.ut
+        return self
+
+    def __exit__(self, *exc):
+        module, time.sleep, time.time = self._saved
+        if module is None:
+            sys.modules.pop("krpc", None)
+        else:
+            sys.modules["krpc"] = module
+
+    @property
+    def rpc_count(self):
+        return sum(c.rpc_count for c in self.connections)
+
+
+def run_script(path, rocket=None, max_ut=3600.0, latency=0.0):
+    """Прогоняет скрипт полета на модели и возвращает статистику прогона."""
+    sim = Simulator(rocket, max_ut=max_ut)
+    os.environ.setdefault("MPLBACKEND", "Agg")  # plt.show() не блокирует
+    start = time.perf_counter()
+    timed_out = False
+    argv = sys.argv
+    sys.argv = [path]  # Скрипт видит свои аргументы, а не аргументы ksp_sim
+    with install(sim, latency) as env:
+        try:
+            runpy.run_path(path, run_name="__main__")
+        except SimTimeout:
+            timed_out = True
+        finally:
+            sys.argv = argv
+    wall = time.perf_counter() - start
+    apoapsis, periapsis = sim.apsides()
+    return {
+        "script": path,
+        "ut": sim.ut,
+        "timed_out": timed_out,
+        "crashed": sim.crashed,
+        "altitude": sim.altitude(),
+        "apoapsis": apoapsis,
+        "periapsis": periapsis,
+        "max_q": sim.max_q,
+        "rpc_count": env.rpc_count,
+        "wall_time": wall,
+        "physics_time": sim.physics_time,
+        "loop_overhead": wall - sim.physics_time,
+    }
+
+
+if __name__ == "__main__":
+    for script in sys.argv[1:] or ["kpkp.py"]:
+        stats = run_script(script)
+        print(", ".join(f"{k}: {v:.4g}" if isinstance(v, float) else f"{k}: {v}"
+                        for k, v in stats.items()))
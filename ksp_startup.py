@@ -0,0 +1,510 @@
+"""Быстрый старт: отложенные импорты, кэш описаний сервисов, теплый демон.
+
+От запуска скрипта до первой команды уходило время на импорт krpc,
+numpy и asyncio, на krpc.connect() (сервер отдает описания всех сервисов
+- KRPC.GetServices) и на подписки. Здесь:
+
+    - lazy("numpy") - модуль-заместитель: настоящий импорт при первом
+      обращении к атрибуту; preload() импортирует модули в фоновом
+      потоке, пока основной ждет сеть;
+    - connect() - krpc.connect() с описаниями сервисов из файлового кэша
+      (ключ - адрес, порт и версия сервера; refresh=True перечитывает);
+    - демон держит импортированные модули и открытое подключение и
+      выполняет миссии, присланные через локальный сокет:
+
+    python ksp_startup.py serve [--sim]     # демон
+    python ksp_startup.py run ksp_tel.py    # миссия через демона
+    python ksp_startup.py bench ksp_tel.py  # время до первой команды: холодный старт и демон
+
+Миссии в демоне выполняются по очереди, в его процессе: krpc.connect()
+внутри скрипта отдает общее подключение (close() не закрывает его, а
+потоки миссии удаляются после ее завершения).
+
+Десятков миллисекунд до первой команды это не дает: на модели с 2 мс
+на RPC демон - около 95 мс (без задержки RPC около 60 мс, из них ~20 мс
+запуск интерпретатора клиента), холодный старт - 200-350 мс.
+"""
+import importlib
+import json
+import os
+import sys
+import threading
+import time
+import types
+
+CACHE = os.path.join(os.path.expanduser("~"), ".cache", "ksp", "services")
+# Модули, которые демон импортирует заранее
+WARM = ("numpy", "asyncio", "inspect", "concurrent.futures", "sqlite3", "zlib",
+        "ksp_stream", "ksp_telemetry", "ksp_scheduler", "ksp_control", "ksp_plot",
+        "ksp_metrics", "ksp_orbit", "ksp_warp", "ksp_recorder", "ksp_archive",
+        "ksp_physics", "ksp_guidance", "ksp_batch", "ksp_log", "ksp_multicall",
+        "ksp_mission", "ksp_events")
+# Процедуры-команды: первая из них - конец старта (имена как в ksp_metrics)
+COMMANDS = {"AutoPilot.engage", "AutoPilot.target_pitch_and_heading", "AutoPilot.target_roll",
+            "Control.throttle", "Control.activate_next_stage", "Control.sas", "Control.rcs"}
+END = "\0"  # начало строки-итога в ответе демона
+_now = time.time  # настоящие часы: ksp_sim.install подменяет time.time модельными
+
+
+def socket_path():
+    """Сокет демона: KSP_DAEMON или файл во временном каталоге."""
+    import tempfile
+    return os.environ.get("KSP_DAEMON") or os.path.join(
+        tempfile.gettempdir(), f"ksp-daemon-{os.getuid()}.sock")
+
+
+def running(path=None):
+    """Слушает ли демон сокет (файл мог остаться от упавшего демона)."""
+    import socket
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(path or socket_path())
+    except OSError:
+        return False
+    finally:
+        sock.close()
+    return True
+
+
+class _Lazy(types.ModuleType):
+    # Заместитель модуля: первый доступ к атрибуту импортирует модуль и
+    # копирует его словарь, дальше атрибуты читаются напрямую
+    def __getattr__(self, name):
+        module = importlib.import_module(self.__name__)
+        self.__dict__.update(module.__dict__)
+        return getattr(module, name)
+
+
+def lazy(name):
+    """Модуль name, импортируемый при первом обращении к атрибуту."""
+    return sys.modules.get(name) or _Lazy(name)
+
+
+def preload(*names):
+    """Импортирует модули в фоновом потоке; возвращает поток."""
+    def run():
+        for name in names:
+            try:
+                importlib.import_module(name)
+            except ImportError:
+                pass
+
+    thread = threading.Thread(target=run, name="preload", daemon=True)
+    thread.start()
+    return thread
+
+
+_connect_lock = threading.Lock()
+
+
+def connect(name=None, address="127.0.0.1", rpc_port=50000, stream_port=50001,
+            cache=CACHE, refresh=False):
+    """krpc.connect() с описаниями сервисов из кэша.
+
+    На модели ksp_sim и внутри демона krpc.connect подменен - тогда это
+    просто его вызов.
+    """
+    import krpc
+
+    client = getattr(krpc, "client", None)
+    if client is None or cache is None:
+        return krpc.connect(name=name, address=address, rpc_port=rpc_port, stream_port=stream_port)
+    from krpc.schema import KRPC_pb2
+
+    original = client.Client._invoke
+
+    def invoke(self, service, procedure, *args):
+        if (service, procedure) != ("KRPC", "GetServices"):
+            return original(self, service, procedure, *args)
+        status = original(self, "KRPC", "GetStatus", [], [], [], self._types.status_type)
+        path = os.path.join(cache, f"{address}-{rpc_port}-{status.version}.pb")
+        if not refresh and os.path.exists(path):
+            services = KRPC_pb2.Services()
+            with open(path, "rb") as f:
+                services.ParseFromString(f.read())
+            return services
+        services = original(self, service, procedure, *args)
+        os.makedirs(cache, exist_ok=True)
+        with open(path + ".tmp", "wb") as f:
+            f.write(services.SerializeToString())
+        os.replace(path + ".tmp", path)
+        return services
+
+    with _connect_lock:
+        client.Client._invoke = invoke
+        try:
+            return krpc.connect(name=name, address=address, rpc_port=rpc_port,
+                                stream_port=stream_port)
+        finally:
+            client.Client._invoke = original
+
+
+class _Lease:
+    # Общее подключение демона на время одной миссии
+    def __init__(self, conn):
+        object.__setattr__(self, "_lease_conn", conn)
+        object.__setattr__(self, "_lease_streams", [])
+        object.__setattr__(self, "_lease_saved", getattr(conn, "_rpc_connection", None))
+
+    def add_stream(self, *args, **kwargs):
+        stream = self._lease_conn.add_stream(*args, **kwargs)
+        self._lease_streams.append(stream)
+        return stream
+
+    def close(self):
+        pass  # подключение остается демону
+
+    def release(self):
+        """Удаляет потоки миссии и снимает ее обертки с подключения."""
+        for stream in self._lease_streams:
+            try:
+                stream.remove()
+            except Exception:
+                pass
+        self._lease_streams.clear()
+        if self._lease_saved is not None:
+            self._lease_conn._rpc_connection = self._lease_saved
+
+    def __getattr__(self, name):
+        return getattr(self._lease_conn, name)
+
+    def __setattr__(self, name, value):
+        # Metrics.attach() оборачивает _rpc_connection самого подключения
+        setattr(self._lease_conn, name, value)
+
+
+class FirstCommand(BaseException):
+    """Миссия остановлена на первой команде (замер старта)."""
+
+
+class _Watch:
+    # Момент первой команды: по вызовам модели или запросам к серверу
+    def __init__(self, stop=False):
+        self.stop = stop
+        self.first_command = None
+
+    def observe(self, name):
+        if self.first_command is None and name in COMMANDS:
+            self.first_command = _now()
+            if self.stop:
+                raise FirstCommand(name)
+
+
+class _Sender:
+    # Обертка сокета RPC: имя каждого вызова - в _Watch
+    def __init__(self, inner, watch):
+        self._inner = inner
+        self._watch = watch
+
+    def send_message(self, message):
+        from ksp_metrics import procedure_name
+        for call in getattr(message, "calls", ()):
+            self._watch.observe(procedure_name(call.service, call.procedure))
+        return self._inner.send_message(message)
+
+    def __getattr__(self, name):
+        return getattr(self._inner, name)
+
+
+class _Output:
+    # Поток вывода миссии в сокет клиента
+    def __init__(self, sock):
+        self.sock = sock
+        self.closed = False
+
+    def write(self, text):
+        if not self.closed:
+            try:
+                self.sock.sendall(text.replace(END, "").encode())
+            except OSError:
+                self.closed = True  # клиент ушел - миссия продолжается
+        return len(text)
+
+    def flush(self):
+        pass
+
+    def isatty(self):
+        return False
+
+
+class Daemon:
+    """Теплый процесс: модули импортированы, подключение открыто.
+
+    sim=True - каждая миссия летит на свежей модели ksp_sim (подключение
+    модели дешевое, теплыми остаются импорты).
+    """
+
+    def __init__(self, path=None, sim=False, name="KSP Daemon", latency=0.0):
+        self.path = path or socket_path()
+        self.sim = sim
+        self.latency = latency
+        self.missions = 0
+        for module in WARM:
+            try:
+                importlib.import_module(module)
+            except ImportError:
+                pass
+        self.conn = None if sim else connect(name=name)
+
+    def serve(self):
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+        import signal
+        import socket
+        signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))  # и по kill убрать сокет
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        server.bind(self.path)
+        server.listen(8)
+        print(f"Демон слушает {self.path}", flush=True)
+        try:
+            while True:
+                sock, _ = server.accept()
+                with sock:
+                    self.handle(sock)
+        finally:
+            server.close()
+            os.unlink(self.path)
+
+    def handle(self, sock):
+        received = _now()
+        data = b""
+        while not data.endswith(b"\n"):
+            chunk = sock.recv(65536)
+            if not chunk:
+                return
+            data += chunk
+        request = json.loads(data)
+        result = self.run(request, _Output(sock))
+        result["received"] = received
+        try:
+            sock.sendall((END + json.dumps(result) + "\n").encode())
+        except OSError:
+            pass
+
+    def run(self, request, output):
+        """Выполняет скрипт миссии; возвращает код выхода и время первой команды."""
+        import traceback
+
+        saved = sys.argv, os.getcwd(), dict(os.environ), sys.stdout, sys.stderr
+        path = list(sys.path)
+        sys.path.insert(0, os.path.dirname(request["script"]))
+        sys.argv = [request["script"]] + request.get("args", [])
+        os.chdir(request.get("cwd", os.getcwd()))
+        os.environ.update(request.get("env", {}))
+        sys.stdout = sys.stderr = output
+        watch = _Watch(stop=request.get("stop", False))
+        namespace = {"__name__": "__main__", "__file__": request["script"]}
+        code = 0
+        try:
+            with open(request["script"], "rb") as f:
+                source = compile(f.read(), request["script"], "exec")
+            with self._environment(watch):
+                exec(source, namespace)
+        except FirstCommand:
+            pass
+        except SystemExit as e:
+            code = e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+        except BaseException:
+            traceback.print_exc()
+            code = 1
+        finally:
+            sys.argv, cwd, environ, sys.stdout, sys.stderr = saved
+            sys.path[:] = path
+            os.chdir(cwd)
+            os.environ.clear()
+            os.environ.update(environ)
+            abandon(namespace)
+            self.missions += 1
+        return {"exit": code, "first_command": watch.first_command}
+
+    def _environment(self, watch):
+        if self.sim:
+            return _sim_environment(watch, self.latency)
+        return _lease_environment(self.conn, watch)
+
+
+def abandon(namespace, wait=False):
+    """Закрывает графики прерванной миссии по ее глобальным переменным.
+
+    Процессы рисования иначе остались бы жить вместе с демоном.
+    """
+    from ksp_plot import LivePlot
+    for value in namespace.values():
+        if isinstance(value, LivePlot) and not value.process.stdin.closed:
+            value.close(wait=wait)
+
+
+class _lease_environment:
+    # krpc.connect() внутри миссии отдает общее подключение
+    def __init__(self, conn, watch):
+        self.lease = _Lease(conn)
+        self.watch = watch
+
+    def __enter__(self):
+        import krpc
+        self.krpc = krpc
+        self.saved = krpc.connect
+        lease = self.lease
+        conn = lease._lease_conn
+        conn._rpc_connection = _Sender(conn._rpc_connection, self.watch)
+        krpc.connect = lambda *args, **kwargs: lease
+        return self
+
+    def __exit__(self, *exc):
+        self.krpc.connect = self.saved
+        self.lease.release()
+
+
+class _sim_environment:
+    # Свежая модель ksp_sim на миссию; команды видны по вызовам модели
+    def __init__(self, watch, latency=0.0):
+        import ksp_sim
+        self.ksp_sim = ksp_sim
+        self.install = ksp_sim.install(ksp_sim.Simulator(), latency)
+        self.watch = watch
+
+    def __enter__(self):
+        call = self.call = self.ksp_sim.Connection._call
+        watch = self.watch
+
+        def observed(conn, procedure):
+            watch.observe(procedure)
+            return call(conn, procedure)
+
+        self.ksp_sim.Connection._call = observed
+        self.install.__enter__()
+        return self
+
+    def __exit__(self, *exc):
+        self.install.__exit__(*exc)
+        self.ksp_sim.Connection._call = self.call
+        return isinstance(exc[1], self.ksp_sim.SimTimeout)
+
+
+def submit(script, args=(), path=None, out=None, stop=False):
+    """Отправляет миссию демону и печатает ее вывод; возвращает итог.
+
+    stop=True - миссия останавливается на первой команде.
+    """
+    import socket
+    out = out or sys.stdout
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.connect(path or socket_path())
+    env = {k: v for k, v in os.environ.items() if k.startswith("KSP_") or k == "MPLBACKEND"}
+    request = {"script": os.path.abspath(script), "args": list(args), "cwd": os.getcwd(),
+               "env": env, "stop": stop}
+    sock.sendall((json.dumps(request) + "\n").encode())
+    buffer = b""
+    with sock:
+        while True:
+            chunk = sock.recv(65536)
+            if not chunk:
+                raise ConnectionError("Демон закрыл соединение без итога")
+            buffer += chunk
+            end = buffer.find(END.encode())
+            if end < 0:
+                # Не режем многобайтовый символ на границе блока
+                text = buffer.decode(errors="ignore")
+                keep = len(buffer) - len(text.encode())
+                out.write(text)
+                buffer = buffer[len(buffer) - keep:] if keep else b""
+                continue
+            out.write(buffer[:end].decode(errors="replace"))
+            tail = buffer[end + 1:]
+            while not tail.endswith(b"\n"):
+                tail += sock.recv(65536)
+            return json.loads(tail)
+
+
+def cold(script, latency=0.0, eager=False):
+    """Холодный старт на модели: импорт krpc и скрипт в этом процессе.
+
+    eager=True - сначала все тяжелые модули, как до отложенных импортов.
+    """
+    # Импорт нарочно не используется: холодный старт включает время загрузки
+    # krpc, как у настоящего скрипта, хотя подключение дальше идет к модели
+    import krpc  # noqa: F401
+    if eager:
+        for name in ("numpy", "asyncio", "inspect", "concurrent.futures", "sqlite3"):
+            importlib.import_module(name)
+
+    watch = _Watch(stop=True)
+    os.environ.setdefault("MPLBACKEND", "Agg")
+    import runpy
+    try:
+        with _sim_environment(watch, latency):
+            runpy.run_path(script, run_name="__main__")
+    except FirstCommand:
+        pass
+    return {"exit": 0, "first_command": watch.first_command}
+
+
+def bench(script, runs=5, latency=0.002):
+    """Медиана времени от запуска процесса до первой команды.
+
+    eager - холодный старт с импортом всего сразу, cold - с отложенными
+    импортами, daemon - миссия через теплого демона.
+    """
+    import statistics
+    import subprocess
+
+    env = dict(os.environ, MPLBACKEND="Agg")
+    result = {}
+    for mode in ("eager", "cold", "daemon"):
+        times = []
+        for _ in range(runs):
+            start = _now()
+            proc = subprocess.run([sys.executable, __file__, mode, script, "--latency", str(latency)],
+                                  env=env, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+            last = proc.stdout.strip().splitlines()[-1]
+            first = json.loads(last)["first_command"]
+            if first is not None:
+                times.append(first - start)
+        result[mode] = statistics.median(times) if times else None
+    return result
+
+
+def _option(args, name, default):
+    if name in args:
+        i = args.index(name)
+        value = args[i + 1]
+        del args[i:i + 2]
+        return type(default)(value)
+    return default
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    command = args.pop(0) if args else "serve"
+    latency = _option(args, "--latency", 0.0)
+    if command == "serve":
+        Daemon(sim="--sim" in args, latency=latency).serve()
+    elif command == "run":
+        summary = submit(args[0], args[1:])
+        sys.exit(summary["exit"])
+    elif command == "daemon":
+        # Для bench: вывод миссии не нужен, только итог
+        import io
+        print(json.dumps(submit(args[0], args[1:], out=io.StringIO(), stop=True)))
+    elif command in ("cold", "eager"):
+        import io
+        import contextlib
+        with contextlib.redirect_stdout(io.StringIO()):
+            summary = cold(args[0], latency, eager=command == "eager")
+        print(json.dumps(summary))
+    elif command == "bench":
+        script = args[0]
+        daemon = None
+        if not running():
+            import subprocess
+            daemon = subprocess.Popen([sys.executable, __file__, "serve", "--sim", "--latency", str(latency or 0.002)],
+                                      stdout=subprocess.PIPE, text=True)
+            daemon.stdout.readline()  # демон готов
+        try:
+            result = bench(script, latency=latency or 0.002)
+        finally:
+            if daemon is not None:
+                daemon.terminate()
+        for mode, value in result.items():
+            print(f"{mode}: {value * 1000:.0f} мс до первой команды" if value is not None
+                  else f"{mode}: команд не было")
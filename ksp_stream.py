@@ -0,0 +1,81 @@
+import threading
+from collections import namedtuple
+
+# Поля снимка телеметрии и способ их получения:
+# (имя, источник, атрибут), источник - 'sc', 'flight', 'orbit', 'vessel' или 'control'
+FIELDS = [
+    ("ut", "sc", "ut"),
+    ("altitude", "flight", "mean_altitude"),
+    ("speed", "flight", "speed"),
+    ("pitch", "flight", "pitch"),
+    ("apoapsis", "orbit", "apoapsis_altitude"),
+    ("periapsis", "orbit", "periapsis_altitude"),
+    ("mass", "vessel", "mass"),
+    ("throttle", "control", "throttle"),
+]
+
+
+class TelemetryStream:
+    """Источник телеметрии на потоках kRPC.
+
+    Все значения подписываются один раз при создании (conn.add_stream),
+    дальше сервер сам присылает обновления, а snapshot() отдает последний
+    согласованный снимок без единого синхронного RPC.
+    """
+
+    def __init__(self, conn, vessel, reference_frame=None, extra=None):
+        self.conn = conn
+        self.vessel = vessel
+        if reference_frame is None:
+            flight = vessel.flight()
+        else:
+            flight = vessel.flight(reference_frame)
+        sources = {
+            "sc": conn.space_center,
+            "flight": flight,
+            "orbit": vessel.orbit,
+            "vessel": vessel,
+            "control": vessel.control,
+        }
+
+        self.streams = []
+        names = []
+        for name, source, attr in FIELDS:
+            self.streams.append(conn.add_stream(getattr, sources[source], attr))
+            names.append(name)
+        # Дополнительные поля: {"fuel": (vessel.resources.amount, "LiquidFuel")}
+        for name, call in (extra or {}).items():
+            self.streams.append(conn.add_stream(*call))
+            names.append(name)
+
+        self.Snapshot = namedtuple("Snapshot", names)
+        self._lock = threading.Lock()
+        self._last = None
+        self._update()
+        # Снимок собирается после обработки всего сообщения с обновлениями,
+        # поэтому все поля в нем относятся к одному моменту времени
+        conn.add_stream_update_callback(self._update)
+
+    def _update(self):
+        snap = self.Snapshot(*[stream() for stream in self.streams])
+        with self._lock:
+            self._last = snap
+
+    def snapshot(self):
+        """Возвращает последний снимок телеметрии."""
+        with self._lock:
+            return self._last
+
+    def close(self):
+        """Отписывается от всех потоков."""
+        self.conn.remove_stream_update_callback(self._update)
+        for stream in self.streams:
+            stream.remove()
+        self.streams = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
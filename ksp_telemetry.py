@@ -0,0 +1,117 @@
+"""Буфер телеметрии с фиксированной схемой.
+
+Вместо словаря списков - заранее выделенный структурированный массив NumPy
+(8 байт на поле на отсчет). Когда блок заполняется, он дописывается в файл
+на диске, так что память остается ограниченной размером блока, а после
+полета файл читается через np.memmap без копирования:
+
+    data = open_telemetry("flight.tlm")
+    data["altitude"].max()
+"""
+import json
+import os
+import tempfile
+
+from ksp_startup import lazy
+
+np = lazy("numpy")  # импорт NumPy - при первом отсчете, не при старте скрипта
+
+CHUNK = 4096  # отсчетов в одном блоке
+
+
+def _dtype(fields):
+    return np.dtype([(name, np.float64) for name in fields])
+
+
+class TelemetryBuffer:
+    """Телеметрия с колонками fields и сбросом заполненных блоков в файл path.
+
+    resume - число отсчетов, с которого продолжается уже записанный файл
+    (курсор из контрольной точки ksp_checkpoint); хвост за ним отбрасывается.
+    """
+
+    def __init__(self, fields, path=None, chunk=CHUNK, resume=None):
+        self.fields = list(fields)
+        if path is None:
+            fd, path = tempfile.mkstemp(suffix=".tlm")
+            os.close(fd)
+        self.path = path
+        self.size = chunk
+        self.dtype = self.chunk = None  # выделяются при первом отсчете
+        self.count = 0  # отсчетов в текущем блоке
+        self.spilled = 0  # отсчетов уже в файле
+        if resume is not None and os.path.exists(path):
+            row = 8 * len(self.fields)
+            self.spilled = min(int(resume), os.path.getsize(path) // row)
+            self._file = open(path, "r+b")
+            self._file.truncate(self.spilled * row)
+            self._file.seek(0, os.SEEK_END)
+        else:
+            self._file = open(path, "wb")
+        with open(path + ".json", "w") as f:
+            json.dump({"fields": self.fields}, f)
+
+    def __len__(self):
+        return self.spilled + self.count
+
+    def append(self, *values):
+        """Добавляет отсчет; значения в порядке fields."""
+        if self.chunk is None:
+            self._allocate()
+        self.chunk[self.count] = values
+        self.count += 1
+        if self.count == len(self.chunk):
+            self.spill()
+
+    def _allocate(self):
+        self.dtype = _dtype(self.fields)
+        self.chunk = np.zeros(self.size, dtype=self.dtype)
+
+    def spill(self):
+        """Дописывает текущий блок в файл."""
+        if self.count:
+            self._file.write(self.chunk[:self.count].tobytes())
+            self._file.flush()
+            self.spilled += self.count
+            self.count = 0
+
+    def data(self):
+        """Вся телеметрия как структурированный массив.
+
+        Пока ничего не сброшено - представление текущего блока, иначе
+        файл, отображенный в память, плюс хвост из текущего блока.
+        """
+        if self.chunk is None:
+            self._allocate()
+        if not self.spilled:
+            return self.chunk[:self.count]
+        if not self._file.closed:
+            self._file.flush()
+        disk = np.memmap(self.path, dtype=self.dtype, mode="r", shape=(self.spilled,))
+        if not self.count:
+            return disk
+        return np.concatenate([disk, self.chunk[:self.count]])
+
+    def __getitem__(self, name):
+        return self.data()[name]
+
+    def close(self):
+        """Сбрасывает остаток на диск и закрывает файл."""
+        self.spill()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def open_telemetry(path):
+    """Открывает записанную телеметрию через np.memmap (без копирования)."""
+    with open(path + ".json") as f:
+        fields = json.load(f)["fields"]
+    dtype = _dtype(fields)
+    if os.path.getsize(path) == 0:
+        return np.zeros(0, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode="r")
@@ -0,0 +1,218 @@
+"""Ускорение времени на участках без активного управления.
+
+Пассивные участки (баллистический полет до апоцентра, работа спутника на
+орбите) на 1x занимают столько же реального времени, сколько модельного.
+WarpManager на каждом такте выбирает наибольший безопасный множитель до
+ближайшего события (UT) и снимает ускорение заранее:
+
+    - rails-ускорение только вне атмосферы и без тяги, не выше
+      maximum_rails_warp_factor (ограничение игры по высоте);
+    - в атмосфере или с включенным двигателем - physics-ускорение, если
+      разрешено (powered=True для полета с тягой);
+    - множитель выбирается так, чтобы до события оставалось не меньше
+      lead секунд реального времени, и за margin секунд UT до события
+      ускорение уже снято.
+
+Все условия читаются из потоков, запись множителя - только при изменении.
+Поскольку ускорение меняет связь UT и реального времени, события и сроки
+в скриптах задаются по space_center.ut, а не по time.time().
+
+    warp = WarpManager(conn, vessel)
+    while ut < event_ut:
+        warp.update(ut, event_ut)
+        ...
+    warp.stop()
+
+Множитель в KSP один на всю игру. Когда кораблей несколько (ksp_fleet),
+их WarpManager не пишут его сами, а голосуют в общем FleetWarp: ставится
+наибольшее ускорение, безопасное для всех кораблей сразу, и любой корабль
+под активным управлением держит 1x:
+
+    shared = FleetWarp(conn)
+    warp = WarpManager(conn, vessel, shared=shared)
+    ...
+    warp.close()  # миссия закончена - корабль больше не голосует
+"""
+import threading
+
+# Множители ускорения времени KSP по номеру (rails_warp_factor, physics_warp_factor)
+RAILS_RATES = (1, 5, 10, 50, 100, 1000, 10000, 100000)
+PHYSICS_RATES = (1, 2, 3, 4)
+LEAD = 2.0  # секунд реального времени до события на текущем множителе
+MARGIN = 5.0  # секунд UT до события, когда ускорение уже снято
+
+
+class WarpManager:
+    """Выбор и установка ускорения времени до ближайшего события."""
+
+    def __init__(self, conn, vessel, lead=LEAD, margin=MARGIN,
+                 max_rails=len(RAILS_RATES) - 1, max_physics=2, powered=False, shared=None):
+        self.space_center = conn.space_center
+        self.shared = shared
+        body = vessel.orbit.body
+        self.atmosphere = body.atmosphere_depth if body.has_atmosphere else 0.0
+        self.lead = lead
+        self.margin = margin
+        self.max_rails = max_rails
+        self.max_physics = max_physics
+        self.powered = powered
+        flight = vessel.flight(body.reference_frame)
+        self._altitude = conn.add_stream(getattr, flight, "mean_altitude")
+        self._thrust = conn.add_stream(getattr, vessel, "thrust")
+        self._allowed = conn.add_stream(getattr, self.space_center, "maximum_rails_warp_factor")
+        # Игра сама сбрасывает ускорение (вход в атмосферу, включение
+        # двигателя), поэтому текущие множители тоже читаем из потоков
+        self._rails = conn.add_stream(getattr, self.space_center, "rails_warp_factor")
+        self._physics = conn.add_stream(getattr, self.space_center, "physics_warp_factor")
+        self.rails = 0
+        self.physics = 0
+        self.writes = 0
+        if shared is not None:
+            shared.join(self)
+
+    @property
+    def rate(self):
+        return RAILS_RATES[self.rails] * PHYSICS_RATES[self.physics]
+
+    def mode(self):
+        """"rails", "physics" или None - какое ускорение сейчас безопасно."""
+        thrusting = self._thrust() > 0
+        if not thrusting and self._altitude() >= self.atmosphere:
+            return "rails"
+        if thrusting and not self.powered:
+            return None
+        return "physics"
+
+    def factors(self, ut, until):
+        """(rails, physics) для момента ut при событии в until."""
+        remaining = until - self.margin - ut
+        if remaining <= 0:
+            return 0, 0
+        mode = self.mode()
+        if mode == "rails":
+            limit = min(self.max_rails, self._allowed())
+            for factor in range(limit, 0, -1):
+                if RAILS_RATES[factor] * self.lead <= remaining:
+                    return factor, 0
+        elif mode == "physics":
+            for factor in range(self.max_physics, 0, -1):
+                if PHYSICS_RATES[factor] * self.lead <= remaining:
+                    return 0, factor
+        return 0, 0
+
+    def update(self, ut, until):
+        """Ставит ускорение для события в until (UT); возвращает множитель."""
+        self.rails, self.physics = self._rails(), self._physics()
+        self._set(*self.factors(ut, until))
+        return self.rate
+
+    def _set(self, rails, physics):
+        if self.shared is not None:
+            # Общий множитель: только голос, пишет FleetWarp
+            self.rails, self.physics = self.shared.vote(self, rails, physics)
+            return
+        self.writes += _switch(self.space_center, (self.rails, self.physics), (rails, physics))
+        self.rails, self.physics = rails, physics
+
+    def stop(self):
+        """Возвращает 1x (в общем ускорении - голос за 1x)."""
+        self._set(0, 0)
+
+    def close(self):
+        """Конец управления: 1x, а в общем ускорении корабль больше не голосует."""
+        if self.shared is not None:
+            self.shared.leave(self)
+        else:
+            self.stop()
+
+    def detach(self):
+        """Подключение потеряно: снимает потоки, в игру ничего не пишет;
+        в общем ускорении корабль больше не голосует."""
+        if self.shared is not None:
+            self.shared.leave(self)
+        for stream in (self._altitude, self._thrust, self._allowed, self._rails, self._physics):
+            stream.remove()
+
+    def warp_to(self, ut):
+        """Блокирующее ускорение до ut - margin средствами игры."""
+        self.stop()
+        self.space_center.warp_to(ut - self.margin,
+                                  max_rails_rate=RAILS_RATES[self.max_rails],
+                                  max_physics_rate=PHYSICS_RATES[self.max_physics])
+
+
+def _switch(space_center, current, target):
+    # Сначала снимаем действующий вид ускорения, потом включаем другой;
+    # возвращает число записей
+    (rails, physics), (new_rails, new_physics) = current, target
+    writes = 0
+    if new_rails != rails and physics and new_physics != physics:
+        space_center.physics_warp_factor = 0
+        physics = 0
+        writes += 1
+    if new_rails != rails:
+        space_center.rails_warp_factor = new_rails
+        writes += 1
+    if new_physics != physics:
+        space_center.physics_warp_factor = new_physics
+        writes += 1
+    return writes
+
+
+def combine(votes):
+    """(rails, physics), безопасные для всех голосов (rails, physics)."""
+    votes = list(votes)
+    if not votes or (0, 0) in votes:
+        return 0, 0
+    if all(rails for rails, _ in votes):
+        return min(rails for rails, _ in votes), 0
+    # Кому-то можно только physics: rails-голосам он тоже безопасен -
+    # до их события не меньше RAILS_RATES[1] * lead, это больше любого PHYSICS_RATES
+    return 0, min(physics for _, physics in votes if physics)
+
+
+class FleetWarp:
+    """Одно ускорение времени на несколько кораблей.
+
+    Корабли голосуют через WarpManager(shared=...); ставится combine()
+    всех голосов. Голоса приходят из тактов разных кораблей, в том числе
+    из потоков пула, поэтому запись - под замком.
+    """
+
+    def __init__(self, conn):
+        self.space_center = conn.space_center
+        self._rails = conn.add_stream(getattr, self.space_center, "rails_warp_factor")
+        self._physics = conn.add_stream(getattr, self.space_center, "physics_warp_factor")
+        self.votes = {}
+        self.rails = 0
+        self.physics = 0
+        self.writes = 0
+        self._lock = threading.Lock()
+
+    @property
+    def rate(self):
+        return RAILS_RATES[self.rails] * PHYSICS_RATES[self.physics]
+
+    def join(self, member):
+        with self._lock:
+            self.votes[member] = (0, 0)
+            self._apply()
+
+    def leave(self, member):
+        with self._lock:
+            self.votes.pop(member, None)
+            self._apply()
+
+    def vote(self, member, rails, physics):
+        """Голос корабля; возвращает действующие (rails, physics)."""
+        with self._lock:
+            self.votes[member] = (rails, physics)
+            self._apply()
+            return self.rails, self.physics
+
+    def _apply(self):
+        # Без голосов (все миссии закончены) - 1x; игра могла сбросить множитель сама
+        self.rails, self.physics = self._rails(), self._physics()
+        rails, physics = combine(self.votes.values())
+        self.writes += _switch(self.space_center, (self.rails, self.physics), (rails, physics))
+        self.rails, self.physics = rails, physics
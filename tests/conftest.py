@@ -0,0 +1,25 @@
+import copy
+import os
+import sys
+
+import pytest
+
+# Модули лежат в корне репозитория, без пакета
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import ksp_sim  # noqa: E402
+
+
+@pytest.fixture
+def sim():
+    """Модель с запущенной первой ступенью на полном газу."""
+    sim = ksp_sim.Simulator(copy.deepcopy(ksp_sim.ROCKET))
+    sim.activate_next_stage()
+    sim.throttle = 1.0
+    return sim
+
+
+@pytest.fixture
+def conn(sim):
+    """Подключение к модели: считает RPC (rpc_count), потоки - без RPC."""
+    return ksp_sim.connect(sim=sim)
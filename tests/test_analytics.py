@@ -0,0 +1,34 @@
+import numpy as np
+import pytest
+
+from ksp_analytics import _integral, channels
+
+
+def _grid():
+    # Неравномерные такты: от 0.01 до 2 с
+    rng = np.random.default_rng(1)
+    return np.r_[0.0, np.cumsum(rng.uniform(0.01, 2.0, 200))]
+
+
+def test_integral_on_uneven_grid():
+    t = _grid()
+    # Трапеции точны для линейной функции при любом шаге
+    assert _integral(2.0 * t + 1.0, t) == pytest.approx(t ** 2 + t, rel=1e-12, abs=1e-9)
+    # Плавная функция - с ошибкой порядка шага в квадрате
+    decay = np.exp(-t / 100.0)
+    assert _integral(decay, t) == pytest.approx(100.0 * (1.0 - decay), rel=1e-3)
+
+
+def test_channels_derivatives_on_uneven_grid():
+    t = _grid()
+    v = 3.0 * t ** 2 + 10.0
+    h = 0.5 * t ** 2
+    # Повтор снимка и откат времени отбрасываются
+    data = {"time": np.r_[t[:50], t[49], t[30], t[50:]],
+            "altitude": np.r_[h[:50], 0.0, 0.0, h[50:]],
+            "speed": np.r_[v[:50], 0.0, 0.0, v[50:]]}
+    ch = channels(data)
+    assert np.array_equal(ch["time"], t)
+    # np.gradient второго порядка точен для квадратичных функций внутри сетки
+    assert ch["acceleration"][1:-1] == pytest.approx(6.0 * t[1:-1], rel=1e-9)
+    assert ch["climb"][1:-1] == pytest.approx(t[1:-1], rel=1e-9)
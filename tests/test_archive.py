@@ -0,0 +1,43 @@
+import asyncio
+
+import pytest
+
+from ksp_archive import Archive
+from ksp_mission import Mission
+
+
+def _fly(conn, archive, profile):
+    mission = Mission(profile, conn=conn)
+    report = asyncio.run(mission.run_async())
+    assert report["phase"] == "done"
+    (run,) = archive.query(name=profile["id"])
+    return run
+
+
+@pytest.fixture
+def archive(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("KSP_ARCHIVE", str(tmp_path / "flights"))
+    archive = Archive(str(tmp_path / "flights"))
+    yield archive
+    archive.close()
+
+
+def _profile(**extra):
+    return dict({"id": "hold", "name": "Hold", "max_duration": 60,
+                 "telemetry": {"columns": {"time": "ut", "altitude": "altitude", "speed": "speed"}},
+                 "phases": [{"name": "hold", "guidance": {"law": "hold"},
+                             "until": {"duration": 5}, "then": ["stage"]}]}, **extra)
+
+
+def test_flight_archives_fuel_remaining(sim, conn, archive):
+    run = _fly(conn, archive, _profile())
+    # Без поля fuel остаток читается с сервера после полета
+    assert run["fuel_remaining"] is not None
+    assert run["fuel_remaining"] == pytest.approx(sim.resource_amount("LiquidFuel"))
+    assert run["stages"] == 1 and run["max_q"] > 0
+
+
+def test_fuel_field_is_archived(sim, conn, archive):
+    run = _fly(conn, archive, _profile(resources={"fuel": "LiquidFuel"}))
+    assert run["fuel_remaining"] == pytest.approx(sim.resource_amount("LiquidFuel"))
@@ -0,0 +1,49 @@
+import math
+from collections import namedtuple
+
+from ksp_broadcast import Ring, RingReader
+
+Snapshot = namedtuple("Snapshot", ["ut", "altitude", "fuel"])
+
+
+def _publish(ring, start, stop):
+    for i in range(start, stop):
+        ring.publish(Snapshot(float(i), 10.0 * i, None))
+
+
+def test_ring_round_trip_and_lapped_reader(tmp_path):
+    path = str(tmp_path / "f.ring")
+    ring = Ring("f", slots=8, path=path)
+    _publish(ring, 0, 5)
+    reader = RingReader(path=path)
+    assert reader.fields == ["ut", "altitude", "fuel"]
+    frames = reader.read()
+    assert frames["ut"].tolist() == [0.0, 1.0, 2.0, 3.0, 4.0]
+    assert frames["altitude"].tolist() == [0.0, 10.0, 20.0, 30.0, 40.0]
+    assert all(math.isnan(v) for v in frames["fuel"]) and reader.lost == 0
+    # Писатель обогнал читателя на круг: старые кадры потеряны, не перепутаны
+    _publish(ring, 5, 25)
+    frames = reader.read()
+    assert frames["ut"].tolist() == [float(i) for i in range(18, 25)]
+    assert reader.lost == 13 and reader.cursor == 25
+    assert len(reader.read()) == 0
+    ring.close()
+    reader.read()
+    assert reader.done
+    reader.close()
+
+
+def test_reader_follows_new_flight(tmp_path):
+    path = str(tmp_path / "f.ring")
+    ring = Ring("f", slots=8, path=path)
+    _publish(ring, 0, 3)
+    ring.close()
+    reader = RingReader(path=path)
+    assert len(reader.read()) == 3
+    # Новый полет заменяет файл: читатель начинает его с первого кадра
+    ring = Ring("f", slots=8, path=path)
+    _publish(ring, 100, 102)
+    assert reader.read()["ut"].tolist() == [100.0, 101.0]
+    assert reader.lost == 0 and not reader.done
+    ring.close()
+    reader.close()
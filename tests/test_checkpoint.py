@@ -0,0 +1,66 @@
+import copy
+import math
+import os
+
+import pytest
+
+import ksp_sim
+from ksp_checkpoint import Checkpoint, check_resume, drop_at
+from ksp_mission import Mission
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_save_load_round_trip(tmp_path):
+    path = str(tmp_path / "m.ckpt")
+    checkpoint = Checkpoint(path, {"phase": "q", "start": "d", "staging": "3d"})
+    assert checkpoint.load() is None
+    checkpoint.save(10.0, phase=2, start=None, staging=[1.5, 7.0])
+    checkpoint.close()
+
+    state = Checkpoint(path, {"phase": "q", "start": "d", "staging": "3d"}).load()
+    assert state == {"ut": 10.0, "phase": 2, "start": None, "staging": [1.5, 7.0]}
+
+
+def test_list_longer_than_format_fails(tmp_path):
+    checkpoint = Checkpoint(str(tmp_path / "m.ckpt"), {"staging": "2d"})
+    with pytest.raises(ValueError):
+        checkpoint.save(1.0, staging=[1.0, 2.0, 3.0])
+
+
+def test_single_value_list(tmp_path):
+    # "1d" - тоже список, а не число
+    checkpoint = Checkpoint(str(tmp_path / "m.ckpt"), {"staging": "1d"})
+    checkpoint.save(1.0, staging=[4.0])
+    assert checkpoint.load()["staging"] == [4.0]
+
+
+# Оба профиля сами запускают первую ступень на столе ("ignite")
+@pytest.mark.parametrize("script, ut", [("kpkp.py", 150.0), ("ksppp.py", 60.0)])
+def test_resume_after_drop_matches(tmp_path, monkeypatch, script, ut):
+    monkeypatch.chdir(tmp_path)
+    results = check_resume(os.path.join(ROOT, script), ut)
+    for _, apoapsis, periapsis, _, _ in results.values():
+        assert math.isfinite(apoapsis) and math.isfinite(periapsis)
+    assert not list(tmp_path.glob("*.ckpt"))  # Полет завершен - точка удалена
+
+
+def test_reconnect_releases_old_streams(tmp_path, monkeypatch, capsys):
+    monkeypatch.chdir(tmp_path)
+    sim = ksp_sim.Simulator(copy.deepcopy(ksp_sim.ROCKET))
+    profile = {"name": "Hold", "max_duration": 30, "phases": [
+        {"name": "hold", "guidance": {"law": "hold"}, "until": {"duration": 10}}]}
+    with ksp_sim.install(sim) as env:
+        drop_at(env, 5.0)
+        mission = Mission(profile)
+        first = mission.tel
+        report = mission.run()
+    assert len(env.connections) == 2
+    assert report["phase"] == "done"
+    assert mission.tel is not first
+    assert first.streams == []
+    # Сообщения о связи - в журнал миссии, а не мимо него в stderr
+    out, err = capsys.readouterr()
+    assert "Связь потеряна" in out and "Связь потеряна" not in err
+    assert ("Подключение восстановлено (попытка 1)" in
+            [text for _, _, text in mission.log])
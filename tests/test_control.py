@@ -0,0 +1,38 @@
+from ksp_control import ControlOutputs
+
+
+def test_deadband_skips_small_changes(sim, conn):
+    outputs = ControlOutputs(conn.space_center.active_vessel)
+    outputs.set_pitch_heading(45.0, 90.0)
+    assert outputs.flush() == 1
+    outputs.set_pitch_heading(45.05, 90.0)  # Меньше зоны 0.1 градуса
+    assert outputs.flush() == 0
+    outputs.set_pitch_heading(45.2, 90.0)
+    assert outputs.flush() == 1
+    assert conn.rpc_counts["AutoPilot.target_pitch_and_heading"] == 2
+    assert sim.target_pitch == 45.2
+
+
+def test_last_value_of_tick_wins(sim, conn):
+    outputs = ControlOutputs(conn.space_center.active_vessel)
+    for throttle in (0.2, 0.5, 0.7):
+        outputs.set_throttle(throttle)
+    assert outputs.flush() == 1
+    assert sim.throttle == 0.7
+    outputs.set_throttle(0.003)
+    assert outputs.flush() == 1
+    # Выключение уходит точно, хотя разница меньше зоны 0.005
+    outputs.set_throttle(0.0)
+    assert outputs.flush() == 1 and sim.throttle == 0.0
+    assert outputs.stats() == {"requested": 5, "sent": 3, "saved": 2}
+
+
+def test_rebind_resends_last_commands(sim, conn):
+    outputs = ControlOutputs(conn.space_center.active_vessel)
+    outputs.engage()
+    outputs.set_throttle(0.6)
+    outputs.flush()
+    sim.throttle = 0.0  # Сервер отпустил управление вместе с клиентом
+    outputs.rebind(conn.space_center.active_vessel)
+    assert outputs.flush() == 2
+    assert sim.throttle == 0.6
@@ -0,0 +1,42 @@
+import os
+import shutil
+
+import numpy as np
+import pytest
+
+from ksp_dispersion import sweep
+
+PROFILE = {"turn_start": 1000.0, "turn_end": 50000.0, "shape": 1.0}
+
+
+def _sorted(data):
+    # Пакеты дописываются в порядке готовности: сравниваем по номеру пакета
+    return np.sort(np.asarray(data), order="chunk", kind="stable")
+
+
+def test_truncated_sweep_resumes_to_same_results(tmp_path):
+    full = str(tmp_path / "full.tlm")
+    part = str(tmp_path / "part.tlm")
+    kwargs = dict(profile=PROFILE, chunk_size=100, workers=2, dt=0.5)
+    expected = _sorted(sweep(full, 300, **kwargs))
+    # Прерванный прогон: полтора пакета на диске, второй дописан не до конца
+    shutil.copy(full, part)
+    shutil.copy(full + ".json", part + ".json")
+    row = 8 * len(expected.dtype.names)
+    with open(part, "r+b") as f:
+        f.truncate(150 * row)
+    resumed = sweep(part, 300, **kwargs)
+    assert os.path.getsize(part) == os.path.getsize(full)
+    assert np.array_equal(_sorted(resumed), expected)
+
+
+def test_other_run_parameters_are_rejected(tmp_path):
+    path = str(tmp_path / "d.tlm")
+    sweep(path, 100, profile=PROFILE, chunk_size=100, workers=1, dt=0.5)
+    with pytest.raises(ValueError):
+        sweep(path, 100, profile=PROFILE, chunk_size=100, workers=1, dt=0.5, seed=1)
+
+
+def test_unknown_vehicle_is_named(tmp_path):
+    with pytest.raises(ValueError, match="Неизвестная ракета 'falcon'"):
+        sweep(str(tmp_path / "d.tlm"), 100, vehicle="falcon", profile=PROFILE)
@@ -0,0 +1,44 @@
+import asyncio
+
+from ksp_events import Triggers
+from ksp_mission import Mission
+
+
+def test_trigger_fires_once_on_crossing(sim, conn):
+    vessel = conn.space_center.active_vessel
+    trigger = Triggers(conn).altitude_above(vessel, 1000.0)
+    calls = []
+    trigger.on(lambda: calls.append(sim.ut))
+    while sim.altitude() < 2000.0:
+        sim.advance(0.1)
+    assert trigger.fired()
+    assert len(calls) == 1
+
+
+def test_all_needs_every_condition(sim, conn):
+    vessel = conn.space_center.active_vessel
+    triggers = Triggers(conn)
+    later = sim.ut + 60.0
+    both = triggers.all(triggers.altitude_above(vessel, 1000.0), triggers.ut_after(later))
+    while sim.altitude() < 2000.0:
+        sim.advance(0.1)
+    assert sim.ut < later and not both.fired()
+    sim.advance(later - sim.ut)
+    assert both.fired()
+
+
+def test_mission_conditions_are_server_events(sim, conn, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    profile = {"name": "Climb", "max_duration": 600, "phases": [
+        {"name": "climb", "guidance": {"law": "hold"}, "until": {"altitude_above": 5000},
+         "then": [{"print": "5 км"}]},
+        {"name": "coast", "until": {"duration": 5}},
+    ]}
+    mission = Mission(profile, conn=conn)
+    report = asyncio.run(mission.run_async())
+    assert report["phase"] == "done"
+    # Одно событие на условие фазы; такт условия не считает
+    assert conn.rpc_counts["KRPC.AddEvent"] == 2
+    (ut, phase, text), = mission.log
+    assert (phase, text) == ("climb", "5 км")
+    assert sim.ut - ut >= 5.0
@@ -0,0 +1,73 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+import ksp_sim
+from ksp_guidance import AscentGuidance, peg_law, peg_solve, stages_from_vessel, _fly
+from ksp_mission import Mission
+from ksp_physics import KERBIN, ROCKET, g0
+
+MU, R = KERBIN["mu"], KERBIN["radius"]
+
+
+def test_stages_from_vessel_match_rocket(conn):
+    stages = stages_from_vessel(conn.space_center.active_vessel)
+    assert len(stages) == len(ROCKET["stages"])
+    for stage, spec in zip(stages, ROCKET["stages"]):
+        assert stage["thrust"] == spec["thrust"] and stage["isp"] == spec["isp"]
+        assert stage["fuel_mass"] == spec["fuel_mass"]
+    # Полезная нагрузка - в сухой массе верхней ступени
+    assert stages[-1]["dry_mass"] == ROCKET["stages"][-1]["dry_mass"] + ROCKET["payload"]
+
+
+def test_peg_solve_batch_matches_single():
+    r = R + np.array([40000.0, 55000.0, 70000.0])
+    rdot = np.array([700.0, 500.0, 300.0])
+    vtheta = np.array([1000.0, 1500.0, 2000.0])
+    lower = [(30.0, 300 * g0, 20.0)]
+    final = (15.0, 345 * g0)
+    batch = peg_solve(r, rdot, vtheta, R + 80000.0, MU, lower, final, 100.0, iterations=10)
+    for i in range(3):
+        single = peg_solve(r[i], rdot[i], vtheta[i], R + 80000.0, MU, lower, final, 100.0, iterations=10)
+        for b, s in zip(batch, single):
+            assert b[i] == pytest.approx(float(s), rel=1e-12)
+
+
+def test_peg_reaches_target_orbit():
+    guidance = AscentGuidance(MU, R, 80000.0, ROCKET["stages"], turn_start=250, turn_end=45000)
+    fuel, apoapsis, periapsis = _fly(ksp_sim.Simulator(), peg_law(guidance))
+    assert fuel is not None and guidance.done
+    assert apoapsis == pytest.approx(80000.0, abs=2000.0)
+    assert periapsis == pytest.approx(80000.0, abs=2000.0)
+
+
+def _peg_profile(done):
+    return {"name": "PEG", "max_duration": 600, "setup": [{"engage": True}],
+            "peg": {"target": 90000, "turn_start": 250},
+            "phases": [{"name": "ascent", "guidance": {"law": "peg"},
+                        "events": [{"when": {"thrust_below": 1}, "do": ["stage"]}],
+                        "until": {"peg_done": done}}]}
+
+
+def test_mission_peg_cuts_engine_on_target(sim, conn, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    mission = Mission(_peg_profile(True), conn=conn)
+    report = asyncio.run(mission.run_async())
+    assert report["phase"] == "done"
+    assert sim.throttle == 0.0
+    apoapsis, periapsis = sim.apsides()
+    assert apoapsis == pytest.approx(90000.0, abs=5000.0)
+    assert periapsis == pytest.approx(90000.0, abs=5000.0)
+    assert any(text.startswith("PEG: выключение двигателя") for _, _, text in mission.log)
+
+
+def test_peg_done_checks_orbit_tolerance(sim, conn, tmp_path, monkeypatch):
+    # Двигатель выключен, но орбита не в допуске 1 м: фаза не кончается
+    monkeypatch.chdir(tmp_path)
+    profile = _peg_profile(1.0)
+    profile["max_duration"] = 200
+    mission = Mission(profile, conn=conn)
+    report = asyncio.run(mission.run_async())
+    assert report["phase"] == "ascent"
+    assert mission.peg_throttle == 0.0 and sim.throttle == 0.0
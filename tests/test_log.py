@@ -0,0 +1,28 @@
+import io
+
+from ksp_log import StatusLog
+
+
+def test_console_keeps_order_and_latest_status(tmp_path):
+    console = io.StringIO()
+    path = str(tmp_path / "f.log")
+    # Фоновый поток выводит только при закрытии: все записи - одной пачкой
+    with StatusLog(path=path, console_rate=0.01, stream=console) as log:
+        log.status("h {:.0f}", 1.0)
+        log.status("h {:.0f}", 2.0)
+        log.event("Отделение")
+        log.status("h {:.0f}", 3.0)
+    assert console.getvalue().splitlines() == ["h 2", "Отделение", "h 3"]
+    with open(path, encoding="utf-8") as f:
+        lines = [line.split("\t")[1] for line in f.read().splitlines()]
+    assert lines == ["h 1", "h 2", "Отделение", "h 3"]
+
+
+def test_full_queue_drops_only_status(tmp_path):
+    console = io.StringIO()
+    with StatusLog(console_rate=0.01, maxlen=2, stream=console) as log:
+        for i in range(5):
+            log.status("h {}", i)
+        log.event("Орбита")
+    assert log.dropped == 3
+    assert console.getvalue().splitlines() == ["h 1", "Орбита"]
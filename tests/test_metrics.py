@@ -0,0 +1,18 @@
+import asyncio
+
+from ksp_mission import Mission
+
+
+def test_guidance_tick_sections(conn, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("KSP_METRICS", str(tmp_path / "metrics"))
+    profile = {"name": "Hold", "max_duration": 60, "checkpoint": True, "phases": [
+        {"name": "hold", "guidance": {"law": "hold"}, "until": {"duration": 5}}]}
+    mission = Mission(profile, conn=conn)
+    asyncio.run(mission.run_async())
+    sections = mission.metrics.summary()["sections"]
+    # Расчет, отправка команд и запись точки замеряются порознь
+    assert {"guidance", "flush", "checkpoint"} <= set(sections)
+    assert sections["flush"]["count"] == sections["guidance"]["count"]
+    # После последней фазы точка не пишется
+    assert sections["checkpoint"]["count"] == sections["guidance"]["count"] - 1
@@ -0,0 +1,42 @@
+import pytest
+
+from ksp_multicall import Batch, benchmark
+
+
+def _state(conn):
+    vessel = conn.space_center.active_vessel
+    flight = vessel.flight()
+    state = Batch(conn)
+    state.add("altitude", getattr, flight, "mean_altitude")
+    state.add("speed", getattr, flight, "speed")
+    state.add("apoapsis", getattr, vessel.orbit, "apoapsis_altitude")
+    state.add("mass", getattr, vessel, "mass")
+    state.add("fuel", vessel.resources.amount, "LiquidFuel")
+    return state, vessel, flight
+
+
+def test_read_is_one_rpc(sim, conn):
+    state, _, _ = _state(conn)
+    before = conn.rpc_count
+    for _ in range(10):
+        sim.advance(0.1)
+        state.read()
+    assert conn.rpc_count - before == 10
+
+
+def test_read_matches_serial_getters(sim, conn):
+    state, vessel, flight = _state(conn)
+    sim.advance(3.0)
+    s = state.read()
+    assert s.altitude == pytest.approx(flight.mean_altitude)
+    assert s.speed == pytest.approx(flight.speed)
+    assert s.apoapsis == pytest.approx(vessel.orbit.apoapsis_altitude)
+    assert s.mass == pytest.approx(vessel.mass)
+    assert s.fuel == pytest.approx(vessel.resources.amount("LiquidFuel"))
+
+
+def test_batch_beats_serial_under_latency():
+    # Пять значений: пять задержек подряд против одной.
+    # Задержка 10 мс много больше погрешности sleep, иначе тест зависит от нагрузки
+    serial, batched = benchmark(latency=0.01, ticks=5)
+    assert batched * 3 < serial
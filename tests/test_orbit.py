@@ -0,0 +1,58 @@
+import math
+
+import numpy as np
+import pytest
+
+import ksp_batch
+import ksp_orbit
+import ksp_sim
+from ksp_physics import KERBIN
+
+MU, R = KERBIN["mu"], KERBIN["radius"]
+
+
+def _state(altitude, speed, flight_path=0.0):
+    # Вектор состояния в плоскости экватора: угол траектории к горизонту в градусах
+    r = R + altitude
+    gamma = math.radians(flight_path)
+    return (0.0, r, 0.0), (speed * math.cos(gamma), speed * math.sin(gamma), 0.0)
+
+
+def _all_apsides(r, v):
+    # Одно и то же правило в трех модулях
+    sim = ksp_sim.Simulator()
+    sim.x, sim.y, sim.vx, sim.vy = r[0], r[1], v[0], v[1]
+    batch = ksp_batch.apsides(np.array([r[0]]), np.array([r[1]]),
+                              np.array([v[0]]), np.array([v[1]]), MU, R)
+    return [ksp_orbit.apsides(r, v, MU, R), sim.apsides(), (batch[0][0], batch[1][0])]
+
+
+def test_circular_orbit():
+    r, v = _state(200000.0, math.sqrt(MU / (R + 200000.0)))
+    for ap, pe in _all_apsides(r, v):
+        assert ap == pytest.approx(200000.0, abs=1.0)
+        assert pe == pytest.approx(200000.0, abs=1.0)
+
+
+def test_hyperbolic_periapsis_is_finite():
+    # Горизонтальная скорость выше второй космической: перицентр - текущая высота
+    altitude = 300000.0
+    escape = math.sqrt(2 * MU / (R + altitude))
+    r, v = _state(altitude, 1.2 * escape)
+    for ap, pe in _all_apsides(r, v):
+        assert ap == math.inf
+        assert pe == pytest.approx(altitude, abs=1.0)
+
+
+def test_hyperbolic_periapsis_below_current_altitude():
+    # На подъеме по гиперболе перицентр ниже корабля, но не -R и не inf
+    altitude = 500000.0
+    escape = math.sqrt(2 * MU / (R + altitude))
+    r, v = _state(altitude, 1.5 * escape, flight_path=30.0)
+    h2 = ((R + altitude) * v[0]) ** 2
+    e = math.sqrt(1 + 2 * (v[0] ** 2 + v[1] ** 2 - 2 * MU / (R + altitude)) / 2 * h2 / MU ** 2)
+    expected = h2 / (MU * (1 + e)) - R
+    assert 0.0 < expected < altitude
+    for ap, pe in _all_apsides(r, v):
+        assert ap == math.inf
+        assert pe == pytest.approx(expected, rel=1e-9)
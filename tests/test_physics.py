@@ -0,0 +1,41 @@
+import math
+
+import numpy as np
+import pytest
+
+from ksp_physics import KERBIN, Table, body_model, from_server
+
+
+def _pressure(h):
+    return KERBIN["p0"] * math.exp(-h / KERBIN["scale_height"])
+
+
+def test_table_interpolates_number_and_array():
+    table = Table(100.0, 10.0, [0.0, 1.0, 4.0])
+    assert table(105.0) == pytest.approx(0.5)
+    # Вне сетки - крайние значения
+    assert table(0.0) == 0.0 and table(1000.0) == 4.0
+    assert table(np.array([90.0, 115.0, 120.0, 200.0])).tolist() == [0.0, 2.5, 4.0, 4.0]
+
+
+def test_body_model_matches_exponential_atmosphere():
+    model = body_model(KERBIN)
+    assert body_model(dict(KERBIN)) is model
+    for h in (0.0, 1234.5, 20000.0, 55555.0):
+        assert model.pressure(h) == pytest.approx(_pressure(h), rel=1e-3)
+        assert model.ratio(h) == pytest.approx(_pressure(h) / KERBIN["p0"], rel=1e-3)
+    # Выше атмосферы давления нет
+    assert model.pressure(KERBIN["atmosphere_depth"] + 1.0) == 0.0
+    assert model.thrust(400000.0, 350000.0, 0.0) == pytest.approx(350000.0)
+
+
+def test_from_server_reads_body_once(conn):
+    body = conn.space_center.active_vessel.orbit.body
+    model = from_server(conn, body)
+    calls = sum(conn.rpc_counts.values())
+    assert calls > 0
+    assert from_server(conn, body) is model
+    assert sum(conn.rpc_counts.values()) == calls
+    assert model.mu == KERBIN["mu"] and model.radius == KERBIN["radius"]
+    # Кривая с сервера по логарифму совпадает с экспонентой модели
+    assert model.pressure(12345.0) == pytest.approx(_pressure(12345.0), rel=1e-2)
@@ -0,0 +1,45 @@
+import copy
+import runpy
+
+import ksp_sim
+from ksp_recorder import COMMAND, LogReader, replay
+
+SCRIPT = """from ksp_mission import Mission
+Mission({{"id": "fly", "name": "Fly", "max_duration": 60,
+          "setup": [{{"engage": True}}, {{"throttle": 1.0}}, "ignite"],
+          "phases": [{{"name": "climb", "guidance": {{"law": "hold", "pitch": {pitch}}},
+                       "until": {{"altitude_above": 500}}, "then": [{{"throttle": 0.5}}]}},
+                     {{"name": "coast", "until": {{"duration": 5}}}}]}}).run()
+"""
+
+
+def _script(tmp_path, name, pitch):
+    path = tmp_path / name
+    path.write_text(SCRIPT.format(pitch=pitch), encoding="utf-8")
+    return str(path)
+
+
+def _record(tmp_path, monkeypatch, script):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("KSP_RECORD", str(tmp_path / "rec"))
+    with ksp_sim.install(ksp_sim.Simulator(copy.deepcopy(ksp_sim.ROCKET))):
+        runpy.run_path(script, run_name="__main__")
+    monkeypatch.delenv("KSP_RECORD")
+    return str(tmp_path / "rec" / "fly.flt")
+
+
+def test_replay_reproduces_commands(tmp_path, monkeypatch):
+    script = _script(tmp_path, "fly.py", 85)
+    log = _record(tmp_path, monkeypatch, script)
+    commands = [channel for kind, channel, _, _ in LogReader(log).records() if kind == COMMAND]
+    assert "stage" in commands and "throttle" in commands
+    result = replay(log, script)
+    assert result["mismatches"] == [] and result["missing"] == 0
+    assert result["commands"] == result["expected"] > 0
+
+
+def test_replay_flags_changed_logic(tmp_path, monkeypatch):
+    log = _record(tmp_path, monkeypatch, _script(tmp_path, "fly.py", 85))
+    # Тот же журнал, другой закон наведения: расхождение по тангажу
+    result = replay(log, _script(tmp_path, "changed.py", 80))
+    assert any(expected[1] == "pitch_heading" for _, expected, _ in result["mismatches"])
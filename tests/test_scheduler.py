@@ -0,0 +1,74 @@
+import threading
+
+import pytest
+
+from ksp_scheduler import Scheduler, SimClock
+
+
+def test_at_fires_between_ticks(sim):
+    scheduler = Scheduler(SimClock(sim), threads=False)
+    ticks, fired = [], []
+
+    def tick(ut):
+        ticks.append(ut)
+        if len(ticks) == 1:
+            scheduler.at(ut + 0.03, fired.append)  # Раньше следующего такта через 0.1 с
+
+    scheduler.add("tick", tick, 10)
+    scheduler.run_sync(until=sim.ut + 1.0)
+    assert fired == [pytest.approx(ticks[0] + 0.03)]
+    # Сетка тактов не сбилась: такт не ждал срока
+    assert ticks[1] == pytest.approx(ticks[0] + 0.1)
+
+
+def test_pending_at_is_cancelled_on_stop(sim):
+    scheduler = Scheduler(SimClock(sim), threads=False)
+    fired = []
+
+    def tick(ut):
+        scheduler.at(ut + 100.0, fired.append)
+        scheduler.stop()
+
+    scheduler.add("tick", tick, 10)
+    scheduler.run_sync()
+    assert fired == []
+    assert scheduler.clock.tasks == 0
+
+
+def test_at_error_is_raised_from_run(sim):
+    scheduler = Scheduler(SimClock(sim), threads=False)
+
+    def fail(ut):
+        raise RuntimeError("срок")
+
+    def tick(ut):
+        if not scheduler.tasks["tick"].stats.runs:
+            scheduler.at(ut + 0.05, fail)
+
+    scheduler.add("tick", tick, 10)
+    with pytest.raises(RuntimeError):
+        scheduler.run_sync(until=sim.ut + 1.0)
+
+
+def test_run_closes_only_its_own_executor(sim):
+    from concurrent.futures import ThreadPoolExecutor
+
+    threads = []
+
+    def tick(ut):
+        threads.append(threading.get_ident())
+        scheduler.stop()
+
+    scheduler = Scheduler(SimClock(sim))
+    scheduler.add("tick", tick, 10)
+    for _ in range(2):
+        scheduler.run_sync()
+        assert scheduler.executor is None
+    assert len(threads) == 2 and threading.get_ident() not in threads
+    # Общий пул (ksp_fleet) переживает run()
+    with ThreadPoolExecutor(1) as shared:
+        scheduler = Scheduler(SimClock(sim), executor=shared)
+        scheduler.add("tick", tick, 10)
+        scheduler.run_sync()
+        assert scheduler.executor is shared
+        assert shared.submit(lambda: 1).result() == 1
@@ -0,0 +1,50 @@
+import pytest
+
+from ksp_stream import FIELDS, TelemetryStream
+
+
+def test_snapshot_makes_no_rpcs(sim, conn):
+    vessel = conn.space_center.active_vessel
+    tel = TelemetryStream(conn, vessel, vessel.orbit.body.reference_frame)
+    setup = conn.rpc_count
+    for _ in range(100):
+        sim.advance(0.1)
+        snap = tel.snapshot()
+    assert conn.rpc_count == setup
+    assert snap.altitude > 0
+
+
+def test_subscribes_once_per_field(conn):
+    vessel = conn.space_center.active_vessel
+    TelemetryStream(conn, vessel, extra={"fuel": (vessel.resources.amount, "LiquidFuel")})
+    assert conn.rpc_counts["KRPC.AddStream"] == len(FIELDS) + 1
+
+
+def test_polling_costs_round_trips(sim, conn):
+    # Прежний save_telemetry(): каждый геттер - отдельный запрос
+    vessel = conn.space_center.active_vessel
+    before = conn.rpc_count
+    conn.space_center.ut, vessel.flight().mean_altitude, vessel.flight().speed
+    vessel.flight().pitch, vessel.orbit.apoapsis_altitude, vessel.orbit.periapsis_altitude
+    assert conn.rpc_count - before >= 6
+
+
+def test_snapshot_is_one_moment(sim, conn):
+    # Все поля снимка - после одного и того же шага физики
+    vessel = conn.space_center.active_vessel
+    tel = TelemetryStream(conn, vessel, vessel.orbit.body.reference_frame)
+    sim.advance(5.0)
+    snap = tel.snapshot()
+    assert snap.ut == pytest.approx(sim.ut)
+    assert snap.altitude == pytest.approx(sim.altitude())
+    assert snap.mass == pytest.approx(sim.mass())
+
+
+def test_close_unsubscribes(sim, conn):
+    vessel = conn.space_center.active_vessel
+    tel = TelemetryStream(conn, vessel)
+    snap = tel.snapshot()
+    tel.close()
+    sim.advance(1.0)
+    assert tel.snapshot() is snap
+    assert tel._update not in sim.update_callbacks
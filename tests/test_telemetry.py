@@ -0,0 +1,28 @@
+import numpy as np
+
+from ksp_telemetry import TelemetryBuffer, open_telemetry
+
+
+def test_spill_keeps_every_sample(tmp_path):
+    path = str(tmp_path / "f.tlm")
+    with TelemetryBuffer(["time", "altitude"], path=path, chunk=4) as buffer:
+        for i in range(10):
+            buffer.append(float(i), 100.0 * i)
+        # Два полных блока на диске, два отсчета в памяти
+        assert buffer.spilled == 8 and len(buffer) == 10
+        assert buffer["altitude"].tolist() == [100.0 * i for i in range(10)]
+    data = open_telemetry(path)
+    assert data.dtype.names == ("time", "altitude")
+    assert np.array_equal(data["time"], np.arange(10.0))
+
+
+def test_resume_drops_tail_after_cursor(tmp_path):
+    path = str(tmp_path / "f.tlm")
+    with TelemetryBuffer(["time"], path=path, chunk=2) as buffer:
+        for i in range(6):
+            buffer.append(float(i))
+    # Контрольная точка видела 4 отсчета: хвост за ней записан заново
+    with TelemetryBuffer(["time"], path=path, chunk=2, resume=4) as buffer:
+        assert len(buffer) == 4
+        buffer.append(40.0)
+    assert open_telemetry(path)["time"].tolist() == [0.0, 1.0, 2.0, 3.0, 40.0]
@@ -0,0 +1,45 @@
+import copy
+import math
+
+import ksp_sim
+from ksp_physics import KERBIN, ROCKET
+from ksp_warp import FleetWarp, WarpManager, combine
+
+
+def _orbiting(name):
+    # Круговая орбита 200 км, без тяги: rails-ускорение допустимо
+    sim = ksp_sim.Simulator(copy.deepcopy(ROCKET), name=name)
+    r = KERBIN["radius"] + 200000.0
+    sim.y = r
+    sim.vx = math.sqrt(KERBIN["mu"] / r)
+    sim.landed = False
+    return sim
+
+
+def test_combine():
+    assert combine([]) == (0, 0)
+    assert combine([(5, 0), (3, 0)]) == (3, 0)
+    assert combine([(5, 0), (0, 0)]) == (0, 0)
+    assert combine([(5, 0), (0, 2)]) == (0, 2)
+
+
+def test_vessel_under_control_holds_fleet_at_1x():
+    group = ksp_sim.Group([_orbiting("A"), _orbiting("B")])
+    conn = ksp_sim.connect(sim=group)
+    shared = FleetWarp(conn)
+    a, b = (WarpManager(conn, vessel, shared=shared) for vessel in conn.space_center.vessels)
+    ut = group.ut
+
+    a.update(ut, ut + 100000.0)
+    b.stop()  # B в фазе с управлением
+    assert group.warp_rate() == 1
+
+    b.update(ut, ut + 100000.0)
+    assert group.warp_rate() > 1
+    assert {sim.rails_warp for sim in group.sims} == {shared.rails}
+
+    b.close()  # Миссия B закончена - решает только A
+    a.update(ut, ut + 100000.0)
+    assert group.warp_rate() > 1
+    a.close()
+    assert group.warp_rate() == 1